@@ -0,0 +1,29 @@
+"""Composite index for keyset pagination of notifications
+
+Revision ID: 003_notification_keyset
+Revises: 002_indexes_constraints
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = '003_notification_keyset'
+down_revision: Union[str, None] = '002_indexes_constraints'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Serves ORDER BY created_at DESC, id DESC with a (created_at, id) < cursor predicate
+    op.create_index(
+        'ix_notifications_recipient_created',
+        'notifications',
+        ['recipient_id', sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_recipient_created', table_name='notifications')
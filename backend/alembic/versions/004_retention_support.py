@@ -0,0 +1,34 @@
+"""Archive table and indexes for the retention job
+
+Revision ID: 004_retention
+Revises: 003_notification_keyset
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers
+revision: str = '004_retention'
+down_revision: Union[str, None] = '003_notification_keyset'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Same columns as notifications, no FKs: archived rows outlive their users
+    op.execute("CREATE TABLE IF NOT EXISTS notifications_archive (LIKE notifications INCLUDING DEFAULTS)")
+    op.create_index('ix_notifications_archive_recipient_id', 'notifications_archive', ['recipient_id'])
+
+    # Let the retention predicates find expired rows without a sequential scan
+    op.create_index('ix_notifications_created_at', 'notifications', ['created_at'])
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'])
+    op.create_index('ix_password_reset_codes_expires_at', 'password_reset_codes', ['expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_password_reset_codes_expires_at', table_name='password_reset_codes')
+    op.drop_index('ix_refresh_tokens_expires_at', table_name='refresh_tokens')
+    op.drop_index('ix_notifications_created_at', table_name='notifications')
+    op.drop_index('ix_notifications_archive_recipient_id', table_name='notifications_archive')
+    op.drop_table('notifications_archive')
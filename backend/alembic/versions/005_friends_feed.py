@@ -0,0 +1,58 @@
+"""Materialized friends feed
+
+Revision ID: 005_friends_feed
+Revises: 004_retention
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = '005_friends_feed'
+down_revision: Union[str, None] = '004_retention'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'feed_entries',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('wishlist_id', sa.Uuid(), nullable=False),
+        sa.Column('owner_id', sa.Uuid(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'wishlist_id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['wishlist_id'], ['wishlists.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    )
+    # Serves ORDER BY updated_at DESC, wishlist_id DESC with a keyset cursor
+    op.create_index(
+        'ix_feed_entries_user_updated',
+        'feed_entries',
+        ['user_id', sa.text('updated_at DESC'), sa.text('wishlist_id DESC')],
+    )
+    # Read-time merge for owners with too many friends to fan out to
+    op.create_index('ix_wishlists_owner_active_updated', 'wishlists', ['owner_id', 'is_active', 'updated_at'])
+
+    # Backfill every accepted friendship in both directions
+    op.execute("""
+        INSERT INTO feed_entries (user_id, wishlist_id, owner_id, updated_at)
+        SELECT f.reader_id, w.id, w.owner_id, w.updated_at
+        FROM (
+            SELECT requester_id AS reader_id, addressee_id AS owner_id FROM friendships WHERE status = 'accepted'
+            UNION
+            SELECT addressee_id, requester_id FROM friendships WHERE status = 'accepted'
+        ) f
+        JOIN wishlists w ON w.owner_id = f.owner_id
+        WHERE w.is_active AND w.privacy IN ('public', 'friends')
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_wishlists_owner_active_updated', table_name='wishlists')
+    op.drop_index('ix_feed_entries_user_updated', table_name='feed_entries')
+    op.drop_table('feed_entries')
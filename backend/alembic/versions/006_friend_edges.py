@@ -0,0 +1,45 @@
+"""Mirrored adjacency table for accepted friendships
+
+Revision ID: 006_friend_edges
+Revises: 005_friends_feed
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = '006_friend_edges'
+down_revision: Union[str, None] = '005_friends_feed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (user_id, friend_id) primary key answers both "friends of X" and "are X and Y friends"
+    op.create_table(
+        'friend_edges',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('friend_id', sa.Uuid(), nullable=False),
+        sa.Column('friendship_id', sa.Uuid(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'friend_id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['friend_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['friendship_id'], ['friendships.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_friend_edges_friendship_id', 'friend_edges', ['friendship_id'])
+
+    op.execute("""
+        INSERT INTO friend_edges (user_id, friend_id, friendship_id)
+        SELECT requester_id, addressee_id, id FROM friendships WHERE status = 'accepted'
+        UNION ALL
+        SELECT addressee_id, requester_id, id FROM friendships WHERE status = 'accepted'
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_friend_edges_friendship_id', table_name='friend_edges')
+    op.drop_table('friend_edges')
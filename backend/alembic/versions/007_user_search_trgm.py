@@ -0,0 +1,33 @@
+"""Trigram indexes for user search
+
+Revision ID: 007_user_search_trgm
+Revises: 006_friend_edges
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers
+revision: str = '007_user_search_trgm'
+down_revision: Union[str, None] = '006_friend_edges'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # gin_trgm_ops lets ILIKE '%q%' use the index instead of scanning users
+    op.create_index(
+        'ix_users_username_trgm', 'users', ['username'],
+        postgresql_using='gin', postgresql_ops={'username': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_users_full_name_trgm', 'users', ['full_name'],
+        postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_full_name_trgm', table_name='users')
+    op.drop_index('ix_users_username_trgm', table_name='users')
@@ -0,0 +1,35 @@
+"""Full-text search column and filter indexes for items
+
+Revision ID: 008_item_search
+Revises: 007_user_search_trgm
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+# revision identifiers
+revision: str = '008_item_search'
+down_revision: Union[str, None] = '007_user_search_trgm'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Must match SEARCH_VECTOR_SQL in app/models/item.py
+    op.execute("""
+        ALTER TABLE items ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian'::regconfig, coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+        ) STORED
+    """)
+    op.create_index('ix_items_search_vector', 'items', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_item_categories_category_item', 'item_categories', ['category', 'item_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_item_categories_category_item', table_name='item_categories')
+    op.drop_index('ix_items_search_vector', table_name='items')
+    op.drop_column('items', 'search_vector')
@@ -0,0 +1,65 @@
+"""Precomputed per-user stats
+
+Revision ID: 009_user_stats
+Revises: 008_item_search
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision: str = '009_user_stats'
+down_revision: Union[str, None] = '008_item_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('total_gifts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('reserved_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('priced_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('price_sum', sa.Numeric(14, 2), server_default='0', nullable=False),
+        sa.Column('category_counts', postgresql.JSONB(), server_default='{}', nullable=False),
+        sa.Column('monthly_counts', postgresql.JSONB(), server_default='{}', nullable=False),
+        sa.Column('giver_counts', postgresql.JSONB(), server_default='{}', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    )
+
+    # Backfill; same derivation as app.services.user_stats.recompute
+    op.execute("""
+        INSERT INTO user_stats (
+            user_id, total_gifts, reserved_count, priced_count, price_sum,
+            category_counts, monthly_counts, giver_counts
+        )
+        SELECT
+            u.id,
+            (SELECT count(*) FROM items i JOIN wishlists w ON w.id = i.wishlist_id WHERE w.owner_id = u.id),
+            (SELECT count(*) FROM reservations r JOIN items i ON i.id = r.item_id
+                JOIN wishlists w ON w.id = i.wishlist_id WHERE w.owner_id = u.id),
+            (SELECT count(i.price) FROM items i JOIN wishlists w ON w.id = i.wishlist_id WHERE w.owner_id = u.id),
+            (SELECT coalesce(sum(i.price), 0) FROM items i JOIN wishlists w ON w.id = i.wishlist_id
+                WHERE w.owner_id = u.id),
+            (SELECT coalesce(jsonb_object_agg(category, n), '{}'::jsonb) FROM (
+                SELECT c.category, count(*) AS n FROM item_categories c JOIN items i ON i.id = c.item_id
+                JOIN wishlists w ON w.id = i.wishlist_id WHERE w.owner_id = u.id GROUP BY c.category) x),
+            (SELECT coalesce(jsonb_object_agg(ym, n), '{}'::jsonb) FROM (
+                SELECT to_char(i.created_at AT TIME ZONE 'UTC', 'YYYY-MM') AS ym, count(*) AS n
+                FROM items i JOIN wishlists w ON w.id = i.wishlist_id WHERE w.owner_id = u.id GROUP BY 1) x),
+            (SELECT coalesce(jsonb_object_agg(reserver_id, n), '{}'::jsonb) FROM (
+                SELECT r.reserver_id, count(*) AS n FROM reservations r JOIN items i ON i.id = r.item_id
+                JOIN wishlists w ON w.id = i.wishlist_id
+                WHERE w.owner_id = u.id AND r.reserver_id IS NOT NULL GROUP BY r.reserver_id) x)
+        FROM users u
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
@@ -0,0 +1,44 @@
+"""Gap-based BIGINT sort keys for items
+
+Revision ID: 010_item_sort_keys
+Revises: 009_user_stats
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = '010_item_sort_keys'
+down_revision: Union[str, None] = '009_user_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Appends use epoch milliseconds, which do not fit in INTEGER
+    op.alter_column('items', 'sort_order', type_=sa.BigInteger(), existing_type=sa.Integer())
+    # Spread existing keys 1024 apart so moves have room (GAP in app.services.ordering)
+    op.execute("""
+        UPDATE items i SET sort_order = n.rank
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY wishlist_id ORDER BY sort_order, created_at) * 1024 AS rank
+            FROM items
+        ) n
+        WHERE i.id = n.id
+    """)
+    op.create_index('ix_items_wishlist_sort', 'items', ['wishlist_id', 'sort_order'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_items_wishlist_sort', table_name='items')
+    op.execute("""
+        UPDATE items i SET sort_order = n.rank
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY wishlist_id ORDER BY sort_order, created_at) - 1 AS rank
+            FROM items
+        ) n
+        WHERE i.id = n.id
+    """)
+    op.alter_column('items', 'sort_order', type_=sa.Integer(), existing_type=sa.BigInteger())
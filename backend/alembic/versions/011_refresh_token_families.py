@@ -0,0 +1,41 @@
+"""Refresh-token families rotated in place
+
+Revision ID: 011_refresh_token_families
+Revises: 010_item_sort_keys
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = '011_refresh_token_families'
+down_revision: Union[str, None] = '010_item_sort_keys'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('refresh_tokens', sa.Column('generation', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('refresh_tokens', sa.Column('rotated_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing rows keep their token hash until their next refresh turns them into a family;
+    # new rows have no token, so only a shrinking partial index is needed
+    op.alter_column('refresh_tokens', 'token', existing_type=sa.String(512), nullable=True)
+    op.drop_constraint('refresh_tokens_token_key', 'refresh_tokens', type_='unique')
+    op.drop_index('ix_refresh_tokens_token', table_name='refresh_tokens')
+    op.create_index(
+        'ix_refresh_tokens_legacy_token', 'refresh_tokens', ['token'],
+        unique=True, postgresql_where=sa.text('token IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    # Family sessions have no token hash to fall back to
+    op.execute("DELETE FROM refresh_tokens WHERE token IS NULL")
+    op.drop_index('ix_refresh_tokens_legacy_token', table_name='refresh_tokens')
+    op.create_index('ix_refresh_tokens_token', 'refresh_tokens', ['token'])
+    op.create_unique_constraint('refresh_tokens_token_key', 'refresh_tokens', ['token'])
+    op.alter_column('refresh_tokens', 'token', existing_type=sa.String(512), nullable=False)
+    op.drop_column('refresh_tokens', 'rotated_at')
+    op.drop_column('refresh_tokens', 'generation')
@@ -0,0 +1,32 @@
+"""Stored friend count per user
+
+Revision ID: 012_user_friend_count
+Revises: 011_refresh_token_families
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = '012_user_friend_count'
+down_revision: Union[str, None] = '011_refresh_token_families'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('friend_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE users u SET friend_count = e.n
+        FROM (SELECT user_id, count(*) AS n FROM friend_edges GROUP BY user_id) e
+        WHERE e.user_id = u.id
+    """)
+    # The feed looks up the few users above feed_fanout_max_friends by range
+    op.create_index('ix_users_friend_count', 'users', ['friend_count'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_friend_count', table_name='users')
+    op.drop_column('users', 'friend_count')
@@ -0,0 +1,31 @@
+"""Resume cursors for maintenance passes
+
+Revision ID: 013_maintenance_state
+Revises: 012_user_friend_count
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = '013_maintenance_state'
+down_revision: Union[str, None] = '012_user_friend_count'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Whichever worker holds the retention lock resumes the pass where the last one stopped
+    op.create_table(
+        'maintenance_state',
+        sa.Column('job', sa.String(50), primary_key=True),
+        sa.Column('cursor', sa.Uuid(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('maintenance_state')
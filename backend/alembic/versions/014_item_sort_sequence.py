@@ -0,0 +1,32 @@
+"""Shared sequence for item append keys
+
+Revision ID: 014_item_sort_sequence
+Revises: 013_maintenance_state
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision: str = '014_item_sort_sequence'
+down_revision: Union[str, None] = '013_maintenance_state'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Appends take nextval * 1024 (GAP in app.services.ordering) instead of each
+    # web process's clock; start past every existing key, clock-derived ones included
+    op.execute("CREATE SEQUENCE items_sort_seq")
+    op.execute("SELECT setval('items_sort_seq', coalesce(max(sort_order), 0) / 1024 + 1, false) FROM items")
+    op.alter_column(
+        'items', 'sort_order',
+        server_default=sa.text("nextval('items_sort_seq') * 1024"), existing_type=sa.BigInteger(),
+    )
+
+
+def downgrade() -> None:
+    op.alter_column('items', 'sort_order', server_default=None, existing_type=sa.BigInteger())
+    op.execute("DROP SEQUENCE items_sort_seq")
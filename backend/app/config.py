@@ -8,13 +8,74 @@ class Settings(BaseSettings):
     secret_key: str
     access_token_expire_minutes: int = 15
     refresh_token_expire_days: int = 7
+    refresh_reuse_grace_seconds: int = 30
+    refresh_family_cache_entries: int = 50000
+    refresh_family_cache_ttl_seconds: int = 3600
+    database_replica_url: str = ""
+    read_your_writes_seconds: int = 5
+    replica_max_lag_seconds: float = 10
+    replica_lag_check_seconds: int = 5
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 10
+    db_pool_recycle: int = 300
+    db_pool_pre_ping: bool = True
+    db_liveness_interval_seconds: int = 0
+    db_statement_cache_size: int = 500
+    metrics_token: str = ""
+    query_budget_mode: str = "off"
+    query_repeat_threshold: int = 3
     algorithm: str = "HS256"
+    jwt_backend: str = "jose"
+    jwt_cache_max_entries: int = 10000
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 16
+    rate_limit_enabled: bool = True
+    rate_limit_local_max_keys: int = 100000
+    trusted_proxy_hops: int | None = None
+    autofill_rate_limit: str = "20/minute"
+    autofill_allowed_private_hosts: str = ""
+    ws_connect_rate_limit: str = "30/minute"
     cors_origins: str = "http://localhost:3000"
     environment: str = "development"
     google_client_id: str = ""
+    google_jwks_url: str = "https://www.googleapis.com/oauth2/v3/certs"
     apple_client_id: str = ""
     redis_url: str = ""
     expo_push_url: str = "https://exp.host/--/api/v2/push/send"
+    expo_receipts_url: str = "https://exp.host/--/api/v2/push/getReceipts"
+    push_batch_window_ms: int = 50
+    push_max_concurrency: int = 4
+    push_receipt_delay_seconds: int = 900
+    push_receipt_poll_seconds: int = 300
+    notification_coalesce_seconds: int = 60
+    notification_flush_interval_ms: int = 500
+    retention_enabled: bool = True
+    retention_interval_minutes: int = 60
+    retention_batch_size: int = 1000
+    retention_max_batches: int = 100
+    retention_batch_pause_ms: int = 50
+    retention_notifications_days: int = 180
+    retention_notifications_read_days: int = 30
+    retention_archive_notifications: bool = False
+    retention_grace_hours: int = 24
+    counter_reconcile_enabled: bool = True
+    stats_reconcile_interval_hours: int = 24
+    public_cache_max_entries: int = 2048
+    public_cache_ttl_seconds: int = 3600
+    public_cache_local_ttl_seconds: int = 5
+    feed_fanout_max_friends: int = 500
+    friend_cache_max_entries: int = 10000
+    friend_cache_ttl_seconds: int = 30
+    user_search_cache_entries: int = 2048
+    user_search_cache_ttl_seconds: int = 30
+    user_search_max_candidates: int = 200
+    user_cache_max_entries: int = 10000
+    user_cache_ttl_seconds: int = 10
+    user_cache_shared_ttl_seconds: int = 300
+    item_import_max_items: int = 500
+    item_import_max_bytes: int = 2_000_000
     resend_api_key: str = ""
     resend_from_email: str = "Wishly <onboarding@resend.dev>"
     password_reset_code_ttl_minutes: int = 15
@@ -1,40 +1,65 @@
 import os
 from urllib.parse import urlparse, urlencode, parse_qs, urlunparse
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from app.config import get_settings
+from app.utils.db_pool import LivenessChecker, PoolMetrics, instrumented_pool
 
 settings = get_settings()
 
+
+def _engine_url(url: str) -> tuple[str, dict]:
+    """asyncpg URL and connect args for a ``postgres://`` / ``postgresql://`` URL."""
+    if url.startswith("postgresql://"):
+        url = url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    elif url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql+asyncpg://", 1)
+
+    # Strip sslmode from URL and disable SSL for internal Railway connections
+    connect_args: dict = {}
+    parsed = urlparse(url)
+    qs = parse_qs(parsed.query)
+    if qs.pop("sslmode", None):
+        url = urlunparse(parsed._replace(query=urlencode(qs, doseq=True)))
+    if ".railway.internal" in url:
+        connect_args["ssl"] = False
+    # Per-connection prepared-statement caches (SQLAlchemy's adapter and asyncpg's own);
+    # 0 disables both, which PgBouncer in transaction mode requires
+    connect_args["prepared_statement_cache_size"] = settings.db_statement_cache_size
+    connect_args["statement_cache_size"] = settings.db_statement_cache_size
+    return url, connect_args
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    url, connect_args = _engine_url(url)
+    return create_async_engine(
+        url,
+        echo=False,
+        connect_args=connect_args,
+        poolclass=instrumented_pool(PoolMetrics()),
+        # The liveness checker takes over from pre-ping when enabled
+        pool_pre_ping=settings.db_pool_pre_ping and not settings.db_liveness_interval_seconds,
+        pool_recycle=settings.db_pool_recycle,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+
+
 # On Railway, prefer the private URL (*.railway.internal) over the public
 # proxy (*.proxy.rlwy.net). The public proxy is unreliable for service-to-service
 # connections within Railway. The private network needs no SSL.
-_db_url = os.getenv("DATABASE_PRIVATE_URL") or os.getenv("DATABASE_URL") or settings.database_url
-if _db_url.startswith("postgresql://"):
-    _db_url = _db_url.replace("postgresql://", "postgresql+asyncpg://", 1)
-elif _db_url.startswith("postgres://"):
-    _db_url = _db_url.replace("postgres://", "postgresql+asyncpg://", 1)
-
-# Strip sslmode from URL and disable SSL for internal Railway connections
-_connect_args: dict = {}
-_parsed = urlparse(_db_url)
-_qs = parse_qs(_parsed.query)
-if _qs.pop("sslmode", None):
-    _db_url = urlunparse(_parsed._replace(query=urlencode(_qs, doseq=True)))
-if ".railway.internal" in _db_url:
-    _connect_args["ssl"] = False
-
-engine = create_async_engine(
-    _db_url,
-    echo=False,
-    connect_args=_connect_args,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=10,
-)
+engine = _create_engine(os.getenv("DATABASE_PRIVATE_URL") or os.getenv("DATABASE_URL") or settings.database_url)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+liveness_checker = LivenessChecker(engine, settings.db_liveness_interval_seconds)
+
+# Optional streaming replica for read-only endpoints (see app.services.read_routing);
+# without one, reads share the primary.
+replica_engine = _create_engine(settings.database_replica_url) if settings.database_replica_url else None
+read_session = (
+    async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine else async_session
+)
 
 
 class Base(DeclarativeBase):
@@ -2,34 +2,51 @@ from uuid import UUID
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from app.database import get_db
 from app.models.user import User
+from app.services.read_routing import read_router, request_user_id
+from app.services.user_cache import load_user
 from app.utils.security import decode_token
 
 security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials | None = Depends(security),
-    db: AsyncSession = Depends(get_db),
-) -> User:
+def _token_user_id(credentials: HTTPAuthorizationCredentials | None) -> UUID | None:
     if not credentials:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-
+        return None
     payload = decode_token(credentials.credentials)
     if not payload or payload.get("type") != "access":
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        return None
+    try:
+        return UUID(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
 
-    user_id = payload.get("sub")
+
+async def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials | None = Depends(security),
+) -> UUID:
+    """The caller's id from the access token alone, for endpoints that only filter by it.
+
+    Does not check that the user still exists; a deleted account's token
+    keeps working here until it expires.
+    """
+    if not credentials:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    user_id = _token_user_id(credentials)
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    request_user_id.set(user_id)
+    return user_id
 
-    result = await db.execute(select(User).where(User.id == UUID(user_id)))
-    user = result.scalar_one_or_none()
+
+async def get_current_user(
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    user = await load_user(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
     return user
 
 
@@ -37,16 +54,23 @@ async def get_optional_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(security),
     db: AsyncSession = Depends(get_db),
 ) -> User | None:
-    if not credentials:
+    user_id = _token_user_id(credentials)
+    if not user_id:
         return None
+    request_user_id.set(user_id)
+    return await load_user(db, user_id)
 
-    payload = decode_token(credentials.credentials)
-    if not payload or payload.get("type") != "access":
-        return None
 
-    user_id = payload.get("sub")
-    if not user_id:
-        return None
+async def get_optional_user_id(
+    credentials: HTTPAuthorizationCredentials | None = Depends(security),
+) -> UUID | None:
+    user_id = _token_user_id(credentials)
+    if user_id:
+        request_user_id.set(user_id)
+    return user_id
+
 
-    result = await db.execute(select(User).where(User.id == UUID(user_id)))
-    return result.scalar_one_or_none()
+async def get_read_db(user_id: UUID | None = Depends(get_optional_user_id)):
+    """Session for endpoints that never write: the replica, unless the caller just wrote or it lags."""
+    async with read_router.session(await read_router.use_replica(user_id)) as session:
+        yield session
@@ -1,20 +1,22 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from sqlalchemy import text
 from app.config import get_settings
-from app.database import engine, async_session
-from app.routers import auth, wishlists, items, reservations, contributions, autofill, websocket, friends, likes, notifications, stats, themes
+from app.database import engine, async_session, liveness_checker, replica_engine
+from app.routers import auth, wishlists, items, reservations, contributions, autofill, websocket, friends, likes, notifications, stats, themes, metrics
+from app.services.google_auth import google_verifier
+from app.services.maintenance import retention_job
+from app.services.notifications import notification_fanout
+from app.services.password_hasher import password_hasher
+from app.services.read_routing import read_router
+from app.services.push import push_dispatcher
 from app.utils.http import init_http_client, close_http_client
+from app.utils.query_budget import QueryBudgetMiddleware
+from app.utils.request_metrics import MetricsMiddleware
 
 settings = get_settings()
 
-limiter = Limiter(key_func=get_remote_address)
-
-
 @asynccontextmanager
 async def lifespan(app):
     # Initialize shared HTTP client
@@ -22,15 +24,32 @@ async def lifespan(app):
     # Validate DB connection on startup
     async with async_session() as session:
         await session.execute(text("SELECT 1"))
+    if settings.db_liveness_interval_seconds:
+        liveness_checker.start()
+    read_router.start()
+    push_dispatcher.start()
+    if settings.google_client_id:
+        await google_verifier.start()
+    notification_fanout.start()
+    if settings.retention_enabled:
+        retention_job.start()
     yield
+    await retention_job.stop()
+    await google_verifier.stop()
+    # Write pending notifications and deliver buffered pushes before the HTTP client goes away
+    await notification_fanout.stop()
+    await push_dispatcher.stop()
+    password_hasher.shutdown()
     # Close shared HTTP client
     await close_http_client()
+    await liveness_checker.stop()
+    await read_router.stop()
     await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 
 app = FastAPI(title="Social Wishlist API", version="1.0.0", lifespan=lifespan)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,7 +57,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PATCH", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+if settings.query_budget_mode != "off":
+    app.add_middleware(QueryBudgetMiddleware)
+# Added last so it is outermost and its timings include CORS handling
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(wishlists.router, prefix="/api/v1/wishlists", tags=["wishlists"])
@@ -51,6 +75,8 @@ app.include_router(likes.router, prefix="/api/v1", tags=["likes"])
 app.include_router(notifications.router, prefix="/api/v1/notifications", tags=["notifications"])
 app.include_router(stats.router, prefix="/api/v1/stats", tags=["stats"])
 app.include_router(themes.router, prefix="/api/v1/themes", tags=["themes"])
+app.include_router(metrics.router, prefix="/api/v1/metrics", tags=["metrics"])
+app.include_router(metrics.prometheus_router, tags=["metrics"])
 app.include_router(websocket.router, tags=["websocket"])
 
 
@@ -59,7 +85,7 @@ async def health():
     try:
         async with async_session() as session:
             await session.execute(text("SELECT 1"))
-        return {"status": "ok", "db": "connected"}
+        return {"status": "ok", "db": "connected", "password_hasher": password_hasher.metrics()}
     except Exception:
         from fastapi.responses import JSONResponse
         return JSONResponse(status_code=503, content={"status": "error", "db": "disconnected"})
@@ -10,9 +10,12 @@ from app.models.item_like import ItemLike
 from app.models.item_category import ItemCategory
 from app.models.wishlist_access import WishlistAccess
 from app.models.password_reset import PasswordResetCode
+from app.models.feed_entry import FeedEntry
+from app.models.friend_edge import FriendEdge
+from app.models.user_stats import UserStats
 
 __all__ = [
     "User", "Wishlist", "Item", "Reservation", "Contribution", "RefreshToken",
     "Friendship", "Notification", "ItemLike", "ItemCategory", "WishlistAccess",
-    "PasswordResetCode",
+    "PasswordResetCode", "FeedEntry", "FriendEdge", "UserStats",
 ]
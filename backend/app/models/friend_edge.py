@@ -0,0 +1,16 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class FriendEdge(Base):
+    """One direction of an accepted friendship; each friendship has two rows."""
+
+    __tablename__ = "friend_edges"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    friend_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    friendship_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("friendships.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,13 +1,31 @@
 import uuid
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import String, Text, Boolean, Integer, Numeric, DateTime, ForeignKey, func
+from sqlalchemy import String, Text, Boolean, BigInteger, Numeric, DateTime, ForeignKey, Computed, Index, Sequence, func, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
+# Name outranks description; both configs so Russian and English stems match
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('russian'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')"
+)
+
+# Spacing between neighbouring sort keys; appends take the next value of the
+# shared sequence times this, see app.services.ordering
+SORT_KEY_GAP = 1024
+ITEMS_SORT_SEQ = Sequence("items_sort_seq", metadata=Base.metadata)
+
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        Index("ix_items_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_items_wishlist_sort", "wishlist_id", "sort_order"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     wishlist_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("wishlists.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -20,10 +38,13 @@ class Item(Base):
     source_domain: Mapped[str | None] = mapped_column(String(255))
     is_group_gift: Mapped[bool] = mapped_column(Boolean, default=False)
     priority: Mapped[str] = mapped_column(String(20), default="normal")  # must_have | nice_to_have | dream | normal
-    sort_order: Mapped[int] = mapped_column(Integer, default=0)
+    sort_order: Mapped[int] = mapped_column(
+        BigInteger, server_default=text(f"nextval('items_sort_seq') * {SORT_KEY_GAP}")
+    )  # gap-based, see app.services.ordering
     is_liked_by_owner: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True), deferred=True)
 
     wishlist = relationship("Wishlist", back_populates="items")
     reservations = relationship("Reservation", back_populates="item", cascade="all, delete-orphan")
@@ -1,12 +1,16 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Boolean, Text, DateTime, func
+from sqlalchemy import String, Boolean, Integer, Text, DateTime, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_username_trgm", "username", postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+        Index("ix_users_full_name_trgm", "full_name", postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False, index=True)
@@ -21,6 +25,7 @@ class User(Base):
     expo_push_token: Mapped[str | None] = mapped_column(Text)
     biometrics_enabled: Mapped[bool] = mapped_column(Boolean, default=False)
     theme: Mapped[str] = mapped_column(String(50), default="deep_amethyst")
+    friend_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", index=True)  # friend_edges rows; kept by app.services.friends
     google_id: Mapped[str | None] = mapped_column(String(255), unique=True)
     apple_id: Mapped[str | None] = mapped_column(String(255), unique=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
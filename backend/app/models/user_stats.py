@@ -0,0 +1,23 @@
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import Integer, Numeric, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class UserStats(Base):
+    """Precomputed profile stats; maintained by app.services.user_stats."""
+
+    __tablename__ = "user_stats"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_gifts: Mapped[int] = mapped_column(Integer, default=0)
+    reserved_count: Mapped[int] = mapped_column(Integer, default=0)
+    priced_count: Mapped[int] = mapped_column(Integer, default=0)
+    price_sum: Mapped[Decimal] = mapped_column(Numeric(14, 2), default=0)
+    category_counts: Mapped[dict] = mapped_column(JSONB, default=dict)  # category -> items
+    monthly_counts: Mapped[dict] = mapped_column(JSONB, default=dict)  # "YYYY-MM" (UTC) -> items created
+    giver_counts: Mapped[dict] = mapped_column(JSONB, default=dict)  # reserver user id -> reservations
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
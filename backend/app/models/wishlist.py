@@ -1,13 +1,16 @@
 import uuid
 import secrets
 from datetime import datetime, date
-from sqlalchemy import String, Text, Integer, Boolean, Date, DateTime, ForeignKey, func
+from sqlalchemy import String, Text, Integer, Boolean, Date, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
 
 class Wishlist(Base):
     __tablename__ = "wishlists"
+    __table_args__ = (
+        Index("ix_wishlists_owner_active_updated", "owner_id", "is_active", "updated_at"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
     owner_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -1,19 +1,16 @@
-import asyncio
 import hashlib
 import secrets
 from datetime import datetime, timedelta, timezone
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Request
-from google.auth.transport.requests import Request as GoogleRequest
-from google.oauth2 import id_token
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
 from app.database import get_db
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user, get_current_user_id, get_read_db
 from app.models.password_reset import PasswordResetCode
-from app.models.refresh_token import RefreshToken
 from app.models.user import User
 from app.schemas.user import (
     AppleAuthRequest,
@@ -26,23 +23,26 @@ from app.schemas.user import (
     UserLogin,
     UserRegister,
     UserResponse,
+    UserPublicResponse,
     UserUpdate,
 )
+from app.services import refresh_tokens, user_search
 from app.services.email import send_password_reset_email
-from app.utils.security import (
-    create_access_token,
-    create_refresh_token,
-    decode_token,
-    hash_password,
-    hash_token,
-    verify_password,
-)
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from app.services.google_auth import GoogleTokenError, google_verifier
+from app.services.password_hasher import HasherOverloaded, password_hasher
+from app.services.rate_limit import check_key, count_key, enforce_key, rate_limit
+from app.services.user_search import search_cache
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.security import create_access_token
 
 router = APIRouter()
 settings = get_settings()
-limiter = Limiter(key_func=get_remote_address)
+
+LOGIN_ACCOUNT_RULE = "20/hour"
+
+
+def _overloaded() -> HTTPException:
+    return HTTPException(status_code=503, detail="Сервер перегружен, попробуйте позже", headers={"Retry-After": "1"})
 
 
 @router.get("/google/config-status")
@@ -59,14 +59,17 @@ async def google_auth(data: GoogleAuthRequest, db: AsyncSession = Depends(get_db
         raise HTTPException(status_code=503, detail="Google auth не настроен")
 
     try:
-        payload = id_token.verify_oauth2_token(data.credential, GoogleRequest(), settings.google_client_id)
-    except Exception as exc:
+        payload = await google_verifier.verify(data.credential, settings.google_client_id)
+    except GoogleTokenError as exc:
         raise HTTPException(status_code=401, detail="Неверные данные Google") from exc
 
     email = payload.get("email")
     sub = payload.get("sub")
     if not email or not sub:
         raise HTTPException(status_code=401, detail="Неполный Google-профиль")
+    # Accounts are matched by email, so it must be one Google has verified
+    if not payload.get("email_verified"):
+        raise HTTPException(status_code=401, detail="Email в Google-аккаунте не подтверждён")
 
     result = await db.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
@@ -97,9 +100,8 @@ async def apple_auth(data: AppleAuthRequest, db: AsyncSession = Depends(get_db))
     raise HTTPException(status_code=501, detail="Apple Sign In будет доступен позже")
 
 
-@router.post("/register", response_model=TokenResponse)
-@limiter.limit("3/minute")
-async def register(request: Request, data: UserRegister, db: AsyncSession = Depends(get_db)):
+@router.post("/register", response_model=TokenResponse, dependencies=[Depends(rate_limit("3/minute", "register"))])
+async def register(data: UserRegister, db: AsyncSession = Depends(get_db)):
     existing = await db.execute(select(User).where(User.email == data.email))
     if existing.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email уже зарегистрирован")
@@ -109,8 +111,10 @@ async def register(request: Request, data: UserRegister, db: AsyncSession = Depe
         if existing_username.scalar_one_or_none():
             raise HTTPException(status_code=400, detail="Username уже занят")
 
-    loop = asyncio.get_running_loop()
-    password_hash = await loop.run_in_executor(None, hash_password, data.password)
+    try:
+        password_hash = await password_hasher.hash(data.password)
+    except HasherOverloaded:
+        raise _overloaded()
     user = User(
         email=data.email,
         password_hash=password_hash,
@@ -123,20 +127,29 @@ async def register(request: Request, data: UserRegister, db: AsyncSession = Depe
     return await _issue_tokens(db, user)
 
 
-@router.post("/login", response_model=TokenResponse)
-@limiter.limit("5/minute")
-async def login(request: Request, data: UserLogin, db: AsyncSession = Depends(get_db)):
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(rate_limit("5/minute", "login"))])
+async def login(data: UserLogin, db: AsyncSession = Depends(get_db)):
+    # Failures per account as well as per IP, against stuffing spread over many
+    # addresses. Only failures are counted, but once an account is over the
+    # limit even the right password is refused until the window slides
+    account = data.email.lower()
+    await check_key("login:account", account, LOGIN_ACCOUNT_RULE)
+
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
 
     is_password_correct = False
     if user and user.password_hash:
-        loop = asyncio.get_running_loop()
-        is_password_correct = await loop.run_in_executor(
-            None, verify_password, data.password, user.password_hash
-        )
+        try:
+            is_password_correct, new_hash = await password_hasher.verify_and_update(data.password, user.password_hash)
+        except HasherOverloaded:
+            raise _overloaded()
+        if new_hash:
+            # BCRYPT_ROUNDS changed since this hash was made
+            user.password_hash = new_hash
 
     if not is_password_correct:
+        await count_key("login:account", account, LOGIN_ACCOUNT_RULE)
         raise HTTPException(status_code=401, detail="Неверные учётные данные")
 
     return await _issue_tokens(db, user)
@@ -144,54 +157,24 @@ async def login(request: Request, data: UserLogin, db: AsyncSession = Depends(ge
 
 async def _issue_tokens(db: AsyncSession, user: User) -> TokenResponse:
     access = create_access_token(user.id)
-    refresh = create_refresh_token(user.id)
-
-    rt = RefreshToken(
-        user_id=user.id,
-        token=hash_token(refresh),
-        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days),
-    )
-    db.add(rt)
+    refresh = await refresh_tokens.issue(db, user.id)
 
     return TokenResponse(access_token=access, refresh_token=refresh, user=UserResponse.model_validate(user))
 
 
 @router.post("/refresh")
 async def refresh(data: RefreshRequest, db: AsyncSession = Depends(get_db)):
-    payload = decode_token(data.refresh_token)
-    if not payload or payload.get("type") != "refresh":
-        raise HTTPException(status_code=401, detail="Неверный refresh-токен")
-
-    token_hash = hash_token(data.refresh_token)
-    result = await db.execute(
-        select(RefreshToken).where(RefreshToken.token == token_hash)
-    )
-    rt = result.scalar_one_or_none()
-    if not rt or rt.expires_at < datetime.now(timezone.utc):
+    try:
+        user_id, new_refresh = await refresh_tokens.rotate(db, data.refresh_token)
+    except refresh_tokens.InvalidRefreshToken:
         raise HTTPException(status_code=401, detail="Неверный refresh-токен")
 
-    await db.delete(rt)
-
-    new_access = create_access_token(rt.user_id)
-    new_refresh = create_refresh_token(rt.user_id)
-
-    new_rt = RefreshToken(
-        user_id=rt.user_id,
-        token=hash_token(new_refresh),
-        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days),
-    )
-    db.add(new_rt)
-
-    return {"access_token": new_access, "refresh_token": new_refresh, "token_type": "bearer"}
+    return {"access_token": create_access_token(user_id), "refresh_token": new_refresh, "token_type": "bearer"}
 
 
 @router.post("/logout")
 async def logout(data: RefreshRequest, db: AsyncSession = Depends(get_db)):
-    token_hash = hash_token(data.refresh_token)
-    result = await db.execute(select(RefreshToken).where(RefreshToken.token == token_hash))
-    rt = result.scalar_one_or_none()
-    if rt:
-        await db.delete(rt)
+    await refresh_tokens.revoke(db, data.refresh_token)
     return {"message": "Вы вышли из аккаунта"}
 
 
@@ -217,9 +200,9 @@ async def update_me(
     return UserResponse.model_validate(user)
 
 
-@router.post("/forgot-password")
-@limiter.limit("3/minute")
-async def forgot_password(request: Request, data: ForgotPasswordRequest, db: AsyncSession = Depends(get_db)):
+@router.post("/forgot-password", dependencies=[Depends(rate_limit("3/minute", "forgot_password"))])
+async def forgot_password(data: ForgotPasswordRequest, db: AsyncSession = Depends(get_db)):
+    await enforce_key("forgot_password:account", data.email.lower(), "5/hour")
     # Always return success to prevent email enumeration
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
@@ -252,9 +235,9 @@ async def forgot_password(request: Request, data: ForgotPasswordRequest, db: Asy
     return {"message": "Если аккаунт существует, код отправлен на почту"}
 
 
-@router.post("/reset-password")
-@limiter.limit("5/minute")
-async def reset_password(request: Request, data: ResetPasswordRequest, db: AsyncSession = Depends(get_db)):
+@router.post("/reset-password", dependencies=[Depends(rate_limit("5/minute", "reset_password"))])
+async def reset_password(data: ResetPasswordRequest, db: AsyncSession = Depends(get_db)):
+    await enforce_key("reset_password:account", data.email.lower(), "10/hour")
     result = await db.execute(select(User).where(User.email == data.email))
     user = result.scalar_one_or_none()
     if not user:
@@ -273,9 +256,11 @@ async def reset_password(request: Request, data: ResetPasswordRequest, db: Async
     if not reset_code:
         raise HTTPException(status_code=400, detail="Неверный или истёкший код")
 
+    try:
+        user.password_hash = await password_hasher.hash(data.new_password)
+    except HasherOverloaded:
+        raise _overloaded()
     reset_code.used = True
-    loop = asyncio.get_running_loop()
-    user.password_hash = await loop.run_in_executor(None, hash_password, data.new_password)
     await db.flush()
 
     return {"message": "Пароль успешно изменён"}
@@ -292,26 +277,34 @@ async def save_push_token(
     return {"message": "Push-токен сохранён"}
 
 
-@router.get("/users/search")
-@limiter.limit("20/minute")
+@router.get("/users/search", dependencies=[Depends(rate_limit("20/minute", "user_search"))])
 async def search_users(
-    request: Request,
+    response: Response,
     q: str,
-    user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(20, ge=1, le=50),
+    cursor: str | None = Query(None),
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
+    """Ranked user search; the next page's cursor is sent in X-Next-Cursor."""
+    q = q.strip()
     if len(q) < 2 or len(q) > 100:
         return []
-    # Escape LIKE wildcards
-    safe_q = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
-    result = await db.execute(
-        select(User)
-        .where(
-            User.id != user.id,
-            (User.username.ilike(f"%{safe_q}%")) | (User.full_name.ilike(f"%{safe_q}%"))
-        )
-        .limit(20)
-    )
-    users = result.scalars().all()
-    from app.schemas.user import UserPublicResponse
-    return [UserPublicResponse.model_validate(u) for u in users]
+    after = decode_cursor(cursor, int, int, int, UUID) if cursor else None
+
+    cache_key = (user_id, q.lower(), limit)
+    page = search_cache.get(cache_key) if after is None else None
+    if page is None:
+        rows = await user_search.search_users(db, user_id, q, limit, after)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(*rows[-1][1])
+        page = ([UserPublicResponse.model_validate(u) for u, _ in rows], next_cursor)
+        if after is None:
+            search_cache.put(cache_key, page)
+
+    users, next_cursor = page
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
@@ -1,6 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
+from app.config import get_settings
 from app.services.autofill_service import fetch_metadata
+from app.services.rate_limit import rate_limit
+
+settings = get_settings()
 
 router = APIRouter()
 
@@ -9,7 +13,7 @@ class AutoFillRequest(BaseModel):
     url: str
 
 
-@router.post("")
+@router.post("", dependencies=[Depends(rate_limit(settings.autofill_rate_limit, "autofill"))])
 async def autofill(data: AutoFillRequest):
     result = await fetch_metadata(data.url)
     return result
@@ -10,28 +10,31 @@ from app.models.wishlist import Wishlist
 from app.models.contribution import Contribution
 from app.schemas.contribution import ContributionCreate, ContributionResponse, ContributionDeleteRequest
 from app.dependencies import get_optional_user
+from app.services.public_cache import mark_wishlist_changed
 from app.services.websocket_manager import ws_manager
+from app.utils.query_budget import query_budget
 
 router = APIRouter()
 
 
 @router.post("/items/{item_id}/contribute", response_model=ContributionResponse, status_code=201)
+@query_budget(4)
 async def contribute(
     item_id: UUID,
     data: ContributionCreate,
     user: User | None = Depends(get_optional_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Item).where(Item.id == item_id))
-    item = result.scalar_one_or_none()
-    if not item:
+    result = await db.execute(
+        select(Item, Wishlist).join(Wishlist, Wishlist.id == Item.wishlist_id).where(Item.id == item_id)
+    )
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Подарок не найден")
+    item, wishlist = row
     if not item.is_group_gift:
         raise HTTPException(status_code=400, detail="Это не групповой подарок")
 
-    wl_result = await db.execute(select(Wishlist).where(Wishlist.id == item.wishlist_id))
-    wishlist = wl_result.scalar_one()
-
     if not wishlist.is_active:
         raise HTTPException(status_code=400, detail="Вишлист неактивен")
     if user and wishlist.owner_id == user.id:
@@ -39,11 +42,12 @@ async def contribute(
     if not user and not data.guest_name:
         raise HTTPException(status_code=400, detail="Укажите имя гостя")
 
+    totals = await db.execute(
+        select(sa_func.coalesce(sa_func.sum(Contribution.amount), 0), sa_func.count(Contribution.id))
+        .where(Contribution.item_id == item_id)
+    )
+    existing_total, existing_count = totals.one()
     if item.price and item.price > 0:
-        existing_total_result = await db.execute(
-            select(sa_func.coalesce(sa_func.sum(Contribution.amount), 0)).where(Contribution.item_id == item_id)
-        )
-        existing_total = existing_total_result.scalar_one()
         remaining = item.price - existing_total
         if remaining <= 0:
             raise HTTPException(status_code=400, detail="Подарок уже полностью оплачен")
@@ -61,15 +65,12 @@ async def contribute(
     db.add(contribution)
     await db.flush()
 
-    totals = await db.execute(
-        select(sa_func.coalesce(sa_func.sum(Contribution.amount), 0), sa_func.count(Contribution.id))
-        .where(Contribution.item_id == item_id)
-    )
-    row = totals.one()
-    new_total = float(row[0])
-    count = row[1]
+    # Totals including this contribution, without summing again
+    new_total = float(existing_total + contribution.amount)
+    count = existing_count + 1
     progress = (new_total / float(item.price) * 100) if item.price and item.price > 0 else 0.0
 
+    mark_wishlist_changed(db, item.wishlist_id)
     await ws_manager.broadcast(str(item.wishlist_id), {
         "type": "contribution_added",
         "item_id": str(item_id),
@@ -114,6 +115,7 @@ async def remove_contribution(
     count = row[1]
     progress = (new_total / float(item.price) * 100) if item.price and item.price > 0 else 0.0
 
+    mark_wishlist_changed(db, item.wishlist_id)
     await ws_manager.broadcast(str(item.wishlist_id), {
         "type": "contribution_removed",
         "item_id": str(item.id),
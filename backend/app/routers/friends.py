@@ -1,14 +1,15 @@
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, and_
+from sqlalchemy import select
 from app.database import get_db
 from app.models.user import User
 from app.models.friendship import Friendship
-from app.models.notification import Notification
+from app.models.friend_edge import FriendEdge
 from app.schemas.friendship import FriendshipResponse, FriendRequestResponse
 from app.dependencies import get_current_user
-from app.services.push import send_push_to_user
+from app.services import feed, friends
+from app.services.notifications import notify
 
 router = APIRouter()
 
@@ -16,28 +17,13 @@ router = APIRouter()
 @router.get("")
 async def get_friends(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     result = await db.execute(
-        select(Friendship).where(
-            or_(
-                and_(Friendship.requester_id == user.id, Friendship.status == "accepted"),
-                and_(Friendship.addressee_id == user.id, Friendship.status == "accepted"),
-            )
-        )
+        select(User, FriendEdge.friendship_id)
+        .join(FriendEdge, FriendEdge.friend_id == User.id)
+        .where(FriendEdge.user_id == user.id)
     )
-    friendships = result.scalars().all()
-
-    friend_ids = []
-    for f in friendships:
-        friend_ids.append(f.addressee_id if f.requester_id == user.id else f.requester_id)
-
-    if not friend_ids:
-        return []
-
-    users_result = await db.execute(select(User).where(User.id.in_(friend_ids)))
-    friends = users_result.scalars().all()
-
     return [
         FriendshipResponse(
-            id=f.id,
+            id=friendship_id,
             user_id=u.id,
             full_name=u.full_name,
             username=u.username,
@@ -45,9 +31,7 @@ async def get_friends(user: User = Depends(get_current_user), db: AsyncSession =
             is_online=u.is_online,
             status="accepted",
         )
-        for u in friends
-        for f in friendships
-        if (f.requester_id == u.id or f.addressee_id == u.id) and u.id != user.id
+        for u, friendship_id in result.all()
     ]
 
 
@@ -89,33 +73,22 @@ async def send_friend_request(target_user_id: UUID, user: User = Depends(get_cur
     if not target.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
-    existing = await db.execute(
-        select(Friendship).where(
-            or_(
-                and_(Friendship.requester_id == user.id, Friendship.addressee_id == target_user_id),
-                and_(Friendship.requester_id == target_user_id, Friendship.addressee_id == user.id),
-            )
-        )
-    )
-    if existing.scalar_one_or_none():
+    if await friends.find_friendship(db, user.id, target_user_id):
         raise HTTPException(status_code=409, detail="Запрос уже существует")
 
     friendship = Friendship(requester_id=user.id, addressee_id=target_user_id)
     db.add(friendship)
+    await db.flush()
 
-    notification = Notification(
+    notify(
+        db,
         recipient_id=target_user_id,
-        sender_id=user.id,
+        sender=user,
         type="friend_request",
         title="Запрос в друзья",
         body=f"{user.full_name or user.username or 'Кто-то'} хочет добавить вас в друзья",
         data={"friendship_id": str(friendship.id)},
     )
-    db.add(notification)
-    await db.flush()
-
-    await send_push_to_user(db, target_user_id, "Запрос в друзья",
-        f"{user.full_name or user.username or 'Кто-то'} хочет добавить вас в друзья")
 
     return {"message": "Запрос отправлен"}
 
@@ -134,36 +107,32 @@ async def accept_friend_request(target_user_id: UUID, user: User = Depends(get_c
         raise HTTPException(status_code=404, detail="Запрос не найден")
 
     friendship.status = "accepted"
+    await db.flush()
+    await friends.link(db, friendship)
+    await feed.friends_linked(db, user.id, target_user_id)
 
-    notification = Notification(
+    notify(
+        db,
         recipient_id=target_user_id,
-        sender_id=user.id,
+        sender=user,
         type="friend_accepted",
         title="Запрос принят",
         body=f"{user.full_name or user.username or 'Кто-то'} принял ваш запрос в друзья",
     )
-    db.add(notification)
-    await db.flush()
-
-    await send_push_to_user(db, target_user_id, "Запрос принят",
-        f"{user.full_name or user.username or 'Кто-то'} принял ваш запрос в друзья")
 
     return {"message": "Запрос принят"}
 
 
 @router.delete("/{target_user_id}")
 async def remove_friend(target_user_id: UUID, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Friendship).where(
-            or_(
-                and_(Friendship.requester_id == user.id, Friendship.addressee_id == target_user_id),
-                and_(Friendship.requester_id == target_user_id, Friendship.addressee_id == user.id),
-            )
-        )
-    )
-    friendship = result.scalar_one_or_none()
+    friendship = await friends.find_friendship(db, user.id, target_user_id)
     if not friendship:
         raise HTTPException(status_code=404, detail="Дружба не найдена")
 
+    was_accepted = friendship.status == "accepted"
     await db.delete(friendship)
+    if was_accepted:
+        await db.flush()
+        await friends.unlink(db, user.id, target_user_id)
+        await feed.friends_unlinked(db, user.id, target_user_id)
     return {"message": "Удалено из друзей"}
@@ -1,22 +1,91 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Literal
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, case
-from app.database import get_db
+from sqlalchemy import select
+from app.config import get_settings
+from app.database import async_session, get_db
 from app.models.user import User
 from app.models.wishlist import Wishlist
 from app.models.item import Item
-from app.schemas.item import ItemCreate, ItemUpdate, ItemResponse
-from app.dependencies import get_current_user
+from app.schemas.item import ItemCreate, ItemUpdate, ItemResponse, ItemSearchResponse
+from app.dependencies import get_current_user, get_current_user_id
+from app.services import counters, feed, item_transfer, ordering, user_stats
+from app.services.item_search import ItemSearchFilters, search_items as run_item_search
+from app.services.public_cache import mark_wishlist_changed
 from app.services.websocket_manager import ws_manager
+from app.utils.pagination import encode_cursor, decode_cursor
 
 
 class ReorderRequest(BaseModel):
     item_ids: list[UUID]
 
+
+class MoveRequest(BaseModel):
+    after_id: UUID | None = None
+
+settings = get_settings()
 router = APIRouter()
 
+IMPORT_SUFFIXES = {".csv": "text/csv", ".ndjson": "application/x-ndjson", ".jsonl": "application/x-ndjson"}
+
+
+@router.get("/items/search", response_model=list[ItemSearchResponse])
+async def search_items(
+    response: Response,
+    q: str | None = Query(None, max_length=200),
+    min_price: Decimal | None = Query(None, ge=0),
+    max_price: Decimal | None = Query(None, ge=0),
+    priority: Literal["must_have", "nice_to_have", "dream", "normal"] | None = Query(None),
+    source_domain: str | None = Query(None, max_length=255),
+    is_group_gift: bool | None = Query(None),
+    category: str | None = Query(None, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None),
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """Search items in the caller's own, shared and friends' wishlists; the next page's cursor is sent in X-Next-Cursor."""
+    filters = ItemSearchFilters(
+        q=q.strip() if q else None,
+        min_price=min_price,
+        max_price=max_price,
+        priority=priority,
+        source_domain=source_domain,
+        is_group_gift=is_group_gift,
+        category=category,
+    )
+    after = decode_cursor(cursor, int, datetime.fromisoformat, UUID) if cursor else None
+    rows = await run_item_search(db, user_id, filters, limit, after)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(*rows[-1][2])
+
+    return [
+        ItemSearchResponse(
+            id=item.id,
+            wishlist_id=wishlist.id,
+            wishlist_title=wishlist.title,
+            owner_id=wishlist.owner_id,
+            name=item.name,
+            description=item.description,
+            url=item.url,
+            image_url=item.image_url,
+            price=item.price,
+            currency=item.currency,
+            source_domain=item.source_domain,
+            is_group_gift=item.is_group_gift,
+            priority=item.priority,
+            created_at=item.created_at,
+        )
+        for item, wishlist, _ in rows
+    ]
+
 
 @router.post("/wishlists/{wishlist_id}/items", response_model=ItemResponse, status_code=201)
 async def create_item(
@@ -30,21 +99,15 @@ async def create_item(
     if not wishlist:
         raise HTTPException(status_code=404, detail="Вишлист не найден")
 
-    max_order = await db.execute(
-        select(Item.sort_order).where(Item.wishlist_id == wishlist_id).order_by(Item.sort_order.desc()).limit(1)
-    )
-    max_val = max_order.scalar_one_or_none() or 0
-
-    item = Item(wishlist_id=wishlist_id, sort_order=max_val + 1, **data.model_dump())
+    item = Item(wishlist_id=wishlist_id, **data.model_dump())
     db.add(item)
     await db.flush()
 
-    # Update counter atomically
-    await db.execute(
-        update(Wishlist).where(Wishlist.id == wishlist_id)
-        .values(item_count=Wishlist.item_count + 1)
-    )
+    await counters.items_added(db, wishlist_id)
+    await user_stats.items_added(db, user.id, [item.price])
+    await feed.wishlist_changed(db, wishlist_id, user.id, touch=True)
 
+    mark_wishlist_changed(db, wishlist_id)
     await ws_manager.broadcast(str(wishlist_id), {
         "type": "item_added",
         "item": {"id": str(item.id), "name": item.name},
@@ -53,6 +116,103 @@ async def create_item(
     return ItemResponse.model_validate(item)
 
 
+async def _read_limited(request: Request, limit: int) -> bytes:
+    """The request body, refused with 413 as soon as it passes ``limit`` (chunked bodies included)."""
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Файл слишком большой")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def _read_upload(request: Request) -> tuple[str, bytes]:
+    """Format and raw bytes of an import, sent as the request body or as a multipart ``file`` field."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.item_import_max_bytes:
+        raise HTTPException(status_code=413, detail="Файл слишком большой")
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "multipart/form-data":
+        # Room for the part headers and boundaries around the file
+        raw = await _read_limited(request, settings.item_import_max_bytes + 64 * 1024)
+
+        async def replay():
+            return {"type": "http.request", "body": raw, "more_body": False}
+
+        form = await Request(request.scope, replay).form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Файл не передан")
+        suffix = "." + (upload.filename or "").rsplit(".", 1)[-1].lower()
+        content_type = IMPORT_SUFFIXES.get(suffix) or (upload.content_type or "").split(";")[0].strip().lower()
+        body = await upload.read()
+    else:
+        body = await _read_limited(request, settings.item_import_max_bytes)
+
+    if len(body) > settings.item_import_max_bytes:
+        raise HTTPException(status_code=413, detail="Файл слишком большой")
+    return content_type, body
+
+
+@router.post("/wishlists/{wishlist_id}/items/bulk", response_model=list[ItemResponse], status_code=201)
+async def import_items(
+    wishlist_id: UUID,
+    request: Request,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Add many items at once from a JSON array, NDJSON or CSV; all rows are validated before any is written."""
+    result = await db.execute(select(Wishlist.id).where(Wishlist.id == wishlist_id, Wishlist.owner_id == user.id))
+    if not result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Вишлист не найден")
+
+    content_type, body = await _read_upload(request)
+    try:
+        data = item_transfer.parse_items(content_type, body, settings.item_import_max_items)
+    except item_transfer.ItemImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    items = await item_transfer.insert_items(db, wishlist_id, data)
+
+    await counters.items_added(db, wishlist_id, len(items))
+    await user_stats.items_added(db, user.id, [item.price for item in items])
+    await feed.wishlist_changed(db, wishlist_id, user.id, touch=True)
+
+    mark_wishlist_changed(db, wishlist_id)
+    await ws_manager.broadcast(str(wishlist_id), {
+        "type": "items_added",
+        "items": [{"id": str(item.id), "name": item.name} for item in items],
+    })
+
+    return [ItemResponse.model_validate(item) for item in items]
+
+
+@router.get("/wishlists/{wishlist_id}/items/export")
+async def export_items(
+    wishlist_id: UUID,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream the wishlist's items as NDJSON in display order; the output can be fed back to /items/bulk."""
+    result = await db.execute(select(Wishlist.id).where(Wishlist.id == wishlist_id, Wishlist.owner_id == user.id))
+    if not result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Вишлист не найден")
+
+    async def lines():
+        # get_db's session is closed before the body is sent, so the stream opens its own
+        async with async_session() as session:
+            async for line in item_transfer.stream_items(session, wishlist_id):
+                yield line
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="wishlist-{wishlist_id}.ndjson"'},
+    )
+
+
 @router.put("/items/{item_id}", response_model=ItemResponse)
 async def update_item(
     item_id: UUID,
@@ -67,10 +227,14 @@ async def update_item(
     if not item:
         raise HTTPException(status_code=404, detail="Подарок не найден")
 
+    old_price = item.price
     for key, value in data.model_dump(exclude_unset=True).items():
         setattr(item, key, value)
     await db.flush()
 
+    await user_stats.price_changed(db, user.id, old_price, item.price)
+    await feed.wishlist_changed(db, item.wishlist_id, user.id, touch=True)
+    mark_wishlist_changed(db, item.wishlist_id)
     await ws_manager.broadcast(str(item.wishlist_id), {
         "type": "item_updated",
         "item": {"id": str(item.id), "name": item.name},
@@ -93,18 +257,14 @@ async def delete_item(
         raise HTTPException(status_code=404, detail="Подарок не найден")
 
     wishlist_id = item.wishlist_id
+    # Counters first: reservations and categories are gone once the item is
+    await counters.item_removed(db, wishlist_id, item_id)
+    await user_stats.item_removed(db, user.id, item)
     await db.delete(item)
     await db.flush()
+    await feed.wishlist_changed(db, wishlist_id, user.id, touch=True)
 
-    # Update counter atomically
-    await db.execute(
-        update(Wishlist).where(Wishlist.id == wishlist_id)
-        .values(item_count=case(
-            (Wishlist.item_count > 0, Wishlist.item_count - 1),
-            else_=0
-        ))
-    )
-
+    mark_wishlist_changed(db, wishlist_id)
     await ws_manager.broadcast(str(wishlist_id), {
         "type": "item_deleted",
         "item_id": str(item_id),
@@ -120,24 +280,49 @@ async def reorder_items(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(select(Wishlist).where(Wishlist.id == wishlist_id, Wishlist.owner_id == user.id))
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=404, detail="Вишлист не найден")
-
-    items_result = await db.execute(
-        select(Item).where(Item.wishlist_id == wishlist_id)
-    )
-    items_map = {item.id: item for item in items_result.scalars().all()}
+    item_ids = list(dict.fromkeys(data.item_ids))
+    updated = await ordering.reorder(db, wishlist_id, user.id, item_ids)
 
-    for idx, item_id in enumerate(data.item_ids):
-        item = items_map.get(item_id)
-        if not item:
-            raise HTTPException(status_code=400, detail=f"Подарок {item_id} не найден в этом вишлисте")
-        item.sort_order = idx
+    if len(updated) != len(item_ids):
+        # Only the failure path pays for telling "not yours" apart from "bad id"; get_db rolls back
+        result = await db.execute(select(Wishlist.id).where(Wishlist.id == wishlist_id, Wishlist.owner_id == user.id))
+        if not result.scalar_one_or_none():
+            raise HTTPException(status_code=404, detail="Вишлист не найден")
+        missing = next(i for i in item_ids if i not in updated)
+        raise HTTPException(status_code=400, detail=f"Подарок {missing} не найден в этом вишлисте")
 
-    await db.flush()
+    mark_wishlist_changed(db, wishlist_id)
     await ws_manager.broadcast(str(wishlist_id), {
         "type": "items_reordered",
-        "item_ids": [str(i) for i in data.item_ids],
+        "item_ids": [str(i) for i in item_ids],
     })
     return {"message": "Порядок обновлён"}
+
+
+@router.patch("/items/{item_id}/position")
+async def move_item(
+    item_id: UUID,
+    data: MoveRequest,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Move one item directly after ``after_id`` (null = to the top); only that row is written."""
+    result = await db.execute(
+        select(Item).join(Wishlist).where(Item.id == item_id, Wishlist.owner_id == user.id)
+    )
+    item = result.scalar_one_or_none()
+    if not item:
+        raise HTTPException(status_code=404, detail="Подарок не найден")
+
+    try:
+        sort_order = await ordering.move(db, item, data.after_id)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Подарок {data.after_id} не найден в этом вишлисте")
+
+    mark_wishlist_changed(db, item.wishlist_id)
+    await ws_manager.broadcast(str(item.wishlist_id), {
+        "type": "item_moved",
+        "item_id": str(item_id),
+        "after_id": str(data.after_id) if data.after_id else None,
+    })
+    return {"sort_order": sort_order}
@@ -8,20 +8,24 @@ from app.models.user import User
 from app.models.item import Item
 from app.models.item_like import ItemLike
 from app.models.wishlist import Wishlist
-from app.models.notification import Notification
 from app.schemas.item import ItemResponse
 from app.dependencies import get_current_user
-from app.services.push import send_push_to_user
+from app.services.notifications import notify
+from app.utils.query_budget import query_budget
 
 router = APIRouter()
 
 
 @router.post("/items/{item_id}/like", status_code=201)
+@query_budget(4)
 async def like_item(item_id: UUID, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(Item).where(Item.id == item_id))
-    item = result.scalar_one_or_none()
-    if not item:
+    result = await db.execute(
+        select(Item, Wishlist).join(Wishlist, Wishlist.id == Item.wishlist_id).where(Item.id == item_id)
+    )
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Подарок не найден")
+    item, wishlist = row
 
     existing = await db.execute(
         select(ItemLike).where(ItemLike.item_id == item_id, ItemLike.user_id == user.id)
@@ -33,20 +37,17 @@ async def like_item(item_id: UUID, user: User = Depends(get_current_user), db: A
     db.add(like)
 
     # Notify wishlist owner
-    wl_result = await db.execute(select(Wishlist).where(Wishlist.id == item.wishlist_id))
-    wishlist = wl_result.scalar_one()
     if wishlist.owner_id != user.id:
-        notification = Notification(
+        notify(
+            db,
             recipient_id=wishlist.owner_id,
-            sender_id=user.id,
+            sender=user,
             type="item_liked",
             title="Лайк",
             body=f"{user.full_name or user.username or 'Кто-то'} лайкнул «{item.name}»",
+            target_name=item.name,
             data={"item_id": str(item_id), "wishlist_id": str(wishlist.id)},
         )
-        db.add(notification)
-        await send_push_to_user(db, wishlist.owner_id, "Лайк",
-            f"{user.full_name or user.username or 'Кто-то'} лайкнул «{item.name}»")
 
     await db.flush()
     return {"message": "Лайк добавлен"}
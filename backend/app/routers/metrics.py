@@ -0,0 +1,124 @@
+import hmac
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from app.config import get_settings
+from app.database import engine, replica_engine
+from app.services import autofill_service
+from app.services.friends import friend_cache
+from app.services.notifications import notification_fanout
+from app.services.password_hasher import password_hasher
+from app.services.public_cache import public_cache
+from app.services.push import push_dispatcher
+from app.services.rate_limit import limiter
+from app.services.read_routing import read_router
+from app.services.refresh_tokens import family_cache
+from app.services.user_cache import user_cache
+from app.services.websocket_manager import ws_manager
+from app.utils.db_pool import pool_families, pool_status
+from app.utils.metrics import Family, render
+from app.utils.security import token_cache
+
+router = APIRouter()
+# Mounted at the root: GET /metrics, where Prometheus looks by default
+prometheus_router = APIRouter()
+settings = get_settings()
+
+CACHES = {
+    "user": user_cache,
+    "token": token_cache,
+    "friends": friend_cache,
+    "public_wishlist": public_cache,
+    "refresh_family": family_cache,
+}
+
+
+def require_metrics_access(request: Request):
+    """Bearer ``metrics_token``; without one configured, only open in development."""
+    if settings.metrics_token:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(token, settings.metrics_token):
+            return
+    elif settings.environment == "development":
+        return
+    raise HTTPException(status_code=404, detail="Не найдено")
+
+
+@router.get("", dependencies=[Depends(require_metrics_access)])
+async def get_metrics():
+    return {
+        "db_pool": pool_status(engine),
+        "replica_pool": pool_status(replica_engine) if replica_engine is not None else None,
+        "read_routing": read_router.metrics(),
+        "password_hasher": password_hasher.metrics(),
+        "push": push_dispatcher.metrics(),
+        "notifications": notification_fanout.metrics(),
+        "websockets": ws_manager.metrics(),
+        "autofill": autofill_service.stats,
+        "caches": {name: cache.stats for name, cache in CACHES.items()},
+        "rate_limit": limiter.stats,
+    }
+
+
+def _families() -> list[Family]:
+    """Scrape-time view of the stats services keep for themselves."""
+    families = pool_families(engine, "primary")
+    if replica_engine is not None:
+        families += pool_families(replica_engine, "replica")
+
+    routing = read_router.metrics()
+    hasher = password_hasher.metrics()
+    push = push_dispatcher.metrics()
+    fanout = notification_fanout.metrics()
+    sockets = ws_manager.metrics()
+    families += [
+        Family("db_reads_total", "counter", "Read-only sessions by target", [
+            ({"target": "replica"}, routing["replica_reads"]),
+            ({"target": "primary"}, routing["primary_reads"]),
+        ]),
+        Family("password_hasher_workers", "gauge", "bcrypt worker threads", [({}, hasher["workers"])]),
+        Family("password_hasher_in_flight", "gauge", "Hash jobs running or queued", [({}, hasher["in_flight"])]),
+        Family("password_hasher_jobs_total", "counter", "Hash jobs by outcome", [
+            ({"result": "completed"}, hasher["completed"]),
+            ({"result": "rejected"}, hasher["rejected"]),
+        ]),
+        Family("password_hasher_wait_seconds_total", "counter", "Time hash jobs spent queued",
+               [({}, password_hasher.stats["wait_seconds_total"])]),
+        Family("push_messages_total", "counter", "Push messages by outcome", [
+            ({"result": result}, push[result]) for result in ("queued", "sent", "failed", "pruned")
+        ]),
+        Family("push_batches_total", "counter", "Push batches sent to Expo", [({}, push["batches"])]),
+        Family("push_queue_depth", "gauge", "Push messages waiting to be batched", [({}, push["queue_depth"])]),
+        Family("push_batches_in_flight", "gauge", "Push batches being sent", [({}, push["batches_in_flight"])]),
+        Family("push_pending_receipts", "gauge", "Push tickets awaiting a receipt check", [({}, push["pending_receipts"])]),
+        Family("notification_events_total", "counter", "Notification events by stage", [
+            ({"stage": stage}, fanout[stage]) for stage in ("events", "written", "coalesced")
+        ]),
+        Family("notification_pending", "gauge", "Coalesced notifications not yet written", [({}, fanout["pending"])]),
+        Family("websocket_rooms", "gauge", "Wishlist rooms with a live socket", [({}, sockets["rooms"])]),
+        Family("websocket_connections", "gauge", "Open WebSocket connections", [({}, sockets["sockets"])]),
+        Family("autofill_requests_total", "counter", "Autofill lookups by cache result", [
+            ({"result": "hit"}, autofill_service.stats["cache_hits"]),
+            ({"result": "miss"}, autofill_service.stats["cache_misses"]),
+        ]),
+        Family("autofill_fetch_failures_total", "counter", "Autofill pages that could not be fetched",
+               [({}, autofill_service.stats["fetch_failures"])]),
+        Family("cache_requests_total", "counter", "In-process cache lookups by result", [
+            ({"cache": name, "result": result}, count)
+            for name, cache in CACHES.items() for result, count in cache.stats.items()
+        ]),
+        Family("rate_limit_decisions_total", "counter", "Rate limiter decisions", [
+            ({"result": result}, count) for result, count in limiter.stats.items()
+        ]),
+    ]
+    if routing["enabled"]:
+        families.append(Family("db_replica_up", "gauge", "Replica reachable at the last lag check",
+                               [({}, routing["lag_seconds"] is not None)]))
+        if routing["lag_seconds"] is not None:
+            families.append(Family("db_replica_lag_seconds", "gauge", "Replica replay lag",
+                                   [({}, routing["lag_seconds"])]))
+    return families
+
+
+@prometheus_router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+async def prometheus_metrics():
+    return PlainTextResponse(render(_families()), media_type="text/plain; version=0.0.4; charset=utf-8")
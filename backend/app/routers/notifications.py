@@ -1,12 +1,16 @@
+from datetime import datetime
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, tuple_
+from sqlalchemy.orm import aliased
 from app.database import get_db
 from app.models.user import User
 from app.models.notification import Notification
-from app.schemas.notification import NotificationResponse
-from app.dependencies import get_current_user
+from app.schemas.notification import NotificationResponse, UnreadCountResponse
+from app.dependencies import get_current_user_id, get_read_db
+from app.services.notifications import get_unread_count, mark_unread_changed
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter()
 
@@ -19,26 +23,37 @@ TYPE_FILTERS = {
 
 @router.get("")
 async def get_notifications(
+    response: Response,
     type: str = Query("all"),
-    user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None),
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = select(Notification).where(Notification.recipient_id == user.id)
+    """Newest-first page of notifications; the next page's cursor is sent in X-Next-Cursor."""
+    Sender = aliased(User)
+    query = (
+        select(Notification, Sender.full_name, Sender.username, Sender.avatar_url)
+        .outerjoin(Sender, Sender.id == Notification.sender_id)
+        .where(Notification.recipient_id == user_id)
+    )
 
     if type != "all" and type in TYPE_FILTERS:
         query = query.where(Notification.type.in_(TYPE_FILTERS[type]))
 
-    query = query.order_by(Notification.created_at.desc()).limit(100)
+    if cursor:
+        created_at, last_id = decode_cursor(cursor, datetime.fromisoformat, UUID)
+        query = query.where(tuple_(Notification.created_at, Notification.id) < tuple_(created_at, last_id))
+
+    # Matches ix_notifications_recipient_created (recipient_id, created_at DESC, id DESC)
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1)
     result = await db.execute(query)
-    notifications = result.scalars().all()
+    rows = result.all()
 
-    # Fetch sender info
-    sender_ids = [n.sender_id for n in notifications if n.sender_id]
-    senders = {}
-    if sender_ids:
-        from app.models.user import User as UserModel
-        sender_result = await db.execute(select(UserModel).where(UserModel.id.in_(sender_ids)))
-        senders = {u.id: u for u in sender_result.scalars().all()}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
 
     return [
         NotificationResponse(
@@ -48,32 +63,40 @@ async def get_notifications(
             body=n.body,
             data=n.data or {},
             is_read=n.is_read,
-            sender_name=senders[n.sender_id].full_name if n.sender_id in senders else None,
-            sender_username=senders[n.sender_id].username if n.sender_id in senders else None,
-            sender_avatar=senders[n.sender_id].avatar_url if n.sender_id in senders else None,
+            sender_name=sender_name,
+            sender_username=sender_username,
+            sender_avatar=sender_avatar,
             created_at=n.created_at,
         )
-        for n in notifications
+        for n, sender_name, sender_username, sender_avatar in rows
     ]
 
 
+@router.get("/unread-count", response_model=UnreadCountResponse)
+async def unread_count(user_id: UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    return UnreadCountResponse(count=await get_unread_count(db, user_id))
+
+
 @router.post("/read-all")
-async def mark_all_read(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def mark_all_read(user_id: UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     await db.execute(
         update(Notification)
-        .where(Notification.recipient_id == user.id, Notification.is_read == False)
+        .where(Notification.recipient_id == user_id, Notification.is_read == False)
         .values(is_read=True)
     )
+    mark_unread_changed(db, user_id)
     return {"message": "Все отмечены как прочитанные"}
 
 
 @router.delete("/{notification_id}")
-async def delete_notification(notification_id: UUID, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+async def delete_notification(notification_id: UUID, user_id: UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     result = await db.execute(
-        select(Notification).where(Notification.id == notification_id, Notification.recipient_id == user.id)
+        select(Notification).where(Notification.id == notification_id, Notification.recipient_id == user_id)
     )
     notification = result.scalar_one_or_none()
     if not notification:
         raise HTTPException(status_code=404, detail="Уведомление не найдено")
     await db.delete(notification)
+    if not notification.is_read:
+        mark_unread_changed(db, user_id)
     return {"message": "Уведомление удалено"}
@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import select, update, case
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload, joinedload
 from app.database import get_db
 from app.models.user import User
@@ -15,7 +15,10 @@ from app.schemas.reservation import (
     PurchasedUpdate, ThanksCreate,
 )
 from app.dependencies import get_current_user, get_optional_user
+from app.services import counters, user_stats
+from app.services.public_cache import mark_wishlist_changed
 from app.services.websocket_manager import ws_manager
+from app.utils.query_budget import query_budget
 
 router = APIRouter()
 
@@ -96,12 +99,10 @@ async def reserve_item(
         await db.rollback()
         raise HTTPException(status_code=409, detail="Конфликт бронирования")
 
-    # Update counter atomically
-    await db.execute(
-        update(Wishlist).where(Wishlist.id == item.wishlist_id)
-        .values(reserved_count=Wishlist.reserved_count + 1)
-    )
+    await counters.reservation_added(db, item.wishlist_id, item_id)
+    await user_stats.reservation_added(db, wishlist.owner_id, reservation.reserver_id)
 
+    mark_wishlist_changed(db, item.wishlist_id)
     await ws_manager.broadcast(str(item.wishlist_id), {
         "type": "item_reserved",
         "item_id": str(item_id),
@@ -128,6 +129,7 @@ async def mark_purchased(
 
 
 @router.post("/reservations/{reservation_id}/thanks")
+@query_budget(3)
 async def send_thanks(
     reservation_id: UUID,
     data: ThanksCreate,
@@ -135,18 +137,18 @@ async def send_thanks(
     db: AsyncSession = Depends(get_db),
 ):
     result = await db.execute(
-        select(Reservation).where(Reservation.id == reservation_id)
-        .options(joinedload(Reservation.item))
+        select(Reservation, Wishlist.owner_id)
+        .join(Item, Item.id == Reservation.item_id)
+        .join(Wishlist, Wishlist.id == Item.wishlist_id)
+        .where(Reservation.id == reservation_id)
     )
-    reservation = result.scalar_one_or_none()
-    if not reservation:
+    row = result.one_or_none()
+    if not row:
         raise HTTPException(status_code=404, detail="Бронирование не найдено")
+    reservation, owner_id = row
 
     # Only wishlist owner can send thanks
-    item = reservation.item
-    wl_result = await db.execute(select(Wishlist).where(Wishlist.id == item.wishlist_id))
-    wishlist = wl_result.scalar_one()
-    if wishlist.owner_id != user.id:
+    if owner_id != user.id:
         raise HTTPException(status_code=403, detail="Только владелец вишлиста может отправить благодарность")
 
     reservation.thanks_sent = True
@@ -177,18 +179,15 @@ async def unreserve_item(
     item_result = await db.execute(select(Item).where(Item.id == reservation.item_id))
     item = item_result.scalar_one()
 
+    reserver_id = reservation.reserver_id
     await db.delete(reservation)
     await db.flush()
 
-    # Decrement counter atomically
-    await db.execute(
-        update(Wishlist).where(Wishlist.id == item.wishlist_id)
-        .values(reserved_count=case(
-            (Wishlist.reserved_count > 0, Wishlist.reserved_count - 1),
-            else_=0
-        ))
-    )
+    await counters.reservation_removed(db, item.wishlist_id, item.id)
+    owner_id = await db.scalar(select(Wishlist.owner_id).where(Wishlist.id == item.wishlist_id))
+    await user_stats.reservation_removed(db, owner_id, reserver_id)
 
+    mark_wishlist_changed(db, item.wishlist_id)
     await ws_manager.broadcast(str(item.wishlist_id), {
         "type": "item_unreserved",
         "item_id": str(item.id),
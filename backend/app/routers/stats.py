@@ -1,95 +1,74 @@
+from datetime import date, datetime, timezone
+from uuid import UUID
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func as sa_func, extract
+from sqlalchemy import select
 from app.database import get_db
 from app.models.user import User
-from app.models.item import Item
-from app.models.wishlist import Wishlist
-from app.models.reservation import Reservation
-from app.models.item_category import ItemCategory
+from app.models.user_stats import UserStats
 from app.schemas.stats import UserStatsResponse, MonthlyActivity, TopGiver
-from app.dependencies import get_current_user
+from app.dependencies import get_current_user_id, get_read_db
+from app.services.user_stats import get_user_stats
 
 router = APIRouter()
 
+MONTHS = ["Янв", "Фев", "Мар", "Апр", "Май", "Июн", "Июл", "Авг", "Сен", "Окт", "Ноя", "Дек"]
 
-@router.get("/me", response_model=UserStatsResponse)
-async def get_my_stats(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    # Total gifts (items across all wishlists)
-    total_result = await db.execute(
-        select(sa_func.count(Item.id))
-        .join(Wishlist, Item.wishlist_id == Wishlist.id)
-        .where(Wishlist.owner_id == user.id)
-    )
-    total_gifts = total_result.scalar_one() or 0
 
-    # Reserved count
-    reserved_result = await db.execute(
-        select(sa_func.count(Reservation.id))
-        .join(Item, Reservation.item_id == Item.id)
-        .join(Wishlist, Item.wishlist_id == Wishlist.id)
-        .where(Wishlist.owner_id == user.id)
-    )
-    reserved_count = reserved_result.scalar_one() or 0
+def _last_months(n: int, today: date) -> list[tuple[int, int]]:
+    """(year, month) for the last ``n`` calendar months, oldest first."""
+    months = []
+    year, month = today.year, today.month
+    for _ in range(n):
+        months.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months[::-1]
 
-    # Top category
-    cat_result = await db.execute(
-        select(ItemCategory.category, sa_func.count(ItemCategory.id).label("cnt"))
-        .join(Item, ItemCategory.item_id == Item.id)
-        .join(Wishlist, Item.wishlist_id == Wishlist.id)
-        .where(Wishlist.owner_id == user.id)
-        .group_by(ItemCategory.category)
-        .order_by(sa_func.count(ItemCategory.id).desc())
-        .limit(1)
-    )
-    top_cat_row = cat_result.first()
-    top_category = top_cat_row[0] if top_cat_row else None
 
-    # Average price
-    avg_result = await db.execute(
-        select(sa_func.avg(Item.price))
-        .join(Wishlist, Item.wishlist_id == Wishlist.id)
-        .where(Wishlist.owner_id == user.id, Item.price.isnot(None))
-    )
-    avg_price = float(avg_result.scalar_one() or 0)
+@router.get("/me", response_model=UserStatsResponse)
+async def get_my_stats(
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+    primary_db: AsyncSession = Depends(get_db),
+):
+    stats = await db.get(UserStats, user_id)
+    if stats is None:
+        # First visit: the row is computed and stored, which needs the primary
+        stats = await get_user_stats(primary_db, user_id)
 
-    # Monthly activity (last 6 months)
-    monthly_result = await db.execute(
-        select(
-            extract("month", Item.created_at).label("month"),
-            sa_func.count(Item.id),
-        )
-        .join(Wishlist, Item.wishlist_id == Wishlist.id)
-        .where(Wishlist.owner_id == user.id)
-        .group_by(extract("month", Item.created_at))
-        .order_by(extract("month", Item.created_at))
-        .limit(6)
-    )
-    months = ["Янв", "Фев", "Мар", "Апр", "Май", "Июн", "Июл", "Авг", "Сен", "Окт", "Ноя", "Дек"]
+    categories = stats.category_counts or {}
+    top_category = max(categories, key=categories.get) if categories else None
+    avg_price = float(stats.price_sum / stats.priced_count) if stats.priced_count else 0.0
+
+    # Last 6 calendar months, keyed by "YYYY-MM" so different years never merge
+    monthly = stats.monthly_counts or {}
     monthly_activity = [
-        MonthlyActivity(month=months[int(row[0]) - 1] if row[0] else "?", count=row[1])
-        for row in monthly_result.all()
+        MonthlyActivity(month=MONTHS[month - 1], count=monthly.get(f"{year:04d}-{month:02d}", 0))
+        for year, month in _last_months(6, datetime.now(timezone.utc).date())
     ]
 
     # Top givers (people who reserved items from user's wishlists)
-    givers_result = await db.execute(
-        select(User.id, User.full_name, User.username, User.avatar_url, sa_func.count(Reservation.id).label("cnt"))
-        .join(Reservation, Reservation.reserver_id == User.id)
-        .join(Item, Reservation.item_id == Item.id)
-        .join(Wishlist, Item.wishlist_id == Wishlist.id)
-        .where(Wishlist.owner_id == user.id, Reservation.reserver_id.isnot(None))
-        .group_by(User.id, User.full_name, User.username, User.avatar_url)
-        .order_by(sa_func.count(Reservation.id).desc())
-        .limit(5)
-    )
-    top_givers = [
-        TopGiver(user_id=str(row[0]), full_name=row[1], username=row[2], avatar_url=row[3], count=row[4])
-        for row in givers_result.all()
-    ]
+    giver_counts = stats.giver_counts or {}
+    top_ids = sorted(giver_counts, key=giver_counts.get, reverse=True)[:5]
+    top_givers = []
+    if top_ids:
+        result = await db.execute(select(User).where(User.id.in_([UUID(i) for i in top_ids])))
+        givers = {str(u.id): u for u in result.scalars().all()}
+        top_givers = [
+            TopGiver(
+                user_id=i,
+                full_name=givers[i].full_name,
+                username=givers[i].username,
+                avatar_url=givers[i].avatar_url,
+                count=giver_counts[i],
+            )
+            for i in top_ids
+            if i in givers
+        ]
 
     return UserStatsResponse(
-        total_gifts=total_gifts,
-        reserved_count=reserved_count,
+        total_gifts=stats.total_gifts,
+        reserved_count=stats.reserved_count,
         top_category=top_category,
         avg_price=avg_price,
         monthly_activity=monthly_activity,
@@ -3,14 +3,17 @@ from uuid import UUID
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.config import get_settings
 from app.database import get_db
 from app.models.wishlist import Wishlist
 from app.models.wishlist_access import WishlistAccess
-from app.models.friendship import Friendship
+from app.services import rate_limit
+from app.services.friends import are_friends
 from app.services.websocket_manager import ws_manager
 from app.utils.security import decode_token
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter()
 
 
@@ -22,6 +25,13 @@ async def websocket_endpoint(
     share_token: str | None = Query(default=None),
     db: AsyncSession = Depends(get_db),
 ):
+    # 0. Connect rate limit, per IP and per user of the token
+    payload = decode_token(token) if token else None
+    token_user = payload.get("sub") if payload and payload.get("type") == "access" else None
+    if await rate_limit.check(websocket, "ws_connect", settings.ws_connect_rate_limit, token_user):
+        await websocket.close(code=4029, reason="Too many connections")
+        return
+
     # 1. Fetch wishlist and check existence
     result = await db.execute(
         select(Wishlist).where(Wishlist.id == wishlist_id)
@@ -67,15 +77,7 @@ async def websocket_endpoint(
 
                     # Friends access
                     elif wishlist.privacy == "friends":
-                        friend_result = await db.execute(
-                            select(Friendship).where(
-                                (Friendship.status == "accepted") & (
-                                    ((Friendship.requester_id == wishlist.owner_id) & (Friendship.addressee_id == user_id)) |
-                                    ((Friendship.requester_id == user_id) & (Friendship.addressee_id == wishlist.owner_id))
-                                )
-                            )
-                        )
-                        if friend_result.scalar_one_or_none():
+                        if await are_friends(db, user_id, wishlist.owner_id):
                             is_authorized = True
 
     if not is_authorized:
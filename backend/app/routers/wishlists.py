@@ -1,24 +1,29 @@
+import json
+from datetime import datetime
 from uuid import UUID
-from decimal import Decimal
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func as sa_func
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy import select, true, String, func as sa_func
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from sqlalchemy.orm import joinedload
 from app.database import get_db
 from app.models.user import User
 from app.models.wishlist import Wishlist
 from app.models.item import Item
 from app.models.reservation import Reservation
 from app.models.contribution import Contribution
-from app.models.friendship import Friendship
 from app.models.wishlist_access import WishlistAccess
 from app.schemas.wishlist import (
     WishlistCreate, WishlistUpdate, WishlistResponse, WishlistPublicResponse,
     WishlistPrivacyUpdate, WishlistAccessGrant,
 )
 from app.schemas.item import ItemResponse, ItemPublicResponse
-from app.dependencies import get_current_user, get_optional_user
+from app.dependencies import get_current_user, get_current_user_id, get_optional_user, get_read_db
+from app.services import feed, user_stats
+from app.services.public_cache import public_cache, etag_matches, mark_wishlist_changed
 from app.services.websocket_manager import ws_manager
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter()
 
@@ -27,21 +32,55 @@ def _build_wishlist_response(wishlist: Wishlist) -> WishlistResponse:
     return WishlistResponse.model_validate(wishlist)
 
 
-async def _batch_contribution_stats(
-    db: AsyncSession, item_ids: list[UUID]
-) -> dict[UUID, tuple[Decimal, int]]:
-    if not item_ids:
-        return {}
+_reservation_stats = (
+    select(
+        sa_func.count(Reservation.id).label("reservation_count"),
+        sa_func.array_agg(
+            aggregate_order_by(Reservation.guest_name, Reservation.created_at), type_=ARRAY(String)
+        )[1].label("first_reserver_name"),
+    )
+    .where(Reservation.item_id == Item.id)
+    .lateral("reservation_stats")
+)
+
+_contribution_stats = (
+    select(
+        sa_func.coalesce(sa_func.sum(Contribution.amount), 0).label("contribution_total"),
+        sa_func.count(Contribution.id).label("contribution_count"),
+    )
+    .where(Contribution.item_id == Item.id)
+    .lateral("contribution_stats")
+)
+
+
+async def _load_item_rows(db: AsyncSession, wishlist_id: UUID) -> list:
+    """Items of a wishlist with reservation and contribution aggregates, in one statement.
+
+    Returns plain row mappings (no ORM entities), already ordered by sort_order.
+    """
     result = await db.execute(
         select(
-            Contribution.item_id,
-            sa_func.coalesce(sa_func.sum(Contribution.amount), 0),
-            sa_func.count(Contribution.id),
+            Item.id, Item.wishlist_id, Item.name, Item.description, Item.url, Item.image_url,
+            Item.price, Item.currency, Item.source_domain, Item.is_group_gift, Item.priority,
+            Item.sort_order, Item.is_liked_by_owner, Item.created_at,
+            _reservation_stats.c.reservation_count,
+            _reservation_stats.c.first_reserver_name,
+            _contribution_stats.c.contribution_total,
+            _contribution_stats.c.contribution_count,
         )
-        .where(Contribution.item_id.in_(item_ids))
-        .group_by(Contribution.item_id)
+        .select_from(Item)
+        .join(_reservation_stats, true())
+        .join(_contribution_stats, true())
+        .where(Item.wishlist_id == wishlist_id)
+        .order_by(Item.sort_order, Item.created_at)
     )
-    return {row[0]: (row[1], row[2]) for row in result.all()}
+    return result.mappings().all()
+
+
+def _progress(row) -> float:
+    price = row["price"]
+    progress = float(row["contribution_total"] / price * 100) if price and price > 0 else 0.0
+    return min(progress, 100.0)
 
 
 @router.get("", response_model=list[WishlistResponse])
@@ -59,31 +98,27 @@ async def create_wishlist(data: WishlistCreate, user: User = Depends(get_current
     wishlist = Wishlist(owner_id=user.id, **data.model_dump())
     db.add(wishlist)
     await db.flush()
+    await feed.wishlist_changed(db, wishlist.id, user.id)
     return _build_wishlist_response(wishlist)
 
 
 @router.get("/friends")
-async def get_friends_wishlists(user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    """Get wishlists from friends (feed)."""
-    friend_ids_q = select(Friendship.addressee_id).where(
-        Friendship.requester_id == user.id, Friendship.status == "accepted"
-    ).union(
-        select(Friendship.requester_id).where(
-            Friendship.addressee_id == user.id, Friendship.status == "accepted"
-        )
-    )
-    result = await db.execute(
-        select(Wishlist)
-        .where(
-            Wishlist.owner_id.in_(friend_ids_q),
-            Wishlist.is_active == True,
-            Wishlist.privacy.in_(["public", "friends"]),
-        )
-        .options(joinedload(Wishlist.user))
-        .order_by(Wishlist.updated_at.desc())
-        .limit(50)
-    )
-    wishlists = result.scalars().all()
+async def get_friends_wishlists(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: str | None = Query(None),
+    user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Get wishlists from friends (feed); the next page's cursor is sent in X-Next-Cursor."""
+    after = decode_cursor(cursor, datetime.fromisoformat, UUID) if cursor else None
+    rows = await feed.load_feed(db, user_id, limit, after)
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, position = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(position, last.id)
+
     return [
         {
             **_build_wishlist_response(w).model_dump(),
@@ -91,57 +126,53 @@ async def get_friends_wishlists(user: User = Depends(get_current_user), db: Asyn
             "owner_username": w.user.username if w.user else None,
             "owner_avatar": w.user.avatar_url if w.user else None,
         }
-        for w in wishlists
+        for w, _ in rows
     ]
 
 
 @router.get("/{wishlist_id}")
 async def get_wishlist(wishlist_id: UUID, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     result = await db.execute(
-        select(Wishlist)
-        .where(Wishlist.id == wishlist_id, Wishlist.owner_id == user.id)
-        .options(selectinload(Wishlist.items).selectinload(Item.reservations))
+        select(Wishlist).where(Wishlist.id == wishlist_id, Wishlist.owner_id == user.id)
     )
     wishlist = result.scalar_one_or_none()
     if not wishlist:
         raise HTTPException(status_code=404, detail="Вишлист не найден")
 
-    active_items = sorted(wishlist.items, key=lambda i: i.sort_order)
-    active_item_ids = [i.id for i in active_items]
-    contrib_stats = await _batch_contribution_stats(db, active_item_ids)
-
-    items_response = []
-    for item in active_items:
-        total, count = contrib_stats.get(item.id, (Decimal(0), 0))
-        progress = float(total / item.price * 100) if item.price and item.price > 0 else 0.0
-        items_response.append(ItemResponse(
-            id=item.id,
-            wishlist_id=item.wishlist_id,
-            name=item.name,
-            description=item.description,
-            url=item.url,
-            image_url=item.image_url,
-            price=item.price,
-            currency=item.currency,
-            source_domain=item.source_domain,
-            is_group_gift=item.is_group_gift,
-            priority=item.priority,
-            sort_order=item.sort_order,
-            is_liked_by_owner=item.is_liked_by_owner,
-            is_reserved=len(item.reservations) > 0,
-            reservation_count=len(item.reservations),
-            contribution_total=total,
-            contribution_count=count,
-            progress_percentage=min(progress, 100.0),
-            created_at=item.created_at,
-        ))
-
-    # Update denormalized counters
-    wishlist.item_count = len(active_items)
-    wishlist.reserved_count = sum(1 for i in active_items if len(i.reservations) > 0)
+    rows = await _load_item_rows(db, wishlist.id)
+    items_response = [
+        ItemResponse(
+            id=row["id"],
+            wishlist_id=row["wishlist_id"],
+            name=row["name"],
+            description=row["description"],
+            url=row["url"],
+            image_url=row["image_url"],
+            price=row["price"],
+            currency=row["currency"],
+            source_domain=row["source_domain"],
+            is_group_gift=row["is_group_gift"],
+            priority=row["priority"],
+            sort_order=row["sort_order"],
+            is_liked_by_owner=row["is_liked_by_owner"],
+            is_reserved=row["reservation_count"] > 0,
+            reservation_count=row["reservation_count"],
+            contribution_total=row["contribution_total"],
+            contribution_count=row["contribution_count"],
+            progress_percentage=_progress(row),
+            created_at=row["created_at"],
+        )
+        for row in rows
+    ]
+
+    # Report exact counts without writing them back: reads stay side-effect free
+    wishlist_response = _build_wishlist_response(wishlist).model_copy(update={
+        "item_count": len(rows),
+        "reserved_count": sum(1 for row in rows if row["reservation_count"] > 0),
+    })
 
     return {
-        "wishlist": _build_wishlist_response(wishlist),
+        "wishlist": wishlist_response,
         "items": items_response,
     }
 
@@ -156,6 +187,8 @@ async def update_wishlist(wishlist_id: UUID, data: WishlistUpdate, user: User =
     for key, value in data.model_dump(exclude_unset=True).items():
         setattr(wishlist, key, value)
     await db.flush()
+    await feed.wishlist_changed(db, wishlist.id, user.id)
+    mark_wishlist_changed(db, wishlist.id)
     return _build_wishlist_response(wishlist)
 
 
@@ -169,6 +202,8 @@ async def update_privacy(wishlist_id: UUID, data: WishlistPrivacyUpdate, user: U
     for key, value in data.model_dump(exclude_unset=True).items():
         setattr(wishlist, key, value)
     await db.flush()
+    await feed.wishlist_changed(db, wishlist.id, user.id)
+    mark_wishlist_changed(db, wishlist.id)
     return _build_wishlist_response(wishlist)
 
 
@@ -206,51 +241,67 @@ async def delete_wishlist(wishlist_id: UUID, user: User = Depends(get_current_us
     if not wishlist:
         raise HTTPException(status_code=404, detail="Вишлист не найден")
     await db.delete(wishlist)
+    await db.flush()
+    await user_stats.recompute(db, [user.id])
+    mark_wishlist_changed(db, wishlist_id)
     await ws_manager.broadcast(str(wishlist_id), {"type": "wishlist_deleted", "wishlist_id": str(wishlist_id)})
     return {"message": "Вишлист удалён"}
 
 
 @router.get("/public/{share_token}")
-async def get_public_wishlist(share_token: str, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Wishlist)
-        .where(Wishlist.share_token == share_token)
-        .options(joinedload(Wishlist.user))
-        .options(selectinload(Wishlist.items).selectinload(Item.reservations))
-    )
-    wishlist = result.scalar_one_or_none()
-    if not wishlist:
-        raise HTTPException(status_code=404, detail="Вишлист не найден")
-
-    active_items = sorted(wishlist.items, key=lambda i: i.sort_order)
-    active_item_ids = [i.id for i in active_items]
-    contrib_stats = await _batch_contribution_stats(db, active_item_ids)
-
-    items_response = []
-    for item in active_items:
-        total, count = contrib_stats.get(item.id, (Decimal(0), 0))
-        progress = float(total / item.price * 100) if item.price and item.price > 0 else 0.0
-        reserver_name = None
-        if item.reservations and not wishlist.anonymous_reservations:
-            r = item.reservations[0]
-            reserver_name = r.guest_name
-        items_response.append(ItemPublicResponse(
-            id=item.id,
-            name=item.name,
-            description=item.description,
-            url=item.url,
-            image_url=item.image_url,
-            price=item.price if wishlist.show_prices else None,
-            currency=item.currency,
-            source_domain=item.source_domain,
-            is_group_gift=item.is_group_gift,
-            priority=item.priority,
-            is_reserved=len(item.reservations) > 0,
-            reserver_name=reserver_name,
-            contribution_total=total,
-            contribution_count=count,
-            progress_percentage=min(progress, 100.0),
-        ))
+async def get_public_wishlist(share_token: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """Shared-link view, served from the versioned public cache with ETag revalidation."""
+    cached = await public_cache.get(share_token)
+    if cached is None:
+        wishlist_id = await db.scalar(select(Wishlist.id).where(Wishlist.share_token == share_token))
+        if not wishlist_id:
+            raise HTTPException(status_code=404, detail="Вишлист не найден")
+
+        # Read the version before loading anything (privacy flags included) so a
+        # change committed in between leaves this entry under the old version
+        version = await public_cache.current_version(wishlist_id)
+        result = await db.execute(
+            select(Wishlist)
+            .where(Wishlist.id == wishlist_id)
+            .options(joinedload(Wishlist.user))
+        )
+        wishlist = result.scalar_one_or_none()
+        if not wishlist:
+            raise HTTPException(status_code=404, detail="Вишлист не найден")
+        payload = await _render_public_wishlist(db, wishlist)
+        body = json.dumps(
+            jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+        ).encode()
+        cached = await public_cache.put(share_token, wishlist.id, version, body)
+
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+async def _render_public_wishlist(db: AsyncSession, wishlist: Wishlist) -> dict:
+    rows = await _load_item_rows(db, wishlist.id)
+    items_response = [
+        ItemPublicResponse(
+            id=row["id"],
+            name=row["name"],
+            description=row["description"],
+            url=row["url"],
+            image_url=row["image_url"],
+            price=row["price"] if wishlist.show_prices else None,
+            currency=row["currency"],
+            source_domain=row["source_domain"],
+            is_group_gift=row["is_group_gift"],
+            priority=row["priority"],
+            is_reserved=row["reservation_count"] > 0,
+            reserver_name=row["first_reserver_name"] if not wishlist.anonymous_reservations else None,
+            contribution_total=row["contribution_total"],
+            contribution_count=row["contribution_count"],
+            progress_percentage=_progress(row),
+        )
+        for row in rows
+    ]
 
     return {
         "wishlist": WishlistPublicResponse(
@@ -266,8 +317,8 @@ async def get_public_wishlist(share_token: str, db: AsyncSession = Depends(get_d
             theme=wishlist.theme,
             cover_image_url=wishlist.cover_image_url,
             show_prices=wishlist.show_prices,
-            item_count=len(active_items),
-            reserved_count=sum(1 for i in active_items if len(i.reservations) > 0),
+            item_count=len(rows),
+            reserved_count=sum(1 for row in rows if row["reservation_count"] > 0),
             created_at=wishlist.created_at,
         ),
         "items": items_response,
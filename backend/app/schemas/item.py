@@ -85,3 +85,20 @@ class ItemPublicResponse(BaseModel):
     progress_percentage: float = 0.0
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ItemSearchResponse(BaseModel):
+    id: UUID
+    wishlist_id: UUID
+    wishlist_title: str
+    owner_id: UUID
+    name: str
+    description: Optional[str]
+    url: Optional[str]
+    image_url: Optional[str]
+    price: Optional[Decimal]
+    currency: str
+    source_domain: Optional[str]
+    is_group_gift: bool
+    priority: str
+    created_at: datetime
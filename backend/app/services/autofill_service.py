@@ -22,9 +22,17 @@ from urllib.parse import urljoin, urlparse
 
 import httpx
 from bs4 import BeautifulSoup, Tag
+from app.config import get_settings
 from app.utils.http import get_http_client
+from app.utils.redis import get_redis
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Hosts exempt from the SSRF guard, e.g. the load test's local mock shop
+_ALLOWED_PRIVATE_HOSTS = frozenset(h.strip().lower() for h in settings.autofill_allowed_private_hosts.split(",") if h.strip())
+
+stats = {"cache_hits": 0, "cache_misses": 0, "fetch_failures": 0}
 
 # ---------------------------------------------------------------------------
 # User-Agent rotation pool
@@ -129,30 +137,8 @@ def _detect_currency_from_jsonld(offer: dict, domain: str = "") -> str:
 # Redis caching (lazy init)
 # ---------------------------------------------------------------------------
 
-_redis = None
-
-
 async def _get_redis():
-    global _redis
-    if _redis is None:
-        try:
-            from app.config import get_settings
-            settings = get_settings()
-            if settings.redis_url:
-                import redis.asyncio as aioredis
-                _redis = aioredis.from_url(
-                    settings.redis_url,
-                    decode_responses=True,
-                    socket_connect_timeout=3,
-                )
-                # Quick connectivity check
-                await _redis.ping()
-        except Exception as exc:
-            logger.debug("Redis not available for autofill cache: %s", exc)
-            _redis = False  # sentinel: don't retry every call
-    if _redis is False:
-        return None
-    return _redis
+    return await get_redis()
 
 
 # ---------------------------------------------------------------------------
@@ -226,7 +212,7 @@ async def fetch_metadata(url: str) -> dict:
     }
 
     # --- SSRF guard ---
-    if _is_private_ip(url):
+    if (urlparse(url).hostname or "") not in _ALLOWED_PRIVATE_HOSTS and _is_private_ip(url):
         result["error"] = "URL указывает на внутренний адрес"
         return result
 
@@ -236,9 +222,11 @@ async def fetch_metadata(url: str) -> dict:
         try:
             cached = await redis.get(f"autofill:{url}")
             if cached:
+                stats["cache_hits"] += 1
                 return json.loads(cached)
         except Exception as exc:
             logger.debug("Redis GET failed: %s", exc)
+    stats["cache_misses"] += 1
 
     # --- Fetch HTML with retry + UA rotation ---
     html: str | None = None
@@ -298,6 +286,7 @@ async def fetch_metadata(url: str) -> dict:
                 await asyncio.sleep(1)
 
     if not html:
+        stats["fetch_failures"] += 1
         if last_status == 403:
             result["error"] = "Сайт заблокировал запрос"
         elif last_status == 404:
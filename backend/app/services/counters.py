@@ -0,0 +1,98 @@
+"""
+Denormalized wishlist counters (``item_count``, ``reserved_count``).
+
+They are only changed on mutation paths; reads never write them.
+``reserved_count`` is the number of items with at least one reservation, so
+group gifts only count once. Races between concurrent reservations can
+leave small drift, which ``reconcile_wishlist_counters`` repairs in batches.
+"""
+
+from uuid import UUID
+
+from sqlalchemy import case, exists, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.models.reservation import Reservation
+from app.models.wishlist import Wishlist
+
+
+def _has_reservations(item_id: UUID):
+    return exists().where(Reservation.item_id == item_id)
+
+
+async def items_added(db: AsyncSession, wishlist_id: UUID, n: int = 1) -> None:
+    await db.execute(
+        update(Wishlist).where(Wishlist.id == wishlist_id)
+        .values(item_count=Wishlist.item_count + n)
+    )
+
+
+async def item_removed(db: AsyncSession, wishlist_id: UUID, item_id: UUID) -> None:
+    """Call before the item is deleted, while its reservations still exist."""
+    await db.execute(
+        update(Wishlist).where(Wishlist.id == wishlist_id)
+        .values(
+            item_count=func.greatest(Wishlist.item_count - 1, 0),
+            reserved_count=func.greatest(
+                Wishlist.reserved_count - case((_has_reservations(item_id), 1), else_=0), 0
+            ),
+        )
+    )
+
+
+async def reservation_added(db: AsyncSession, wishlist_id: UUID, item_id: UUID) -> None:
+    """Call after the reservation is flushed; counts the item only on its first reservation."""
+    first = select(func.count(Reservation.id)).where(Reservation.item_id == item_id).scalar_subquery() == 1
+    await db.execute(
+        update(Wishlist).where(Wishlist.id == wishlist_id, first)
+        .values(reserved_count=Wishlist.reserved_count + 1)
+    )
+
+
+async def reservation_removed(db: AsyncSession, wishlist_id: UUID, item_id: UUID) -> None:
+    """Call after the reservation is deleted; uncounts the item once nothing is left."""
+    await db.execute(
+        update(Wishlist).where(Wishlist.id == wishlist_id, ~_has_reservations(item_id))
+        .values(reserved_count=func.greatest(Wishlist.reserved_count - 1, 0))
+    )
+
+
+_RECONCILE_SQL = text("""
+    UPDATE wishlists w
+    SET item_count = s.item_count, reserved_count = s.reserved_count
+    FROM (
+        SELECT w2.id,
+               (SELECT count(*) FROM items i WHERE i.wishlist_id = w2.id) AS item_count,
+               (SELECT count(DISTINCT r.item_id) FROM reservations r
+                  JOIN items i ON i.id = r.item_id
+                 WHERE i.wishlist_id = w2.id) AS reserved_count
+        FROM wishlists w2
+        WHERE w2.id = ANY(:ids)
+    ) s
+    WHERE w.id = s.id
+      AND (w.item_count, w.reserved_count) IS DISTINCT FROM (s.item_count, s.reserved_count)
+""")
+
+
+async def reconcile_wishlist_counters(
+    conn: AsyncConnection, batch_size: int, max_batches: int, after: UUID | None = None
+) -> tuple[int, UUID | None]:
+    """Recompute counters for wishlists in id order, ``batch_size`` at a time.
+
+    Returns the number of rows repaired and the id to resume from next run
+    (None once the whole table has been covered).
+    """
+    repaired = 0
+    for _ in range(max_batches):
+        query = select(Wishlist.id).order_by(Wishlist.id).limit(batch_size)
+        if after is not None:
+            query = query.where(Wishlist.id > after)
+        ids = (await conn.execute(query)).scalars().all()
+        if not ids:
+            return repaired, None
+        result = await conn.execute(_RECONCILE_SQL, {"ids": list(ids)})
+        repaired += result.rowcount or 0
+        after = ids[-1]
+        if len(ids) < batch_size:
+            return repaired, None
+    return repaired, after
@@ -0,0 +1,153 @@
+"""
+Materialized friends feed.
+
+Each user has ``feed_entries`` rows (updated_at, wishlist_id) for their
+friends' visible wishlists, written when a wishlist or its items change
+(fan-out on write). Owners with more than ``feed_fanout_max_friends`` friends
+(by the stored ``users.friend_count``) are skipped on write; their wishlists
+are merged in at read time from ``ix_wishlists_owner_active_updated``
+(fan-out on read). Any entries left behind by such owners are ignored on
+read.
+"""
+
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import delete, exists, func, literal, or_, select, tuple_, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.config import get_settings
+from app.models.feed_entry import FeedEntry
+from app.models.friend_edge import FriendEdge
+from app.models.user import User
+from app.models.wishlist import Wishlist
+from app.services.friends import friend_count, friend_ids_select
+
+settings = get_settings()
+
+FEED_PRIVACY = ("public", "friends")
+
+
+def _friend_ids(user_id):
+    return friend_ids_select(user_id).subquery("friends")
+
+
+def _visible():
+    return (Wishlist.is_active == True, Wishlist.privacy.in_(FEED_PRIVACY))
+
+
+async def _is_heavy(db: AsyncSession, owner_id: UUID) -> bool:
+    return await friend_count(db, owner_id) > settings.feed_fanout_max_friends
+
+
+def _upsert(rows):
+    stmt = insert(FeedEntry).from_select(
+        ["user_id", "wishlist_id", "owner_id", "updated_at"], rows
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[FeedEntry.user_id, FeedEntry.wishlist_id],
+        set_={"updated_at": stmt.excluded.updated_at},
+    )
+
+
+async def wishlist_changed(db: AsyncSession, wishlist_id: UUID, owner_id: UUID, touch: bool = False) -> None:
+    """Refresh a wishlist's position in its owner's friends' feeds.
+
+    ``touch`` bumps ``wishlists.updated_at`` first, for item changes that
+    don't update the wishlist row itself. Call after the change is flushed.
+    """
+    if touch:
+        await db.execute(update(Wishlist).where(Wishlist.id == wishlist_id).values(updated_at=func.now()))
+    if await _is_heavy(db, owner_id):
+        return
+
+    friends = _friend_ids(owner_id)
+    await db.execute(_upsert(
+        select(friends.c.id, Wishlist.id, Wishlist.owner_id, Wishlist.updated_at)
+        .where(Wishlist.id == wishlist_id, *_visible())
+    ))
+    # Hidden or archived since the last fan-out
+    await db.execute(
+        delete(FeedEntry).where(
+            FeedEntry.wishlist_id == wishlist_id,
+            ~exists().where(Wishlist.id == wishlist_id, *_visible()),
+        )
+    )
+
+
+async def _materialize_owner(db: AsyncSession, owner_id: UUID, reader_id: UUID | None = None) -> None:
+    """Write all of an owner's visible wishlists into one reader's feed, or all friends' feeds."""
+    if reader_id is not None:
+        readers = select(literal(reader_id).label("id")).subquery("readers")
+    else:
+        readers = _friend_ids(owner_id)
+    await db.execute(_upsert(
+        select(readers.c.id, Wishlist.id, Wishlist.owner_id, Wishlist.updated_at)
+        .where(Wishlist.owner_id == owner_id, *_visible())
+    ))
+
+
+async def friends_linked(db: AsyncSession, a: UUID, b: UUID) -> None:
+    """Backfill both feeds after a friendship is accepted and flushed."""
+    for reader_id, owner_id in ((a, b), (b, a)):
+        if not await _is_heavy(db, owner_id):
+            await _materialize_owner(db, owner_id, reader_id)
+
+
+async def friends_unlinked(db: AsyncSession, a: UUID, b: UUID) -> None:
+    """Drop each other's wishlists from both feeds after an accepted friendship is deleted and flushed."""
+    await db.execute(
+        delete(FeedEntry).where(
+            or_(
+                (FeedEntry.user_id == a) & (FeedEntry.owner_id == b),
+                (FeedEntry.user_id == b) & (FeedEntry.owner_id == a),
+            )
+        )
+    )
+    # An owner that just dropped back to the limit goes from read-time merge to fan-out
+    for owner_id in (a, b):
+        if await friend_count(db, owner_id) == settings.feed_fanout_max_friends:
+            await _materialize_owner(db, owner_id)
+
+
+async def load_feed(
+    db: AsyncSession, user_id: UUID, limit: int, after: tuple[datetime, UUID] | None = None
+) -> list[tuple[Wishlist, datetime]]:
+    """Newest-first page of friends' wishlists as (wishlist, feed position) pairs.
+
+    Fetches ``limit + 1`` rows so the caller can tell whether another page exists.
+    """
+    # The few heavy users overall (ix_users_friend_count), then a primary-key
+    # probe each for whether they are this user's friends
+    heavy_friends = (
+        select(User.id)
+        .where(
+            User.friend_count > settings.feed_fanout_max_friends,
+            exists().where(FriendEdge.user_id == user_id, FriendEdge.friend_id == User.id),
+        )
+        .cte("heavy_friends")
+    )
+    heavy = select(heavy_friends.c.id)
+
+    materialized = select(FeedEntry.wishlist_id.label("id"), FeedEntry.updated_at).where(
+        FeedEntry.user_id == user_id, FeedEntry.owner_id.not_in(heavy)
+    )
+    pulled = select(Wishlist.id.label("id"), Wishlist.updated_at).where(
+        Wishlist.owner_id.in_(heavy), *_visible()
+    )
+    if after is not None:
+        materialized = materialized.where(tuple_(FeedEntry.updated_at, FeedEntry.wishlist_id) < after)
+        pulled = pulled.where(tuple_(Wishlist.updated_at, Wishlist.id) < after)
+    entries = union_all(materialized, pulled).subquery("entries")
+
+    result = await db.execute(
+        select(Wishlist, entries.c.updated_at)
+        .join(entries, entries.c.id == Wishlist.id)
+        .where(*_visible())
+        .options(joinedload(Wishlist.user))
+        .order_by(entries.c.updated_at.desc(), entries.c.id.desc())
+        .limit(limit + 1)
+    )
+    return result.all()
@@ -0,0 +1,145 @@
+"""
+Undirected friendship adjacency and a per-process friend-id cache.
+
+Every accepted friendship is mirrored into ``friend_edges`` as (a, b) and
+(b, a), so "friends of X" and "are X and Y friends" are primary-key lookups
+instead of an OR over ``requester_id``/``addressee_id``. ``link``/``unlink``
+keep the edges in step with ``friendships`` and drop cached sets once the
+transaction commits. Other workers see the change after at most
+``friend_cache_ttl_seconds``. They also keep ``users.friend_count``, which
+the feed uses to tell heavy owners apart without counting edges.
+"""
+
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+from sqlalchemy import delete, event, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.friend_edge import FriendEdge
+from app.models.friendship import Friendship
+from app.models.user import User
+
+settings = get_settings()
+
+CHANGED_KEY = "changed_friend_sets"
+
+
+def friend_ids_select(user_id):
+    return select(FriendEdge.friend_id.label("id")).where(FriendEdge.user_id == user_id)
+
+
+async def friend_count(db: AsyncSession, user_id: UUID) -> int:
+    return await db.scalar(select(User.friend_count).where(User.id == user_id)) or 0
+
+
+def _adjust_friend_counts(a: UUID, b: UUID, delta: int):
+    return update(User).where(User.id.in_((a, b))).values(friend_count=User.friend_count + delta)
+
+
+class FriendSetCache:
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None):
+        self.max_entries = max_entries or settings.friend_cache_max_entries
+        self.ttl = ttl or settings.friend_cache_ttl_seconds
+        self._sets: OrderedDict[UUID, tuple[frozenset[UUID], float]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, user_id: UUID) -> frozenset[UUID] | None:
+        cached = self._sets.get(user_id)
+        if cached is None or time.monotonic() - cached[1] >= self.ttl:
+            self._sets.pop(user_id, None)
+            self.stats["misses"] += 1
+            return None
+        self._sets.move_to_end(user_id)
+        self.stats["hits"] += 1
+        return cached[0]
+
+    def put(self, user_id: UUID, friend_ids: frozenset[UUID]):
+        self._sets[user_id] = (friend_ids, time.monotonic())
+        self._sets.move_to_end(user_id)
+        while len(self._sets) > self.max_entries:
+            self._sets.popitem(last=False)
+
+    def invalidate(self, *user_ids: UUID):
+        for user_id in user_ids:
+            self._sets.pop(user_id, None)
+
+
+friend_cache = FriendSetCache()
+
+
+async def get_friend_ids(db: AsyncSession, user_id: UUID) -> frozenset[UUID]:
+    cached = friend_cache.get(user_id)
+    if cached is not None:
+        return cached
+    result = await db.execute(friend_ids_select(user_id))
+    friend_ids = frozenset(result.scalars().all())
+    friend_cache.put(user_id, friend_ids)
+    return friend_ids
+
+
+async def are_friends(db: AsyncSession, a: UUID, b: UUID) -> bool:
+    return b in await get_friend_ids(db, a)
+
+
+async def find_friendship(db: AsyncSession, a: UUID, b: UUID) -> Friendship | None:
+    """The friendship row between two users in either direction, accepted or pending."""
+    result = await db.execute(
+        select(Friendship).join(FriendEdge, FriendEdge.friendship_id == Friendship.id)
+        .where(FriendEdge.user_id == a, FriendEdge.friend_id == b)
+    )
+    friendship = result.scalar_one_or_none()
+    if friendship:
+        return friendship
+    # Pending requests have no edges yet; both directions hit uq_friendship
+    result = await db.execute(
+        select(Friendship).where(
+            or_(
+                (Friendship.requester_id == a) & (Friendship.addressee_id == b),
+                (Friendship.requester_id == b) & (Friendship.addressee_id == a),
+            )
+        )
+    )
+    return result.scalars().first()
+
+
+async def link(db: AsyncSession, friendship: Friendship) -> None:
+    """Add both edges for a friendship that was just accepted."""
+    a, b = friendship.requester_id, friendship.addressee_id
+    await db.execute(insert(FriendEdge), [
+        {"user_id": a, "friend_id": b, "friendship_id": friendship.id},
+        {"user_id": b, "friend_id": a, "friendship_id": friendship.id},
+    ])
+    await db.execute(_adjust_friend_counts(a, b, 1))
+    db.info.setdefault(CHANGED_KEY, set()).update((a, b))
+
+
+async def unlink(db: AsyncSession, a: UUID, b: UUID) -> None:
+    """Remove both edges between two users whose accepted friendship is being deleted.
+
+    The edges may already be gone through the friendships FK cascade; the
+    counts are decremented either way.
+    """
+    await db.execute(
+        delete(FriendEdge).where(
+            or_(
+                (FriendEdge.user_id == a) & (FriendEdge.friend_id == b),
+                (FriendEdge.user_id == b) & (FriendEdge.friend_id == a),
+            )
+        )
+    )
+    await db.execute(_adjust_friend_counts(a, b, -1))
+    db.info.setdefault(CHANGED_KEY, set()).update((a, b))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed(session):
+    friend_cache.invalidate(*session.info.pop(CHANGED_KEY, ()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed(session):
+    session.info.pop(CHANGED_KEY, None)
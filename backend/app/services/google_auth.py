@@ -0,0 +1,129 @@
+"""
+Google ID token verification without blocking the event loop.
+
+Google's signing keys (JWKS) are fetched with the shared async HTTP client
+and kept for the ``max-age`` Google sends in ``Cache-Control``. A
+background task refreshes them shortly before they expire, so sign-ins
+normally never wait on Google. An unknown ``kid`` (keys were just rotated)
+triggers one immediate refetch, at most every ``MIN_REFETCH_SECONDS``.
+The RSA signature check runs in a worker thread.
+"""
+
+import asyncio
+import logging
+import re
+import time
+
+import httpx
+from jose import jwk, jwt
+from jose.exceptions import JOSEError
+
+from app.config import get_settings
+from app.utils.http import get_http_client
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+DEFAULT_MAX_AGE = 3600
+MIN_REFETCH_SECONDS = 30
+REFRESH_MARGIN_SECONDS = 60
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleTokenError(Exception):
+    pass
+
+
+def cache_lifetime(cache_control: str | None) -> int:
+    match = _MAX_AGE.search(cache_control or "")
+    return int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+
+class GoogleTokenVerifier:
+    def __init__(self, jwks_url: str | None = None, client: httpx.AsyncClient | None = None):
+        self.jwks_url = jwks_url or settings.google_jwks_url
+        self._client = client
+        self._keys: dict[str, jwk.Key] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.stats = {"fetches": 0, "fetch_errors": 0}
+
+    async def refresh(self, min_interval: float = 0) -> None:
+        """Fetch the JWKS; keeps the previous keys if Google can't be reached.
+
+        Skipped if keys were fetched less than ``min_interval`` seconds ago,
+        so a burst of requests with an unknown ``kid`` causes one fetch.
+        """
+        async with self._lock:
+            if self._keys and time.monotonic() - self._fetched_at < min_interval:
+                return
+            self._fetched_at = time.monotonic()
+            self.stats["fetches"] += 1
+            try:
+                response = await (self._client or get_http_client()).get(self.jwks_url, timeout=5)
+                response.raise_for_status()
+                keys = {
+                    k["kid"]: jwk.construct(k, k.get("alg", "RS256"))
+                    for k in response.json()["keys"]
+                    if k.get("kid")
+                }
+            except (httpx.HTTPError, ValueError, KeyError, JOSEError) as exc:
+                self.stats["fetch_errors"] += 1
+                logger.warning("Google JWKS fetch failed: %s", exc)
+                return
+            self._keys = keys
+            self._expires_at = time.monotonic() + cache_lifetime(response.headers.get("cache-control"))
+
+    async def _key(self, kid: str) -> jwk.Key:
+        key = self._keys.get(kid)
+        if key is None or time.monotonic() >= self._expires_at:
+            await self.refresh(min_interval=MIN_REFETCH_SECONDS)
+            key = self._keys.get(kid)
+        if key is None:
+            raise GoogleTokenError("Unknown signing key")
+        return key
+
+    async def verify(self, token: str, audience: str) -> dict:
+        """Claims of a valid ID token issued by Google for ``audience``; raises GoogleTokenError."""
+        try:
+            header = jwt.get_unverified_header(token)
+        except JOSEError as exc:
+            raise GoogleTokenError(str(exc)) from exc
+        key = await self._key(header.get("kid") or "")
+        try:
+            claims = await asyncio.to_thread(
+                jwt.decode, token, key,
+                algorithms=["RS256"], audience=audience, issuer=GOOGLE_ISSUERS,
+                options={"verify_at_hash": False},
+            )
+        except JOSEError as exc:
+            raise GoogleTokenError(str(exc)) from exc
+        return claims
+
+    async def _run(self):
+        while True:
+            delay = max(self._expires_at - time.monotonic() - REFRESH_MARGIN_SECONDS, MIN_REFETCH_SECONDS)
+            await asyncio.sleep(delay)
+            await self.refresh()
+
+    async def start(self):
+        """Load the keys and keep them fresh until ``stop``."""
+        if self._task is None:
+            await self.refresh()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+google_verifier = GoogleTokenVerifier()
@@ -0,0 +1,100 @@
+"""
+Item search across the caller's own, shared and friends' wishlists.
+
+Text matching uses the generated ``items.search_vector`` column, which
+holds name (weight A) and description (weight B) under both the Russian and
+English configs. It is served by ``ix_items_search_vector``. Results are
+ordered by relevance, then newest first, and keyset-paginated on
+(rank, created_at, id).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import Integer, cast, exists, func, literal, literal_column, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.item import Item
+from app.models.item_category import ItemCategory
+from app.models.wishlist import Wishlist
+from app.models.wishlist_access import WishlistAccess
+from app.services.friends import friend_ids_select
+
+SortKey = tuple[int, datetime, UUID]
+
+
+@dataclass
+class ItemSearchFilters:
+    q: str | None = None
+    min_price: Decimal | None = None
+    max_price: Decimal | None = None
+    priority: str | None = None
+    source_domain: str | None = None
+    is_group_gift: bool | None = None
+    category: str | None = None
+
+
+def _visible_to(user_id: UUID):
+    """Own wishlists, explicit access grants, and friends' public or friends-only wishlists.
+
+    Strangers' public wishlists stay reachable only through their share link.
+    """
+    return or_(
+        Wishlist.owner_id == user_id,
+        exists().where(WishlistAccess.wishlist_id == Wishlist.id, WishlistAccess.user_id == user_id),
+        (Wishlist.is_active == True) & Wishlist.privacy.in_(("public", "friends"))
+        & Wishlist.owner_id.in_(friend_ids_select(user_id)),
+    )
+
+
+def _tsquery(q: str):
+    return func.websearch_to_tsquery(literal_column("'russian'::regconfig"), q).op("||")(
+        func.websearch_to_tsquery(literal_column("'english'::regconfig"), q)
+    )
+
+
+async def search_items(
+    db: AsyncSession, user_id: UUID, filters: ItemSearchFilters, limit: int, after: SortKey | None = None
+) -> list[tuple[Item, Wishlist, SortKey]]:
+    """One page of (item, wishlist, sort key); fetches ``limit + 1`` to detect a next page."""
+    conditions = [_visible_to(user_id)]
+    if filters.q:
+        query = _tsquery(filters.q)
+        conditions.append(Item.search_vector.op("@@")(query))
+        rank = cast(func.ts_rank_cd(Item.search_vector, query) * 10000, Integer)
+    else:
+        rank = literal(0)
+    if filters.min_price is not None:
+        conditions.append(Item.price >= filters.min_price)
+    if filters.max_price is not None:
+        conditions.append(Item.price <= filters.max_price)
+    if filters.priority:
+        conditions.append(Item.priority == filters.priority)
+    if filters.source_domain:
+        conditions.append(Item.source_domain == filters.source_domain)
+    if filters.is_group_gift is not None:
+        conditions.append(Item.is_group_gift == filters.is_group_gift)
+    if filters.category:
+        conditions.append(
+            exists().where(ItemCategory.item_id == Item.id, ItemCategory.category == filters.category)
+        )
+
+    ranked = (
+        select(Item.id, rank.label("rank"), Item.created_at)
+        .join(Wishlist, Wishlist.id == Item.wishlist_id)
+        .where(*conditions)
+        .subquery("ranked")
+    )
+    stmt = (
+        select(Item, Wishlist, ranked.c.rank)
+        .join(ranked, ranked.c.id == Item.id)
+        .join(Wishlist, Wishlist.id == Item.wishlist_id)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(ranked.c.rank, ranked.c.created_at, ranked.c.id) < tuple_(*after))
+    result = await db.execute(
+        stmt.order_by(ranked.c.rank.desc(), ranked.c.created_at.desc(), ranked.c.id.desc()).limit(limit + 1)
+    )
+    return [(item, wishlist, (rank, item.created_at, item.id)) for item, wishlist, rank in result.all()]
@@ -0,0 +1,105 @@
+"""
+Bulk item import and NDJSON export.
+
+Uploads are a JSON array, NDJSON (one object per line) or CSV with a
+header row using the ``ItemCreate`` field names. Every row is validated
+before anything is written, then all rows go in as one multi-row INSERT.
+Exports stream rows in the same shape, so an export can be imported back.
+"""
+
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from uuid import UUID
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.item import Item
+from app.schemas.item import ItemCreate
+from app.services import ordering
+
+EXPORT_FIELDS = ("id", *ItemCreate.model_fields, "created_at")
+
+
+class ItemImportError(ValueError):
+    """An upload that cannot be imported; ``str()`` is safe to show to the user."""
+
+
+def _rows(content_type: str, body: bytes) -> list[dict]:
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ItemImportError("Файл должен быть в кодировке UTF-8")
+    if content_type in ("application/x-ndjson", "application/jsonl"):
+        rows = []
+        for n, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                raise ItemImportError(f"Некорректный JSON в строке {n}")
+        return rows
+    if content_type == "text/csv":
+        # Empty cells fall back to the field defaults
+        return [{k: v for k, v in row.items() if k and v != ""} for row in csv.DictReader(io.StringIO(text))]
+    try:
+        rows = json.loads(text)
+    except json.JSONDecodeError:
+        raise ItemImportError("Некорректный JSON")
+    if not isinstance(rows, list):
+        raise ItemImportError("Ожидается массив подарков")
+    return rows
+
+
+def parse_items(content_type: str, body: bytes, max_items: int) -> list[ItemCreate]:
+    """Validate an upload; ``content_type`` picks the format (anything else is read as JSON)."""
+    rows = _rows(content_type, body)
+    if not rows:
+        raise ItemImportError("Нет подарков для импорта")
+    if len(rows) > max_items:
+        raise ItemImportError(f"Слишком много подарков: максимум {max_items}")
+    items = []
+    for n, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            raise ItemImportError(f"Строка {n}: ожидается объект")
+        try:
+            items.append(ItemCreate.model_validate(row))
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(p) for p in error["loc"])
+            raise ItemImportError(f"Строка {n}: {field}: {error['msg']}")
+    return items
+
+
+async def insert_items(db: AsyncSession, wishlist_id: UUID, items: list[ItemCreate]) -> list[Item]:
+    """Insert ``items`` after the wishlist's existing ones, in upload order."""
+    keys = await ordering.append_keys(db, len(items))
+    result = await db.scalars(
+        insert(Item).returning(Item, sort_by_parameter_order=True),
+        [
+            {**data.model_dump(), "wishlist_id": wishlist_id, "sort_order": key}
+            for data, key in zip(items, keys)
+        ],
+    )
+    return list(result.all())
+
+
+def export_line(item: Item) -> bytes:
+    row = {field: getattr(item, field) for field in EXPORT_FIELDS}
+    return (json.dumps(row, default=str, ensure_ascii=False) + "\n").encode()
+
+
+async def stream_items(db: AsyncSession, wishlist_id: UUID, batch_size: int = 500) -> AsyncIterator[bytes]:
+    """NDJSON lines for a wishlist's items in display order, fetched ``batch_size`` rows at a time."""
+    result = await db.stream_scalars(
+        select(Item)
+        .where(Item.wishlist_id == wishlist_id)
+        .order_by(Item.sort_order, Item.created_at)
+        .execution_options(yield_per=batch_size)
+    )
+    async for item in result:
+        yield export_line(item)
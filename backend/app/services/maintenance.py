@@ -0,0 +1,417 @@
+"""
+Retention for tables that otherwise grow without bound.
+
+Expired rows are removed in small batches (``DELETE ... WHERE (tableoid, ctid)
+IN (SELECT ... LIMIT n)``) so no single statement holds locks for long. Read
+notifications can be moved to ``notifications_archive`` instead of deleted.
+When ``notifications`` is range-partitioned by ``created_at`` (see
+``partition_notifications``), whole monthly partitions past retention are
+dropped instead. Each run also repairs drifted wishlist counters (see
+``app.services.counters``), and once per ``stats_reconcile_interval_hours``
+re-derives ``user_stats`` (see ``app.services.user_stats``). Both passes
+keep their resume cursor in ``maintenance_state``, so they continue on
+whichever worker takes the lock next.
+
+Run once by hand with ``python -m app.services.maintenance``.
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import get_settings
+from app.database import engine
+from app.services.counters import reconcile_wishlist_counters
+from app.services.notifications import invalidate_unread_counts
+from app.services.user_stats import reconcile_user_stats
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Arbitrary constant shared by all workers so only one runs retention at a time
+ADVISORY_LOCK_KEY = 720_029
+PARTITION_PREFIX = "notifications_p"
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    table: str
+    where: str  # SQL predicate selecting expired rows; may use :days / :hours
+    params: dict = field(default_factory=dict)
+    archive_table: str | None = None
+    # SQL expression over each purged row; the non-null values are passed to on_purged after every batch
+    returning: str | None = None
+    on_purged: Callable[[set], Awaitable[None]] | None = None
+
+
+@dataclass
+class RetentionRunMetrics:
+    table: str
+    deleted: int = 0
+    archived: int = 0
+    batches: int = 0
+    partitions_dropped: int = 0
+    repaired: int = 0
+    seconds: float = 0.0
+    error: str | None = None
+
+
+async def load_state(conn: AsyncConnection, job: str) -> tuple[UUID | None, datetime | None]:
+    """(resume cursor, last completed pass) of a maintenance pass."""
+    row = (await conn.execute(
+        text("SELECT cursor, completed_at FROM maintenance_state WHERE job = :job"), {"job": job},
+    )).one_or_none()
+    return (row[0], row[1]) if row else (None, None)
+
+
+async def save_state(conn: AsyncConnection, job: str, cursor: UUID | None, completed: bool) -> None:
+    await conn.execute(text(
+        "INSERT INTO maintenance_state (job, cursor, completed_at, updated_at) "
+        "VALUES (:job, :cursor, CASE WHEN :completed THEN now() END, now()) "
+        "ON CONFLICT (job) DO UPDATE SET cursor = excluded.cursor, updated_at = excluded.updated_at, "
+        "completed_at = COALESCE(excluded.completed_at, maintenance_state.completed_at)"
+    ), {"job": job, "cursor": cursor, "completed": completed})
+
+
+def default_policies() -> list[RetentionPolicy]:
+    return [
+        RetentionPolicy(
+            table="notifications",
+            where=(
+                "(is_read AND created_at < now() - make_interval(days => :read_days))"
+                " OR created_at < now() - make_interval(days => :days)"
+            ),
+            params={
+                "read_days": settings.retention_notifications_read_days,
+                "days": settings.retention_notifications_days,
+            },
+            archive_table="notifications_archive" if settings.retention_archive_notifications else None,
+            # Unread rows past retention still count towards the cached badge
+            returning="CASE WHEN NOT is_read THEN recipient_id END",
+            on_purged=invalidate_unread_counts,
+        ),
+        RetentionPolicy(
+            table="refresh_tokens",
+            where="expires_at < now() - make_interval(hours => :hours)",
+            params={"hours": settings.retention_grace_hours},
+        ),
+        RetentionPolicy(
+            table="password_reset_codes",
+            where="(used OR expires_at < now()) AND created_at < now() - make_interval(hours => :hours)",
+            params={"hours": settings.retention_grace_hours},
+        ),
+    ]
+
+
+async def _is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    result = await conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t))"),
+        {"t": table},
+    )
+    return bool(result.scalar())
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _next_month(d: date) -> date:
+    return date(d.year + (d.month // 12), d.month % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int = 2) -> None:
+    """Create monthly notification partitions up to ``months_ahead`` from now."""
+    month = _month_start(datetime.now(timezone.utc).date())
+    for _ in range(months_ahead + 1):
+        nxt = _next_month(month)
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {_partition_name(month)} PARTITION OF notifications "
+            f"FOR VALUES FROM ('{month}') TO ('{nxt}')"
+        ))
+        month = nxt
+
+
+async def drop_expired_partitions(
+    conn: AsyncConnection, days: int, archive: bool,
+    on_purged: Callable[[set], Awaitable[None]] | None = None,
+) -> int:
+    """Detach partitions entirely older than ``days``; drop them or keep them as archive tables.
+
+    ``on_purged`` gets the recipients of each partition's unread rows.
+    """
+    cutoff = datetime.now(timezone.utc).date().toordinal() - days
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'notifications'::regclass AND c.relname LIKE :prefix"
+    ), {"prefix": f"{PARTITION_PREFIX}%"})
+    dropped = 0
+    for name in sorted(row[0] for row in result.all()):
+        try:
+            month = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m").date()
+        except ValueError:
+            continue
+        if _next_month(month).toordinal() > cutoff:
+            continue
+        await conn.execute(text(f"ALTER TABLE notifications DETACH PARTITION {name}"))
+        if on_purged:
+            unread = await conn.execute(text(f"SELECT DISTINCT recipient_id FROM {name} WHERE NOT is_read"))
+            await on_purged({row[0] for row in unread.all()})
+        if archive:
+            await conn.execute(text(f"ALTER TABLE {name} RENAME TO archive_{name}"))
+        else:
+            await conn.execute(text(f"DROP TABLE {name}"))
+        dropped += 1
+    return dropped
+
+
+async def purge_in_batches(
+    conn: AsyncConnection,
+    policy: RetentionPolicy,
+    batch_size: int,
+    max_batches: int,
+    pause: float = 0.0,
+) -> RetentionRunMetrics:
+    """Delete (or archive) rows matching ``policy`` in bounded, separately committed batches."""
+    metrics = RetentionRunMetrics(table=policy.table)
+    victims = (
+        f"SELECT tableoid, ctid FROM {policy.table} WHERE {policy.where} LIMIT :batch_size"
+    )
+    returning = f" RETURNING {policy.returning}" if policy.returning else ""
+    if policy.archive_table:
+        stmt = text(
+            f"WITH moved AS (DELETE FROM {policy.table} WHERE (tableoid, ctid) IN ({victims}) RETURNING *) "
+            f"INSERT INTO {policy.archive_table} SELECT * FROM moved{returning}"
+        )
+    else:
+        stmt = text(f"DELETE FROM {policy.table} WHERE (tableoid, ctid) IN ({victims}){returning}")
+
+    for _ in range(max_batches):
+        result = await conn.execute(stmt, {**policy.params, "batch_size": batch_size})
+        if policy.returning:
+            values = [row[0] for row in result.all()]
+            n = len(values)
+            if policy.on_purged:
+                await policy.on_purged({v for v in values if v is not None})
+        else:
+            n = result.rowcount or 0
+        metrics.batches += 1
+        if policy.archive_table:
+            metrics.archived += n
+        else:
+            metrics.deleted += n
+        if n < batch_size:
+            break
+        if pause:
+            await asyncio.sleep(pause)
+    return metrics
+
+
+class RetentionJob:
+    """Periodically applies retention policies and repairs drifted counters and user stats.
+
+    Only one worker runs it at a time, via an advisory lock.
+    """
+
+    def __init__(self, policies: list[RetentionPolicy] | None = None, interval: float | None = None):
+        self.policies = policies
+        self.interval = interval or settings.retention_interval_minutes * 60
+        self._worker: asyncio.Task | None = None
+        self.last_run: dict[str, RetentionRunMetrics] = {}
+        self.last_run_at: datetime | None = None
+        self.totals = {"runs": 0, "deleted": 0, "archived": 0, "partitions_dropped": 0, "repaired": 0}
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Retention run failed: {e}")
+
+    async def run_once(self) -> dict[str, RetentionRunMetrics] | None:
+        policies = self.policies or default_policies()
+        async with engine.connect() as raw:
+            conn = await raw.execution_options(isolation_level="AUTOCOMMIT")
+            locked = (await conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": ADVISORY_LOCK_KEY})).scalar()
+            if not locked:
+                logger.info("Retention already running on another worker, skipping")
+                return None
+            try:
+                runs = {}
+                for policy in policies:
+                    runs[policy.table] = await self._apply(conn, policy)
+                if settings.counter_reconcile_enabled:
+                    runs["wishlists"] = await self._reconcile(conn)
+                if await self._stats_due(conn):
+                    runs["user_stats"] = await self._reconcile_stats(conn)
+            finally:
+                await conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK_KEY})
+
+        self.last_run = runs
+        self.last_run_at = datetime.now(timezone.utc)
+        self.totals["runs"] += 1
+        for m in runs.values():
+            self.totals["deleted"] += m.deleted
+            self.totals["archived"] += m.archived
+            self.totals["partitions_dropped"] += m.partitions_dropped
+            self.totals["repaired"] += m.repaired
+            logger.info(
+                "Retention %s: deleted=%d archived=%d batches=%d partitions_dropped=%d repaired=%d in %.2fs%s",
+                m.table, m.deleted, m.archived, m.batches, m.partitions_dropped, m.repaired, m.seconds,
+                f" error={m.error}" if m.error else "",
+            )
+        return runs
+
+    async def _apply(self, conn: AsyncConnection, policy: RetentionPolicy) -> RetentionRunMetrics:
+        started = time.monotonic()
+        partitions_dropped = 0
+        try:
+            if policy.table == "notifications" and await _is_partitioned(conn, "notifications"):
+                await ensure_partitions(conn)
+                partitions_dropped = await drop_expired_partitions(
+                    conn, settings.retention_notifications_days, archive=bool(policy.archive_table),
+                    on_purged=policy.on_purged,
+                )
+            metrics = await purge_in_batches(
+                conn, policy,
+                batch_size=settings.retention_batch_size,
+                max_batches=settings.retention_max_batches,
+                pause=settings.retention_batch_pause_ms / 1000,
+            )
+        except Exception as e:
+            metrics = RetentionRunMetrics(table=policy.table, error=str(e))
+        metrics.partitions_dropped = partitions_dropped
+        metrics.seconds = time.monotonic() - started
+        return metrics
+
+    async def _reconcile(self, conn: AsyncConnection) -> RetentionRunMetrics:
+        started = time.monotonic()
+        metrics = RetentionRunMetrics(table="wishlists")
+        try:
+            # Resume where the previous run stopped so large tables are covered over several runs
+            after, _ = await load_state(conn, "wishlist_counters")
+            metrics.repaired, after = await reconcile_wishlist_counters(
+                conn, settings.retention_batch_size, settings.retention_max_batches, after,
+            )
+            await save_state(conn, "wishlist_counters", after, completed=after is None)
+        except Exception as e:
+            metrics.error = str(e)
+        metrics.seconds = time.monotonic() - started
+        return metrics
+
+    async def _stats_due(self, conn: AsyncConnection) -> bool:
+        after, completed_at = await load_state(conn, "user_stats")
+        if after is not None or completed_at is None:
+            return True
+        age = datetime.now(timezone.utc) - completed_at
+        return age.total_seconds() >= settings.stats_reconcile_interval_hours * 3600
+
+    async def _reconcile_stats(self, conn: AsyncConnection) -> RetentionRunMetrics:
+        started = time.monotonic()
+        metrics = RetentionRunMetrics(table="user_stats")
+        try:
+            # A pass can span several runs; the interval restarts once it reaches the end
+            after, _ = await load_state(conn, "user_stats")
+            metrics.repaired, after = await reconcile_user_stats(
+                conn, settings.retention_batch_size, settings.retention_max_batches, after,
+            )
+            await save_state(conn, "user_stats", after, completed=after is None)
+        except Exception as e:
+            metrics.error = str(e)
+        metrics.seconds = time.monotonic() - started
+        return metrics
+
+
+retention_job = RetentionJob()
+
+
+async def partition_notifications(months_ahead: int = 2) -> None:
+    """One-off conversion of ``notifications`` into a table range-partitioned by month.
+
+    Rewrites the whole table inside one transaction; run it in a maintenance window.
+    """
+    async with engine.begin() as conn:
+        if await _is_partitioned(conn, "notifications"):
+            logger.info("notifications is already partitioned")
+            return
+        await conn.execute(text("ALTER TABLE notifications RENAME TO notifications_legacy"))
+        for index in ("ix_notifications_recipient_id", "ix_notifications_sender_id",
+                      "ix_notifications_recipient_unread", "ix_notifications_recipient_created"):
+            await conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        await conn.execute(text(
+            "CREATE TABLE notifications ("
+            " id UUID NOT NULL DEFAULT gen_random_uuid(),"
+            " recipient_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,"
+            " sender_id UUID REFERENCES users(id) ON DELETE SET NULL,"
+            " type VARCHAR(50) NOT NULL,"
+            " title TEXT,"
+            " body TEXT,"
+            " data JSONB NOT NULL DEFAULT '{}',"
+            " is_read BOOLEAN NOT NULL DEFAULT false,"
+            " created_at TIMESTAMPTZ NOT NULL DEFAULT now(),"
+            " PRIMARY KEY (id, created_at)"
+            ") PARTITION BY RANGE (created_at)"
+        ))
+        oldest = (await conn.execute(text("SELECT min(created_at) FROM notifications_legacy"))).scalar()
+        month = _month_start((oldest or datetime.now(timezone.utc)).date())
+        current = _month_start(datetime.now(timezone.utc).date())
+        while month < current:
+            nxt = _next_month(month)
+            await conn.execute(text(
+                f"CREATE TABLE {_partition_name(month)} PARTITION OF notifications "
+                f"FOR VALUES FROM ('{month}') TO ('{nxt}')"
+            ))
+            month = nxt
+        await ensure_partitions(conn, months_ahead)
+        await conn.execute(text("CREATE TABLE notifications_default PARTITION OF notifications DEFAULT"))
+        await conn.execute(text(
+            "INSERT INTO notifications (id, recipient_id, sender_id, type, title, body, data, is_read, created_at) "
+            "SELECT id, recipient_id, sender_id, type, title, body, COALESCE(data, '{}'), "
+            "COALESCE(is_read, false), COALESCE(created_at, now()) FROM notifications_legacy"
+        ))
+        await conn.execute(text("DROP TABLE notifications_legacy"))
+        await conn.execute(text("CREATE INDEX ix_notifications_recipient_id ON notifications (recipient_id)"))
+        await conn.execute(text("CREATE INDEX ix_notifications_sender_id ON notifications (sender_id)"))
+        await conn.execute(text("CREATE INDEX ix_notifications_recipient_unread ON notifications (recipient_id, is_read)"))
+        await conn.execute(text(
+            "CREATE INDEX ix_notifications_recipient_created ON notifications (recipient_id, created_at DESC, id DESC)"
+        ))
+        await conn.execute(text("CREATE INDEX ix_notifications_created_at ON notifications (created_at)"))
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Run retention once or partition notifications")
+    parser.add_argument("--partition-notifications", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.partition_notifications:
+        await partition_notifications()
+    else:
+        await retention_job.run_once()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(_main())
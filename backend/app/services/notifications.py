@@ -0,0 +1,347 @@
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from uuid import UUID
+
+from sqlalchemy import event, insert, select, func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import async_session
+from app.models.notification import Notification
+from app.services.push import PushMessage, push_dispatcher
+from app.utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PENDING_KEY = "pending_notifications"
+UNREAD_CHANGED_KEY = "unread_changed"
+UNREAD_TTL_SECONDS = 3600
+UNREAD_SEED_TTL_SECONDS = 10
+
+# INCRBY only when the counter is already seeded; a missing key is rebuilt from
+# the DB. A seed in progress (KEYS[2]) is cancelled, since its count may predate
+# the rows being counted here.
+_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+redis.call('DEL', KEYS[2])
+return nil
+"""
+
+# Store the counted value only if this reader's seed marker survived the count.
+# KEYS: counter, seed marker. ARGV: token, count, ttl.
+_SEED_IF_UNCHANGED = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[2])
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3], 'NX')
+return 1
+"""
+
+
+def _unread_key(user_id: UUID) -> str:
+    return f"notif:unread:{user_id}"
+
+
+def _unread_seed_key(user_id: UUID) -> str:
+    return f"notif:unread:{user_id}:seed"
+
+
+async def get_unread_count(db, user_id: UUID) -> int:
+    """Unread badge count: Redis counter when available, else an index-only count.
+
+    A miss marks the counter as being seeded before counting; a bump or an
+    invalidation that lands meanwhile removes the mark, and the count is then
+    returned without being cached.
+    """
+    redis = await get_redis()
+    token = None
+    if redis:
+        try:
+            cached = await redis.get(_unread_key(user_id))
+            if cached is not None:
+                return int(cached)
+            token = uuid.uuid4().hex
+            await redis.set(_unread_seed_key(user_id), token, ex=UNREAD_SEED_TTL_SECONDS)
+        except Exception as exc:
+            logger.debug("Redis GET failed: %s", exc)
+            token = None
+
+    result = await db.execute(
+        select(func.count())
+        .select_from(Notification)
+        .where(Notification.recipient_id == user_id, Notification.is_read == False)
+    )
+    count = result.scalar_one()
+    if token:
+        try:
+            await redis.eval(
+                _SEED_IF_UNCHANGED, 2, _unread_key(user_id), _unread_seed_key(user_id),
+                token, count, UNREAD_TTL_SECONDS,
+            )
+        except Exception as exc:
+            logger.debug("Redis seed failed: %s", exc)
+    return count
+
+
+async def bump_unread_counts(counts: Counter) -> None:
+    redis = await get_redis()
+    if not redis:
+        return
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for user_id, n in counts.items():
+                pipe.eval(_INCR_IF_EXISTS, 2, _unread_key(user_id), _unread_seed_key(user_id), n)
+            await pipe.execute()
+    except Exception as exc:
+        logger.debug("Redis unread bump failed: %s", exc)
+
+
+async def invalidate_unread_counts(user_ids) -> None:
+    keys = [key for user_id in user_ids for key in (_unread_key(user_id), _unread_seed_key(user_id))]
+    redis = await get_redis()
+    if not redis or not keys:
+        return
+    try:
+        await redis.delete(*keys)
+    except Exception as exc:
+        logger.debug("Redis DEL failed: %s", exc)
+
+
+def mark_unread_changed(db, user_id: UUID):
+    """Drop the user's cached unread count once ``db`` commits.
+
+    Deleting it before the commit would let a concurrent read re-seed the
+    counter from the old rows.
+    """
+    db.info.setdefault(UNREAD_CHANGED_KEY, set()).add(user_id)
+
+
+@dataclass(frozen=True)
+class CoalesceRule:
+    target_key: str | None  # data field identifying the target; None = one group per recipient
+    multiple: str  # body used once a group has more than one actor
+
+
+# Types not listed here are written one row per event (e.g. friend_request
+# carries a friendship_id the client needs to act on).
+COALESCE_RULES = {
+    "item_liked": CoalesceRule("item_id", "{actor} и ещё {others} лайкнули «{target}»"),
+    "friend_accepted": CoalesceRule(None, "{actor} и ещё {others} приняли ваши запросы в друзья"),
+}
+
+
+@dataclass
+class NotificationEvent:
+    recipient_id: UUID
+    type: str
+    title: str
+    body: str
+    sender_id: UUID | None = None
+    actor_name: str | None = None
+    target_name: str | None = None
+    data: dict = field(default_factory=dict)
+
+
+@dataclass
+class _Group:
+    deadline: float
+    latest: NotificationEvent
+    actors: dict = field(default_factory=dict)  # sender_id -> name, in arrival order
+
+    def add(self, ev: NotificationEvent):
+        self.actors.pop(ev.sender_id, None)
+        self.actors[ev.sender_id] = ev.actor_name
+        self.latest = ev
+
+    def absorb(self, newer: "_Group"):
+        """Fold in a group that was started for the same key while this one was being written."""
+        for sender_id, name in newer.actors.items():
+            self.actors.pop(sender_id, None)
+            self.actors[sender_id] = name
+        self.latest = newer.latest
+
+    def row(self) -> dict:
+        ev = self.latest
+        body = ev.body
+        data = dict(ev.data)
+        if len(self.actors) > 1:
+            body = COALESCE_RULES[ev.type].multiple.format(
+                actor=ev.actor_name or "Кто-то",
+                others=len(self.actors) - 1,
+                target=ev.target_name or "",
+            )
+            data["count"] = len(self.actors)
+            data["sender_ids"] = [str(s) for s in self.actors if s]
+        return {
+            "id": uuid.uuid4(),
+            "recipient_id": ev.recipient_id,
+            "sender_id": ev.sender_id,
+            "type": ev.type,
+            "title": ev.title,
+            "body": body,
+            "data": data,
+            "is_read": False,
+        }
+
+
+async def write_notifications(rows: list[dict]) -> None:
+    """Insert a batch of notification rows with a single multi-row INSERT."""
+    async with async_session() as session:
+        await session.execute(insert(Notification), rows)
+        await session.commit()
+
+
+class NotificationFanout:
+    """Coalesces same-type events per recipient and target, then bulk-writes them.
+
+    Each flushed group becomes one ``notifications`` row and one push. A
+    failed write puts its groups back to be retried on the next tick; groups
+    still pending when the process dies are lost, so ``stop`` flushes them
+    all on shutdown.
+    """
+
+    def __init__(
+        self,
+        window: float | None = None,
+        tick: float | None = None,
+        writer: Callable[[list[dict]], Awaitable[None]] = write_notifications,
+        push=push_dispatcher,
+    ):
+        self.window = window if window is not None else settings.notification_coalesce_seconds
+        self.tick = tick if tick is not None else settings.notification_flush_interval_ms / 1000
+        self._writer = writer
+        self._push = push
+        self._groups: dict[tuple, _Group] = {}
+        self._worker: asyncio.Task | None = None
+        self.stats = {"events": 0, "written": 0, "coalesced": 0, "write_failures": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def metrics(self) -> dict:
+        return {**self.stats, "pending": len(self._groups)}
+
+    def start(self):
+        if not self.running:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.running:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        try:
+            await self.flush(force=True)
+        except Exception as e:
+            logger.error(f"Notification flush on shutdown failed, {len(self._groups)} groups dropped: {e}")
+
+    def enqueue(self, ev: NotificationEvent):
+        loop = asyncio.get_running_loop()
+        self.stats["events"] += 1
+        rule = COALESCE_RULES.get(ev.type)
+        if rule is None:
+            key = (ev.recipient_id, ev.type, uuid.uuid4())
+            deadline = loop.time()
+        else:
+            key = (ev.recipient_id, ev.type, ev.data.get(rule.target_key) if rule.target_key else None)
+            deadline = loop.time() + self.window
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group(deadline=deadline, latest=ev)
+        else:
+            self.stats["coalesced"] += 1
+        group.add(ev)
+        self.start()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Notification flush error: {e}")
+
+    async def flush(self, force: bool = False):
+        """Write every group whose window has closed (or all of them with ``force``)."""
+        now = asyncio.get_running_loop().time()
+        due = [key for key, group in self._groups.items() if force or group.deadline <= now]
+        if not due:
+            return
+        groups = {key: self._groups.pop(key) for key in due}
+        rows = [group.row() for group in groups.values()]
+        try:
+            await self._writer(rows)
+        except Exception:
+            self.stats["write_failures"] += 1
+            self._requeue(groups, now + self.tick)
+            raise
+        self.stats["written"] += len(rows)
+        await bump_unread_counts(Counter(row["recipient_id"] for row in rows))
+        for row in rows:
+            self._push.enqueue(PushMessage(
+                title=row["title"], body=row["body"], data=row["data"], user_id=row["recipient_id"],
+            ))
+
+    def _requeue(self, groups: dict[tuple, _Group], retry_at: float):
+        """Put groups whose write failed back, merging events that arrived meanwhile."""
+        for key, group in groups.items():
+            newer = self._groups.get(key)
+            if newer is not None:
+                group.absorb(newer)
+            group.deadline = retry_at
+            self._groups[key] = group
+
+
+notification_fanout = NotificationFanout()
+
+
+def notify(
+    db,
+    recipient_id: UUID,
+    type: str,
+    title: str,
+    body: str,
+    sender=None,
+    target_name: str | None = None,
+    data: dict | None = None,
+):
+    """Queue a notification; it is handed to the fan-out only if ``db`` commits."""
+    db.info.setdefault(PENDING_KEY, []).append(NotificationEvent(
+        recipient_id=recipient_id,
+        type=type,
+        title=title,
+        body=body,
+        sender_id=sender.id if sender else None,
+        actor_name=(sender.full_name or sender.username or "Кто-то") if sender else None,
+        target_name=target_name,
+        data=data or {},
+    ))
+
+
+_invalidate_tasks: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_commit")
+def _release_pending(session):
+    for ev in session.info.pop(PENDING_KEY, []):
+        notification_fanout.enqueue(ev)
+    changed = session.info.pop(UNREAD_CHANGED_KEY, None)
+    if changed:
+        task = asyncio.get_running_loop().create_task(invalidate_unread_counts(changed))
+        _invalidate_tasks.add(task)
+        task.add_done_callback(_invalidate_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
+    session.info.pop(UNREAD_CHANGED_KEY, None)
@@ -0,0 +1,116 @@
+"""
+Gap-based ordering keys for items (``items.sort_order``, BIGINT).
+
+Appends take ``nextval('items_sort_seq') * GAP``, the column's server
+default, so they need no ``max(sort_order)`` lookup and every replica draws
+from the same increasing source; an import reserves its keys in one query
+before the INSERT. Every other key is derived from existing ones and stays
+below the sequence, so an appended item always sorts last.
+Moving one item writes one row with the midpoint of its new neighbours'
+keys; when they are adjacent the wishlist is renumbered with ``GAP`` spacing
+in one statement. A full reorder is a single ``UPDATE ... FROM (VALUES ...)``.
+"""
+
+from uuid import UUID
+
+from sqlalchemy import BigInteger, Integer, Uuid, column, func, literal, literal_column, select, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.item import ITEMS_SORT_SEQ, SORT_KEY_GAP, Item
+from app.models.wishlist import Wishlist
+
+GAP = SORT_KEY_GAP
+
+
+def append_key():
+    """SQL expression for a key that sorts after every existing item."""
+    return literal_column(f"nextval('{ITEMS_SORT_SEQ.name}') * {GAP}", BigInteger)
+
+
+async def append_keys(db: AsyncSession, n: int) -> list[int]:
+    """``n`` increasing append keys for a batch, at least ``GAP`` apart, in one query."""
+    batch = select(literal(1, Integer).label("n")).cte("batch", recursive=True)
+    batch = batch.union_all(select(batch.c.n + 1).where(batch.c.n < n))
+    result = await db.scalars(select(append_key()).select_from(batch))
+    return sorted(result.all())
+
+
+def _owned(wishlist_id: UUID, owner_id: UUID):
+    return Item.wishlist_id.in_(
+        select(Wishlist.id).where(Wishlist.id == wishlist_id, Wishlist.owner_id == owner_id)
+    )
+
+
+async def reorder(db: AsyncSession, wishlist_id: UUID, owner_id: UUID, item_ids: list[UUID]) -> set[UUID]:
+    """Give ``item_ids`` keys in list order; returns the ids that were updated.
+
+    Ids that are not in the (owned) wishlist are skipped, so the caller can
+    compare the result with its input and roll back.
+    """
+    if not item_ids:
+        return set()
+    ranks = values(column("id", Uuid), column("rank", BigInteger), name="ranks").data(
+        [(item_id, (i + 1) * GAP) for i, item_id in enumerate(item_ids)]
+    )
+    result = await db.execute(
+        update(Item)
+        .where(Item.id == ranks.c.id, Item.wishlist_id == wishlist_id, _owned(wishlist_id, owner_id))
+        .values(sort_order=ranks.c.rank)
+        .returning(Item.id),
+        execution_options={"synchronize_session": False},
+    )
+    return set(result.scalars().all())
+
+
+async def renumber(db: AsyncSession, wishlist_id: UUID) -> None:
+    numbered = (
+        select(
+            Item.id,
+            (func.row_number().over(order_by=(Item.sort_order, Item.created_at)) * GAP).label("rank"),
+        )
+        .where(Item.wishlist_id == wishlist_id)
+        .subquery("numbered")
+    )
+    await db.execute(
+        update(Item).where(Item.id == numbered.c.id).values(sort_order=numbered.c.rank),
+        execution_options={"synchronize_session": False},
+    )
+
+
+async def _neighbour_keys(db: AsyncSession, item: Item, after_id: UUID | None) -> tuple[int | None, int | None]:
+    """Keys of ``after_id`` and of the next item after it (excluding ``item``), in one query."""
+    others = (Item.wishlist_id == item.wishlist_id, Item.id != item.id)
+    if after_id is None:
+        return None, await db.scalar(select(func.min(Item.sort_order)).where(*others))
+    lo_query = select(Item.sort_order).where(*others, Item.id == after_id).scalar_subquery()
+    hi_query = select(func.min(Item.sort_order)).where(*others, Item.sort_order > lo_query).scalar_subquery()
+    lo, hi = (await db.execute(select(lo_query, hi_query))).one()
+    if lo is None:
+        raise LookupError("after_id is not another item of this wishlist")
+    return lo, hi
+
+
+async def move(db: AsyncSession, item: Item, after_id: UUID | None = None) -> int:
+    """Place ``item`` directly after ``after_id`` (None = first) and return its new key.
+
+    Raises LookupError if ``after_id`` is not another item of the same wishlist.
+    """
+    lo, hi = await _neighbour_keys(db, item, after_id)
+    if lo is not None and hi is not None and hi - lo < 2:
+        await renumber(db, item.wishlist_id)
+        lo, hi = await _neighbour_keys(db, item, after_id)
+
+    if lo is not None and hi is not None:
+        key = (lo + hi) // 2
+    elif hi is not None:
+        key = hi - GAP
+    else:
+        # Last (or only) item: a fresh append key, which sorts after ``lo``
+        key = append_key()
+
+    result = await db.execute(
+        update(Item).where(Item.id == item.id).values(sort_order=key).returning(Item.sort_order),
+        execution_options={"synchronize_session": False},
+    )
+    item.sort_order = result.scalar_one()
+    return item.sort_order
@@ -0,0 +1,102 @@
+"""
+Dedicated thread pool for bcrypt, with admission control.
+
+bcrypt releases the GIL, so a small thread pool gives real parallelism
+without process start-up or pickling costs. Hashing no longer shares the
+loop's default executor with other blocking work. At most
+``password_hash_workers + password_hash_max_queue`` jobs may be admitted;
+beyond that ``HasherOverloaded`` is raised right away, and the routers turn
+it into a 503, instead of letting a login burst queue up for seconds.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import get_settings
+from app.utils.security import hash_password, verify_and_update_password
+
+settings = get_settings()
+
+
+class HasherOverloaded(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, workers: int | None = None, max_queue: int | None = None):
+        self.workers = workers or settings.password_hash_workers
+        self.max_queue = max_queue if max_queue is not None else settings.password_hash_max_queue
+        self._executor: ThreadPoolExecutor | None = None
+        self._admitted = 0
+        self.stats = {
+            "completed": 0,
+            "rejected": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "hash_seconds_total": 0.0,
+            "hash_seconds_max": 0.0,
+        }
+
+    @property
+    def in_flight(self) -> int:
+        return self._admitted
+
+    @staticmethod
+    def _timed(fn, args):
+        started = time.perf_counter()
+        return fn(*args), started, time.perf_counter()
+
+    def _record(self, submitted: float, started: float, finished: float):
+        wait, took = started - submitted, finished - started
+        self.stats["completed"] += 1
+        self.stats["wait_seconds_total"] += wait
+        self.stats["wait_seconds_max"] = max(self.stats["wait_seconds_max"], wait)
+        self.stats["hash_seconds_total"] += took
+        self.stats["hash_seconds_max"] = max(self.stats["hash_seconds_max"], took)
+
+    async def _run(self, fn, *args):
+        if self._admitted >= self.workers + self.max_queue:
+            self.stats["rejected"] += 1
+            raise HasherOverloaded()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._admitted += 1
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._timed, fn, args
+            )
+        finally:
+            self._admitted -= 1
+        # Stats are only touched on the event loop thread
+        self._record(submitted, started, finished)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> tuple[bool, str | None]:
+        """Whether ``password`` matches, plus a new hash if the stored one uses outdated settings."""
+        return await self._run(verify_and_update_password, password, password_hash)
+
+    def metrics(self) -> dict:
+        completed = self.stats["completed"] or 1
+        return {
+            "workers": self.workers,
+            "in_flight": self._admitted,
+            "completed": self.stats["completed"],
+            "rejected": self.stats["rejected"],
+            "wait_ms_avg": round(self.stats["wait_seconds_total"] / completed * 1000, 1),
+            "wait_ms_max": round(self.stats["wait_seconds_max"] * 1000, 1),
+            "hash_ms_avg": round(self.stats["hash_seconds_total"] / completed * 1000, 1),
+            "hash_ms_max": round(self.stats["hash_seconds_max"] * 1000, 1),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,178 @@
+"""
+Rendered-JSON cache for ``GET /wishlists/public/{share_token}``.
+
+Entries are keyed by share_token and tagged with a per-wishlist version.
+Mutation endpoints call ``mark_wishlist_changed``; the version is bumped once
+the request's transaction commits, which makes every older entry stale. An
+in-process LRU sits in front of Redis. With Redis, the version lives there so
+all workers agree. Without Redis, local entries also expire after a short TTL
+so other workers' writes show up quickly.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CHANGED_KEY = "changed_wishlists"
+VERSION_TTL_SECONDS = 7 * 24 * 3600
+
+
+@dataclass
+class CachedBody:
+    wishlist_id: UUID
+    version: int
+    etag: str
+    body: bytes
+    stored_at: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison as required for If-None-Match (RFC 9110 §13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def _version_key(wishlist_id: UUID) -> str:
+    return f"wl:ver:{wishlist_id}"
+
+
+def _body_key(share_token: str) -> str:
+    return f"wl:pub:{share_token}"
+
+
+class PublicWishlistCache:
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None, local_ttl: float | None = None):
+        self.max_entries = max_entries or settings.public_cache_max_entries
+        self.ttl = ttl or settings.public_cache_ttl_seconds
+        self.local_ttl = local_ttl or settings.public_cache_local_ttl_seconds
+        self._local: OrderedDict[str, CachedBody] = OrderedDict()
+        self._versions: dict[UUID, int] = {}
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    async def current_version(self, wishlist_id: UUID) -> int:
+        redis = await get_redis()
+        if redis:
+            try:
+                return int(await redis.get(_version_key(wishlist_id)) or 0)
+            except Exception as exc:
+                logger.debug("Redis GET failed: %s", exc)
+        return self._versions.get(wishlist_id, 0)
+
+    async def get(self, share_token: str) -> CachedBody | None:
+        redis = await get_redis()
+        max_age = self.ttl if redis else self.local_ttl
+        entry = self._local.get(share_token)
+        if entry is not None:
+            fresh = time.monotonic() - entry.stored_at < max_age
+            if fresh and entry.version == await self.current_version(entry.wishlist_id):
+                self._local.move_to_end(share_token)
+                self.stats["local_hits"] += 1
+                return entry
+            del self._local[share_token]
+
+        if redis:
+            try:
+                raw = await redis.get(_body_key(share_token))
+                if raw:
+                    data = json.loads(raw)
+                    wishlist_id = UUID(data["wishlist_id"])
+                    if data["version"] == await self.current_version(wishlist_id):
+                        entry = CachedBody(wishlist_id, data["version"], data["etag"], data["body"].encode(), time.monotonic())
+                        self._store_local(share_token, entry)
+                        self.stats["redis_hits"] += 1
+                        return entry
+            except Exception as exc:
+                logger.debug("Redis public cache read failed: %s", exc)
+
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, share_token: str, wishlist_id: UUID, version: int, body: bytes) -> CachedBody:
+        """Store a rendered body under the version read *before* rendering it."""
+        entry = CachedBody(wishlist_id, version, make_etag(body), body, time.monotonic())
+        self._store_local(share_token, entry)
+        redis = await get_redis()
+        if redis:
+            try:
+                await redis.setex(_body_key(share_token), self.ttl, json.dumps({
+                    "wishlist_id": str(wishlist_id),
+                    "version": version,
+                    "etag": entry.etag,
+                    "body": body.decode(),
+                }, ensure_ascii=False))
+            except Exception as exc:
+                logger.debug("Redis public cache write failed: %s", exc)
+        return entry
+
+    def _store_local(self, share_token: str, entry: CachedBody):
+        self._local[share_token] = entry
+        self._local.move_to_end(share_token)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def bump_local(self, wishlist_id: UUID):
+        self._versions[wishlist_id] = self._versions.get(wishlist_id, 0) + 1
+
+    async def bump_shared(self, wishlist_id: UUID):
+        redis = await get_redis()
+        if not redis:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.incr(_version_key(wishlist_id))
+                pipe.expire(_version_key(wishlist_id), VERSION_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as exc:
+            logger.debug("Redis version bump failed: %s", exc)
+
+    async def bump(self, wishlist_id: UUID):
+        self.bump_local(wishlist_id)
+        await self.bump_shared(wishlist_id)
+
+
+public_cache = PublicWishlistCache()
+
+
+def mark_wishlist_changed(db, wishlist_id: UUID):
+    """Invalidate the public cache for a wishlist once ``db`` commits."""
+    db.info.setdefault(CHANGED_KEY, set()).add(wishlist_id)
+
+
+_bump_tasks: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_changed(session):
+    for wishlist_id in session.info.pop(CHANGED_KEY, ()):
+        # The local version moves immediately; the shared Redis INCR follows on the loop
+        public_cache.bump_local(wishlist_id)
+        task = asyncio.get_running_loop().create_task(public_cache.bump_shared(wishlist_id))
+        _bump_tasks.add(task)
+        task.add_done_callback(_bump_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed(session):
+    session.info.pop(CHANGED_KEY, None)
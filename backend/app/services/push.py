@@ -1,49 +1,279 @@
+import asyncio
 import logging
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+from uuid import UUID
+
+import httpx
+from sqlalchemy import select, update
+
 from app.config import get_settings
+from app.database import async_session
+from app.models.user import User
+from app.services.user_cache import mark_user_changed
 from app.utils.http import get_http_client
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Expo accepts at most 100 messages per send and 1000 ids per receipt lookup
+EXPO_BATCH_SIZE = 100
+EXPO_RECEIPTS_BATCH_SIZE = 1000
+# Expo keeps receipts for about a day; after that the ids are useless
+RECEIPT_MAX_AGE_SECONDS = 24 * 3600
 
-async def send_push(expo_token: str, title: str, body: str, data: dict | None = None) -> bool:
-    """Send push notification via Expo Push API."""
-    if data is None:
-        data = {}
-    if not expo_token:
-        return False
+TokenResolver = Callable[[set[UUID]], Awaitable[dict[UUID, str]]]
+TokenPruner = Callable[[set[str]], Awaitable[None]]
+
+
+@dataclass
+class PushMessage:
+    title: str
+    body: str
+    data: dict = field(default_factory=dict)
+    token: str | None = None
+    user_id: UUID | None = None
 
-    try:
-        client = get_http_client()
-        response = await client.post(
-            settings.expo_push_url,
-            json={
-                "to": expo_token,
-                "title": title,
-                "body": body,
-                "data": data,
-                "sound": "default",
-            },
-            timeout=10,
+    def payload(self) -> dict:
+        return {
+            "to": self.token,
+            "title": self.title,
+            "body": self.body,
+            "data": self.data,
+            "sound": "default",
+        }
+
+
+async def load_push_tokens(user_ids: set[UUID]) -> dict[UUID, str]:
+    """Resolve push tokens for a whole batch of recipients in one query."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(User.id, User.expo_push_token)
+            .where(User.id.in_(user_ids), User.expo_push_token.isnot(None))
         )
-        result = response.json()
-        if response.status_code != 200:
-            logger.error(f"Push failed: {result}")
+        return {row[0]: row[1] for row in result.all()}
+
+
+async def prune_push_tokens(tokens: set[str]) -> None:
+    """Forget tokens Expo reported as DeviceNotRegistered."""
+    async with async_session() as session:
+        result = await session.execute(
+            update(User).where(User.expo_push_token.in_(tokens)).values(expo_push_token=None)
+            .returning(User.id)
+        )
+        mark_user_changed(session, *result.scalars().all())
+        await session.commit()
+
+
+def _is_dead_device(entry: dict) -> bool:
+    return (
+        entry.get("status") == "error"
+        and (entry.get("details") or {}).get("error") == "DeviceNotRegistered"
+    )
+
+
+class PushDispatcher:
+    """Buffers push messages for a short window and sends them to Expo in chunks.
+
+    Tickets returned by Expo are kept and their receipts are polled in the
+    background; tokens of uninstalled apps are cleared from ``users``.
+    """
+
+    def __init__(
+        self,
+        push_url: str | None = None,
+        receipts_url: str | None = None,
+        batch_window: float | None = None,
+        max_concurrency: int | None = None,
+        receipt_delay: float | None = None,
+        receipt_poll_interval: float | None = None,
+        client_factory: Callable[[], httpx.AsyncClient] = get_http_client,
+        resolve_tokens: TokenResolver = load_push_tokens,
+        prune_tokens: TokenPruner = prune_push_tokens,
+    ):
+        self.push_url = push_url or settings.expo_push_url
+        self.receipts_url = receipts_url or settings.expo_receipts_url
+        self.batch_window = batch_window if batch_window is not None else settings.push_batch_window_ms / 1000
+        self.max_concurrency = max_concurrency or settings.push_max_concurrency
+        self.receipt_delay = receipt_delay if receipt_delay is not None else settings.push_receipt_delay_seconds
+        self.receipt_poll_interval = receipt_poll_interval or settings.push_receipt_poll_seconds
+        self._client_factory = client_factory
+        self._resolve_tokens = resolve_tokens
+        self._prune_tokens = prune_tokens
+
+        self._queue: asyncio.Queue[PushMessage] | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._worker: asyncio.Task | None = None
+        self._receipt_worker: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+        # ticket id -> (token, monotonic send time)
+        self._pending_receipts: dict[str, tuple[str, float]] = {}
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "batches": 0, "pruned": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches_in_flight": len(self._inflight),
+            "pending_receipts": len(self._pending_receipts),
+        }
+
+    def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._worker = asyncio.create_task(self._run())
+        self._receipt_worker = asyncio.create_task(self._poll_receipts())
+
+    async def stop(self):
+        if not self.running:
+            return
+        await self.flush()
+        for task in (self._worker, self._receipt_worker):
+            task.cancel()
+        await asyncio.gather(self._worker, self._receipt_worker, return_exceptions=True)
+        self._worker = self._receipt_worker = None
+
+    async def flush(self):
+        """Wait until every queued message has been handed to Expo."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def enqueue(self, message: PushMessage) -> bool:
+        if not message.token and not message.user_id:
             return False
+        self.start()
+        self._queue.put_nowait(message)
+        self.stats["queued"] += 1
         return True
-    except Exception as e:
-        logger.error(f"Push error: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        max_buffer = EXPO_BATCH_SIZE * self.max_concurrency
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < max_buffer:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list[PushMessage]):
+        try:
+            user_ids = {m.user_id for m in batch if not m.token and m.user_id}
+            if user_ids:
+                tokens = await self._resolve_tokens(user_ids)
+                for m in batch:
+                    if not m.token and m.user_id:
+                        m.token = tokens.get(m.user_id)
+            deliverable = [m for m in batch if m.token]
+            chunks = [deliverable[i:i + EXPO_BATCH_SIZE] for i in range(0, len(deliverable), EXPO_BATCH_SIZE)]
+            dead = set()
+            for chunk_dead in await asyncio.gather(*(self._send_chunk(c) for c in chunks)):
+                dead |= chunk_dead
+            if dead:
+                await self._prune(dead)
+        except Exception as e:
+            logger.error(f"Push dispatch error: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _send_chunk(self, chunk: list[PushMessage]) -> set[str]:
+        dead = set()
+        async with self._semaphore:
+            try:
+                client = self._client_factory()
+                response = await client.post(self.push_url, json=[m.payload() for m in chunk], timeout=10)
+                result = response.json()
+            except Exception as e:
+                logger.error(f"Push error: {e}")
+                self.stats["failed"] += len(chunk)
+                return dead
+        self.stats["batches"] += 1
+        if response.status_code != 200:
+            logger.error(f"Push failed: {result}")
+            self.stats["failed"] += len(chunk)
+            return dead
+
+        now = time.monotonic()
+        for message, ticket in zip(chunk, result.get("data") or []):
+            if ticket.get("status") == "ok":
+                self.stats["sent"] += 1
+                if ticket.get("id"):
+                    self._pending_receipts[ticket["id"]] = (message.token, now)
+            else:
+                self.stats["failed"] += 1
+                if _is_dead_device(ticket):
+                    dead.add(message.token)
+        return dead
+
+    async def _poll_receipts(self):
+        while True:
+            await asyncio.sleep(self.receipt_poll_interval)
+            try:
+                await self.check_receipts()
+            except Exception as e:
+                logger.error(f"Push receipts error: {e}")
+
+    async def check_receipts(self, force: bool = False):
+        """Fetch receipts for tickets old enough to have one and prune dead tokens."""
+        now = time.monotonic()
+        for ticket_id, (_, sent_at) in list(self._pending_receipts.items()):
+            if now - sent_at > RECEIPT_MAX_AGE_SECONDS:
+                del self._pending_receipts[ticket_id]
+        ready = [
+            ticket_id for ticket_id, (_, sent_at) in self._pending_receipts.items()
+            if force or now - sent_at >= self.receipt_delay
+        ]
+        dead = set()
+        client = self._client_factory()
+        for i in range(0, len(ready), EXPO_RECEIPTS_BATCH_SIZE):
+            ids = ready[i:i + EXPO_RECEIPTS_BATCH_SIZE]
+            response = await client.post(self.receipts_url, json={"ids": ids}, timeout=10)
+            if response.status_code != 200:
+                logger.error(f"Push receipts failed: {response.text}")
+                continue
+            for ticket_id, receipt in (response.json().get("data") or {}).items():
+                entry = self._pending_receipts.pop(ticket_id, None)
+                if entry and _is_dead_device(receipt):
+                    dead.add(entry[0])
+        if dead:
+            await self._prune(dead)
+
+    async def _prune(self, tokens: set[str]):
+        await self._prune_tokens(tokens)
+        self.stats["pruned"] += len(tokens)
+        logger.info(f"Pruned {len(tokens)} unregistered push tokens")
+
+
+push_dispatcher = PushDispatcher()
+
+
+async def send_push(expo_token: str, title: str, body: str, data: dict | None = None) -> bool:
+    """Queue a push notification for batched delivery via Expo Push API."""
+    if data is None:
+        data = {}
+    if not expo_token:
         return False
+    return push_dispatcher.enqueue(PushMessage(title=title, body=body, data=data, token=expo_token))
 
 
 async def send_push_to_user(db, user_id, title: str, body: str, data: dict | None = None):
-    """Helper: look up user's push token and send notification."""
+    """Helper: queue a notification for a user; the dispatcher resolves tokens per batch."""
     if data is None:
         data = {}
-    from sqlalchemy import select
-    from app.models.user import User
-
-    result = await db.execute(select(User.expo_push_token).where(User.id == user_id))
-    token = result.scalar_one_or_none()
-    if token:
-        await send_push(token, title, body, data)
+    push_dispatcher.enqueue(PushMessage(title=title, body=body, data=data, user_id=user_id))
@@ -0,0 +1,214 @@
+"""
+Rate limiting shared by every worker.
+
+Each rule ("5/minute") is enforced per client IP and, when the caller is
+authenticated, per user, with a sliding-window counter: the previous
+fixed window's count, weighted by how much of it still overlaps the
+sliding window, plus the current window's count. Counters live in Redis
+when ``redis_url`` is set, so all workers and restarts share them; without
+Redis (or if a call fails) a bounded in-process table is used instead.
+
+Behind Railway's proxy the peer address is the proxy's, so the client IP
+is read from ``X-Forwarded-For``: the entry ``trusted_proxy_hops`` from
+the right, which the client cannot forge. The default is 1 on Railway and 0
+elsewhere.
+"""
+
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from uuid import UUID
+
+from fastapi import HTTPException, Request
+from starlette.requests import HTTPConnection
+
+from app.config import get_settings
+from app.utils.redis import get_redis
+from app.utils.security import decode_token
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+TRUSTED_PROXY_HOPS = (
+    settings.trusted_proxy_hops if settings.trusted_proxy_hops is not None
+    else 1 if os.getenv("RAILWAY_ENVIRONMENT") else 0
+)
+
+# KEYS: current window, previous window. ARGV: limit, previous-window weight, ttl.
+# Counts the hit only if it is allowed, so rejected retries don't extend a lockout.
+_SLIDING_WINDOW = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + current >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class Rule:
+    limit: int
+    window: int
+
+
+@lru_cache()
+def parse_rule(rule: str) -> Rule:
+    """``"<n>/<second|minute|hour|day>"``."""
+    count, period = rule.split("/")
+    return Rule(int(count), PERIODS[period.strip().rstrip("s")])
+
+
+def client_ip(conn: HTTPConnection) -> str:
+    if TRUSTED_PROXY_HOPS:
+        forwarded = [p.strip() for p in conn.headers.get("x-forwarded-for", "").split(",") if p.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return conn.client.host if conn.client else "unknown"
+
+
+def _bearer_user_id(conn: HTTPConnection) -> str | None:
+    scheme, _, token = conn.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = decode_token(token)
+    if not payload or payload.get("type") != "access":
+        return None
+    return payload.get("sub")
+
+
+class SlidingWindowLimiter:
+    def __init__(self, max_local_keys: int | None = None):
+        self.max_local_keys = max_local_keys or settings.rate_limit_local_max_keys
+        self._local: OrderedDict[str, int] = OrderedDict()
+        self.stats = {"allowed": 0, "limited": 0}
+
+    def _hit_local(self, current_key: str, previous_key: str, rule: Rule, weight: float) -> bool:
+        current = self._local.get(current_key, 0)
+        if self._local.get(previous_key, 0) * weight + current >= rule.limit:
+            return False
+        self._local[current_key] = current + 1
+        self._local.move_to_end(current_key)
+        while len(self._local) > self.max_local_keys:
+            self._local.popitem(last=False)
+        return True
+
+    @staticmethod
+    def _windows(key: str, rule: Rule, now: float | None) -> tuple[str, str, float, float]:
+        now = time.time() if now is None else now
+        window, offset = divmod(now, rule.window)
+        return f"rl:{key}:{int(window)}", f"rl:{key}:{int(window) - 1}", 1 - offset / rule.window, offset
+
+    def _refused(self, rule: Rule, offset: float) -> float:
+        self.stats["limited"] += 1
+        return max(1.0, math.ceil(rule.window - offset))
+
+    async def hit(self, key: str, rule: Rule, now: float | None = None) -> float | None:
+        """Count one request against ``key``; returns None if allowed, else seconds until a retry may pass."""
+        current_key, previous_key, weight, offset = self._windows(key, rule, now)
+
+        allowed = None
+        redis = await get_redis()
+        if redis:
+            try:
+                allowed = bool(await redis.eval(
+                    _SLIDING_WINDOW, 2, current_key, previous_key, rule.limit, weight, rule.window * 2
+                ))
+            except Exception as exc:
+                logger.debug("Redis rate limit failed: %s", exc)
+        if allowed is None:
+            allowed = self._hit_local(current_key, previous_key, rule, weight)
+
+        if allowed:
+            self.stats["allowed"] += 1
+            return None
+        return self._refused(rule, offset)
+
+    async def peek(self, key: str, rule: Rule, now: float | None = None) -> float | None:
+        """Like ``hit``, but without counting anything."""
+        current_key, previous_key, weight, offset = self._windows(key, rule, now)
+
+        counts = None
+        redis = await get_redis()
+        if redis:
+            try:
+                counts = [int(n or 0) for n in await redis.mget(current_key, previous_key)]
+            except Exception as exc:
+                logger.debug("Redis rate limit failed: %s", exc)
+        if counts is None:
+            counts = [self._local.get(current_key, 0), self._local.get(previous_key, 0)]
+
+        current, previous = counts
+        if previous * weight + current >= rule.limit:
+            return self._refused(rule, offset)
+        return None
+
+
+limiter = SlidingWindowLimiter()
+
+
+async def check(conn: HTTPConnection, scope: str, rule: str, user_id: UUID | str | None = None) -> float | None:
+    """Apply ``rule`` to the caller's IP and user; returns the Retry-After if either is over."""
+    if not settings.rate_limit_enabled:
+        return None
+    parsed = parse_rule(rule)
+    user_id = user_id or _bearer_user_id(conn)
+    keys = [f"{scope}:ip:{client_ip(conn)}"]
+    if user_id:
+        keys.append(f"{scope}:user:{user_id}")
+    for key in keys:
+        retry_after = await limiter.hit(key, parsed)
+        if retry_after:
+            return retry_after
+    return None
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Слишком много запросов, попробуйте позже",
+        headers={"Retry-After": str(int(retry_after))},
+    )
+
+
+async def enforce_key(scope: str, key: str, rule: str) -> None:
+    """Limit on an arbitrary key, such as the account a login is aimed at."""
+    if not settings.rate_limit_enabled:
+        return
+    retry_after = await limiter.hit(f"{scope}:{key}", parse_rule(rule))
+    if retry_after:
+        raise too_many_requests(retry_after)
+
+
+async def check_key(scope: str, key: str, rule: str) -> None:
+    """Refuse if ``key`` is already over ``rule``, without counting this call; pair with ``count_key``."""
+    if not settings.rate_limit_enabled:
+        return
+    retry_after = await limiter.peek(f"{scope}:{key}", parse_rule(rule))
+    if retry_after:
+        raise too_many_requests(retry_after)
+
+
+async def count_key(scope: str, key: str, rule: str) -> None:
+    """Count one event, such as a failed login, against ``key``."""
+    if settings.rate_limit_enabled:
+        await limiter.hit(f"{scope}:{key}", parse_rule(rule))
+
+
+def rate_limit(rule: str, scope: str):
+    """Route dependency: ``dependencies=[Depends(rate_limit("5/minute", "login"))]``."""
+    parse_rule(rule)
+
+    async def dependency(request: Request):
+        retry_after = await check(request, scope, rule)
+        if retry_after:
+            raise too_many_requests(retry_after)
+
+    return dependency
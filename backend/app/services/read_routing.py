@@ -0,0 +1,167 @@
+"""
+Routing of read-only endpoints between the primary and a read replica.
+
+Endpoints that only read take their session from ``get_read_db``, which
+uses the replica (``database_replica_url``) unless:
+
+* the caller committed a write in the last ``read_your_writes_seconds``,
+  so they always see their own changes. Writes are detected per session
+  (a flush with changes, or an INSERT/UPDATE/DELETE statement) and
+  attributed to the user the request authenticated as. The marker lives
+  in-process and in Redis, so the next request may land on any worker.
+* the replica's measured lag is above ``replica_max_lag_seconds`` or
+  it can't be reached; then every read goes to the primary until the next
+  successful check.
+
+Lag is ``now() - pg_last_xact_replay_timestamp()`` on the replica, or 0 when
+it has replayed everything it has received. Pointing the replica URL at
+the primary itself (a single local instance) reports a lag of 0.
+"""
+
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from uuid import UUID
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import async_session, read_session, replica_engine
+from app.utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+WROTE_KEY = "wrote"
+
+# Set by the auth dependencies, so a commit can be attributed to the caller
+request_user_id: ContextVar[UUID | None] = ContextVar("request_user_id", default=None)
+
+_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def _redis_key(user_id: UUID) -> str:
+    return f"ryw:{user_id}"
+
+
+class ReadRouter:
+    def __init__(self, window: float | None = None, max_lag: float | None = None, enabled: bool | None = None):
+        self.window = window or settings.read_your_writes_seconds
+        self.max_lag = max_lag or settings.replica_max_lag_seconds
+        self.enabled = replica_engine is not None if enabled is None else enabled
+        # user id -> monotonic time until which their reads stay on the primary
+        self._recent_writers: dict[UUID, float] = {}
+        self.lag_seconds: float | None = 0.0
+        self._task: asyncio.Task | None = None
+        self.stats = {"replica_reads": 0, "primary_reads": 0, "lag_check_errors": 0}
+
+    def replica_usable(self) -> bool:
+        return self.enabled and self.lag_seconds is not None and self.lag_seconds <= self.max_lag
+
+    def note_write_local(self, user_id: UUID):
+        now = time.monotonic()
+        self._recent_writers[user_id] = now + self.window
+        if len(self._recent_writers) > 10000:
+            self._recent_writers = {u: t for u, t in self._recent_writers.items() if t > now}
+
+    async def note_write_shared(self, user_id: UUID):
+        redis = await get_redis()
+        if not redis:
+            return
+        try:
+            await redis.set(_redis_key(user_id), 1, ex=max(int(self.window), 1))
+        except Exception as exc:
+            logger.debug("Redis SET failed: %s", exc)
+
+    async def wrote_recently(self, user_id: UUID) -> bool:
+        if self._recent_writers.get(user_id, 0) > time.monotonic():
+            return True
+        redis = await get_redis()
+        if redis:
+            try:
+                return bool(await redis.exists(_redis_key(user_id)))
+            except Exception as exc:
+                logger.debug("Redis EXISTS failed: %s", exc)
+        return False
+
+    async def use_replica(self, user_id: UUID | None) -> bool:
+        use = self.replica_usable() and not (user_id and await self.wrote_recently(user_id))
+        self.stats["replica_reads" if use else "primary_reads"] += 1
+        return use
+
+    def session(self, use_replica: bool):
+        return read_session() if use_replica else async_session()
+
+    async def check_lag(self) -> float | None:
+        try:
+            async with replica_engine.connect() as conn:
+                self.lag_seconds = float(await conn.scalar(_LAG_QUERY))
+        except Exception as exc:
+            self.stats["lag_check_errors"] += 1
+            logger.warning("Replica lag check failed, reading from the primary: %s", exc)
+            self.lag_seconds = None
+        return self.lag_seconds
+
+    async def _run(self):
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(settings.replica_lag_check_seconds)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {"enabled": self.enabled, "lag_seconds": self.lag_seconds, **self.stats}
+
+
+read_router = ReadRouter()
+
+
+@event.listens_for(Session, "after_flush")
+def _flushed(session, flush_context):
+    session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[WROTE_KEY] = True
+
+
+_note_tasks: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_commit")
+def _note_write(session):
+    if not session.info.pop(WROTE_KEY, False) or not read_router.enabled:
+        return
+    user_id = request_user_id.get()
+    if user_id is None:
+        return
+    read_router.note_write_local(user_id)
+    task = asyncio.get_running_loop().create_task(read_router.note_write_shared(user_id))
+    _note_tasks.add(task)
+    task.add_done_callback(_note_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_write(session):
+    session.info.pop(WROTE_KEY, None)
@@ -0,0 +1,221 @@
+"""
+Refresh-token families.
+
+A sign-in creates one ``refresh_tokens`` row, the family, and every refresh
+token carries its family id (``fam``) and generation (``gen``). Refreshing
+bumps the row's generation in place with a compare-and-set ``UPDATE``, so
+a session is one row for its whole life instead of a delete + insert per
+refresh. Presenting an older generation means the token was copied: the
+family is deleted and every token in it stops working. The one exception
+is the immediately previous generation within
+``refresh_reuse_grace_seconds``, which covers a client retrying a refresh
+whose response it never received.
+
+Known generations and revocations are published to a per-process LRU and
+Redis after commit. Generations only grow, so a stale cached value can
+still reject old or revoked tokens without touching the database.
+
+Rows made before families existed still have their token hash in
+``token``; their next refresh turns them into a family.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import delete, event, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.refresh_token import RefreshToken
+from app.utils.redis import get_redis
+from app.utils.security import create_refresh_token, decode_token, hash_token
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+REVOKED = -1
+CHANGED_KEY = "changed_token_families"
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def _expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
+
+
+def _redis_key(family_id: UUID) -> str:
+    return f"rtf:{family_id}"
+
+
+class FamilyCache:
+    """Latest known generation per family, or REVOKED."""
+
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None):
+        self.max_entries = max_entries or settings.refresh_family_cache_entries
+        self.ttl = ttl or settings.refresh_family_cache_ttl_seconds
+        self._local: OrderedDict[UUID, tuple[int, float]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get_local(self, family_id: UUID) -> int | None:
+        cached = self._local.get(family_id)
+        if cached is None or time.monotonic() - cached[1] >= self.ttl:
+            self._local.pop(family_id, None)
+            return None
+        self._local.move_to_end(family_id)
+        return cached[0]
+
+    def put_local(self, family_id: UUID, generation: int):
+        self._local[family_id] = (generation, time.monotonic())
+        self._local.move_to_end(family_id)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, family_id: UUID) -> int | None:
+        generation = self.get_local(family_id)
+        if generation is None:
+            redis = await get_redis()
+            if redis:
+                try:
+                    raw = await redis.get(_redis_key(family_id))
+                except Exception as exc:
+                    logger.debug("Redis GET failed: %s", exc)
+                    raw = None
+                if raw is not None:
+                    generation = int(raw)
+                    self.put_local(family_id, generation)
+        self.stats["hits" if generation is not None else "misses"] += 1
+        return generation
+
+    async def publish_shared(self, family_id: UUID, generation: int):
+        redis = await get_redis()
+        if not redis:
+            return
+        try:
+            await redis.set(_redis_key(family_id), generation, ex=settings.refresh_token_expire_days * 86400)
+        except Exception as exc:
+            logger.debug("Redis SET failed: %s", exc)
+
+
+family_cache = FamilyCache()
+
+
+def _publish(db, family_id: UUID, generation: int):
+    db.info.setdefault(CHANGED_KEY, {})[family_id] = generation
+
+
+async def issue(db: AsyncSession, user_id: UUID) -> str:
+    """Start a new family (one per sign-in) and return its first refresh token."""
+    family = RefreshToken(id=uuid.uuid4(), user_id=user_id, generation=0, expires_at=_expiry())
+    db.add(family)
+    return create_refresh_token(user_id, family.id, 0)
+
+
+async def _revoke_family(db: AsyncSession, family_id: UUID):
+    await db.execute(delete(RefreshToken).where(RefreshToken.id == family_id))
+    _publish(db, family_id, REVOKED)
+
+
+async def _reject_reuse(db: AsyncSession, family_id: UUID):
+    await _revoke_family(db, family_id)
+    # The caller is about to fail the request, which would roll the revocation back
+    await db.commit()
+    raise InvalidRefreshToken()
+
+
+async def _rotate_legacy(db: AsyncSession, token: str) -> tuple[UUID, str]:
+    result = await db.execute(select(RefreshToken).where(RefreshToken.token == hash_token(token)))
+    rt = result.scalar_one_or_none()
+    if not rt or rt.expires_at < datetime.now(timezone.utc):
+        raise InvalidRefreshToken()
+    rt.token = None
+    rt.generation = 1
+    rt.rotated_at = datetime.now(timezone.utc)
+    rt.expires_at = _expiry()
+    _publish(db, rt.id, 1)
+    return rt.user_id, create_refresh_token(rt.user_id, rt.id, 1)
+
+
+async def rotate(db: AsyncSession, token: str) -> tuple[UUID, str]:
+    """Exchange a refresh token for the next one in its family; returns (user_id, new token).
+
+    Raises InvalidRefreshToken. A reused token also revokes its family,
+    and that revocation is committed before raising.
+    """
+    payload = decode_token(token)
+    if not payload or payload.get("type") != "refresh":
+        raise InvalidRefreshToken()
+    if "fam" not in payload:
+        return await _rotate_legacy(db, token)
+    try:
+        family_id, generation, user_id = UUID(payload["fam"]), int(payload["gen"]), UUID(payload["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidRefreshToken()
+
+    known = await family_cache.get(family_id)
+    if known == REVOKED:
+        raise InvalidRefreshToken()
+    if known is not None and generation < known - 1:
+        await _reject_reuse(db, family_id)
+
+    now = datetime.now(timezone.utc)
+    result = await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.id == family_id,
+            RefreshToken.user_id == user_id,
+            RefreshToken.expires_at > now,
+            or_(
+                RefreshToken.generation == generation,
+                # Retry of a refresh whose response was lost
+                (RefreshToken.generation == generation + 1)
+                & (RefreshToken.rotated_at > now - timedelta(seconds=settings.refresh_reuse_grace_seconds)),
+            ),
+        )
+        .values(generation=RefreshToken.generation + 1, rotated_at=now, expires_at=_expiry())
+        .returning(RefreshToken.generation),
+        execution_options={"synchronize_session": False},
+    )
+    new_generation = result.scalar_one_or_none()
+    if new_generation is None:
+        # Revoked, expired, or an older generation presented again
+        await _reject_reuse(db, family_id)
+    _publish(db, family_id, new_generation)
+    return user_id, create_refresh_token(user_id, family_id, new_generation)
+
+
+async def revoke(db: AsyncSession, token: str) -> None:
+    """Log out the session ``token`` belongs to; unknown tokens are ignored."""
+    payload = decode_token(token)
+    if payload and payload.get("type") == "refresh" and "fam" in payload:
+        try:
+            family_id = UUID(payload["fam"])
+        except (TypeError, ValueError):
+            return
+        await _revoke_family(db, family_id)
+    else:
+        await db.execute(delete(RefreshToken).where(RefreshToken.token == hash_token(token)))
+
+
+_publish_tasks: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changed(session):
+    for family_id, generation in session.info.pop(CHANGED_KEY, {}).items():
+        family_cache.put_local(family_id, generation)
+        task = asyncio.get_running_loop().create_task(family_cache.publish_shared(family_id, generation))
+        _publish_tasks.add(task)
+        task.add_done_callback(_publish_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed(session):
+    session.info.pop(CHANGED_KEY, None)
@@ -0,0 +1,175 @@
+"""
+Snapshot cache for the authenticated user, so ``get_current_user`` rarely
+needs ``SELECT ... FROM users``.
+
+Snapshots are plain column values (``password_hash`` is never cached) held
+in a per-process LRU for ``user_cache_ttl_seconds`` and, with Redis, shared
+for ``user_cache_shared_ttl_seconds``. A hit is attached to the request's
+session as a persistent ``User``, so endpoints can still modify it. Any
+flushed change to a ``User`` drops its snapshot once the transaction
+commits; Core ``UPDATE``s must call ``mark_user_changed`` themselves.
+Other workers' local copies go stale for at most the local TTL.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from uuid import UUID
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.config import get_settings
+from app.models.user import User
+from app.utils.redis import get_redis
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CHANGED_KEY = "changed_users"
+SNAPSHOT_COLUMNS = [c for c in User.__table__.columns if c.key != "password_hash"]
+
+
+def _redis_key(user_id: UUID) -> str:
+    return f"user:snap:{user_id}"
+
+
+def snapshot(user: User) -> dict:
+    return {c.key: getattr(user, c.key) for c in SNAPSHOT_COLUMNS}
+
+
+def dumps(snap: dict) -> str:
+    return json.dumps(snap, default=str)
+
+
+def loads(raw: str) -> dict:
+    data = json.loads(raw)
+    for c in SNAPSHOT_COLUMNS:
+        value = data.get(c.key)
+        if value is not None and c.type.python_type is datetime:
+            data[c.key] = datetime.fromisoformat(value)
+        elif value is not None and c.type.python_type is UUID:
+            data[c.key] = UUID(value)
+    return data
+
+
+class UserCache:
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None, shared_ttl: int | None = None):
+        self.max_entries = max_entries or settings.user_cache_max_entries
+        self.ttl = ttl or settings.user_cache_ttl_seconds
+        self.shared_ttl = shared_ttl or settings.user_cache_shared_ttl_seconds
+        self._local: OrderedDict[UUID, tuple[dict, float]] = OrderedDict()
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def get_local(self, user_id: UUID) -> dict | None:
+        cached = self._local.get(user_id)
+        if cached is None or time.monotonic() - cached[1] >= self.ttl:
+            self._local.pop(user_id, None)
+            return None
+        self._local.move_to_end(user_id)
+        return cached[0]
+
+    def put_local(self, user_id: UUID, snap: dict):
+        self._local[user_id] = (snap, time.monotonic())
+        self._local.move_to_end(user_id)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    async def get(self, user_id: UUID) -> dict | None:
+        snap = self.get_local(user_id)
+        if snap is not None:
+            self.stats["local_hits"] += 1
+            return snap
+        redis = await get_redis()
+        if redis:
+            try:
+                raw = await redis.get(_redis_key(user_id))
+            except Exception as exc:
+                logger.debug("Redis GET failed: %s", exc)
+                raw = None
+            if raw:
+                snap = loads(raw)
+                self.put_local(user_id, snap)
+                self.stats["redis_hits"] += 1
+                return snap
+        self.stats["misses"] += 1
+        return None
+
+    async def put(self, user_id: UUID, snap: dict):
+        self.put_local(user_id, snap)
+        redis = await get_redis()
+        if redis:
+            try:
+                await redis.set(_redis_key(user_id), dumps(snap), ex=self.shared_ttl)
+            except Exception as exc:
+                logger.debug("Redis SET failed: %s", exc)
+
+    def invalidate_local(self, *user_ids: UUID):
+        for user_id in user_ids:
+            self._local.pop(user_id, None)
+
+    async def invalidate_shared(self, *user_ids: UUID):
+        redis = await get_redis()
+        if not redis or not user_ids:
+            return
+        try:
+            await redis.delete(*(_redis_key(user_id) for user_id in user_ids))
+        except Exception as exc:
+            logger.debug("Redis DEL failed: %s", exc)
+
+
+user_cache = UserCache()
+
+
+async def load_user(db: AsyncSession, user_id: UUID) -> User | None:
+    """The user attached to ``db``, from the cache when possible."""
+    existing = db.identity_map.get(db.identity_key(User, user_id))
+    if existing is not None:
+        return existing
+    snap = await user_cache.get(user_id)
+    if snap is None:
+        user = await db.get(User, user_id)
+        if user is not None:
+            await user_cache.put(user_id, snapshot(user))
+        return user
+
+    user = User(**snap)
+    # Looks as if just loaded: no pending changes, password_hash left unloaded
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+def mark_user_changed(db, *user_ids: UUID):
+    """Drop cached snapshots once ``db`` commits."""
+    db.info.setdefault(CHANGED_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed(session, flush_context):
+    changed = [obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)]
+    if changed:
+        mark_user_changed(session, *changed)
+
+
+_invalidate_tasks: set[asyncio.Task] = set()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed(session):
+    user_ids = session.info.pop(CHANGED_KEY, None)
+    if not user_ids:
+        return
+    user_cache.invalidate_local(*user_ids)
+    task = asyncio.get_running_loop().create_task(user_cache.invalidate_shared(*user_ids))
+    _invalidate_tasks.add(task)
+    task.add_done_callback(_invalidate_tasks.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed(session):
+    session.info.pop(CHANGED_KEY, None)
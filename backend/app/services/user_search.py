@@ -0,0 +1,113 @@
+"""
+User search backed by the pg_trgm GIN indexes on ``username``/``full_name``.
+
+Matches are first narrowed to the ``user_search_max_candidates`` best by
+tier (exact username, username prefix, name or word prefix, anywhere) and
+trigram similarity. Only those get their mutual friends counted, and are
+ranked by tier, then mutual friends, then similarity. Pages are
+keyset-paginated on that sort key within the same candidate set.
+First pages are kept briefly per caller, since clients re-send the same
+query while typing and deleting.
+"""
+
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+from sqlalchemy import Integer, case, cast, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.config import get_settings
+from app.models.friend_edge import FriendEdge
+from app.models.user import User
+
+settings = get_settings()
+
+SortKey = tuple[int, int, int, UUID]
+
+
+def _escape_like(q: str) -> str:
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _ranked(me: UUID, q: str):
+    safe_q = _escape_like(q)
+    tier = case(
+        (func.lower(User.username) == q.lower(), 0),
+        (User.username.ilike(f"{safe_q}%"), 1),
+        (User.full_name.ilike(f"{safe_q}%") | User.full_name.ilike(f"% {safe_q}%"), 2),
+        else_=3,
+    )
+    similarity = func.greatest(
+        func.similarity(func.coalesce(User.username, ""), q),
+        func.similarity(func.coalesce(User.full_name, ""), q),
+    )
+    tier = tier.label("tier")
+    neg_score = (-cast(similarity * 1000, Integer)).label("neg_score")
+    candidates = (
+        select(User.id, tier, neg_score)
+        .where(
+            User.id != me,
+            User.username.ilike(f"%{safe_q}%") | User.full_name.ilike(f"%{safe_q}%"),
+        )
+        .order_by(tier, neg_score, User.id)
+        .limit(settings.user_search_max_candidates)
+        .subquery("candidates")
+    )
+    mine, theirs = aliased(FriendEdge), aliased(FriendEdge)
+    mutual = (
+        select(func.count())
+        .select_from(mine)
+        .join(theirs, theirs.user_id == mine.friend_id)
+        .where(mine.user_id == me, theirs.friend_id == candidates.c.id)
+        .scalar_subquery()
+    )
+    # Ascending on every column so the sort key compares as one row value
+    return select(
+        candidates.c.id,
+        candidates.c.tier,
+        (-mutual).label("neg_mutual"),
+        candidates.c.neg_score,
+    ).subquery("ranked")
+
+
+async def search_users(
+    db: AsyncSession, me: UUID, q: str, limit: int, after: SortKey | None = None
+) -> list[tuple[User, SortKey]]:
+    """One page of matches with their sort keys; fetches ``limit + 1`` to detect a next page."""
+    ranked = _ranked(me, q)
+    key = tuple_(ranked.c.tier, ranked.c.neg_mutual, ranked.c.neg_score, ranked.c.id)
+    query = select(User, ranked.c.tier, ranked.c.neg_mutual, ranked.c.neg_score).join(ranked, ranked.c.id == User.id)
+    if after is not None:
+        query = query.where(key > tuple_(*after))
+    result = await db.execute(
+        query.order_by(ranked.c.tier, ranked.c.neg_mutual, ranked.c.neg_score, ranked.c.id).limit(limit + 1)
+    )
+    return [(u, (tier, neg_mutual, neg_score, u.id)) for u, tier, neg_mutual, neg_score in result.all()]
+
+
+class SearchResultCache:
+    """Short-lived per-caller cache of first pages, keyed by normalized query."""
+
+    def __init__(self, max_entries: int | None = None, ttl: float | None = None):
+        self.max_entries = max_entries or settings.user_search_cache_entries
+        self.ttl = ttl or settings.user_search_cache_ttl_seconds
+        self._pages: OrderedDict[tuple, tuple[object, float]] = OrderedDict()
+
+    def get(self, key: tuple):
+        cached = self._pages.get(key)
+        if cached is None or time.monotonic() - cached[1] >= self.ttl:
+            self._pages.pop(key, None)
+            return None
+        self._pages.move_to_end(key)
+        return cached[0]
+
+    def put(self, key: tuple, page):
+        self._pages[key] = (page, time.monotonic())
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_entries:
+            self._pages.popitem(last=False)
+
+
+search_cache = SearchResultCache()
@@ -0,0 +1,230 @@
+"""
+Per-user profile statistics, kept in ``user_stats`` so ``GET /stats/me`` is
+one primary-key lookup.
+
+Item and reservation mutations apply deltas in the same transaction.
+Per-category, per-month (``YYYY-MM``, UTC) and per-giver counts are JSONB
+maps; keys that fall to zero are dropped. Bulk changes (deleting a whole
+wishlist) recompute the owner's row. The retention job re-derives every
+row from the source tables once per ``stats_reconcile_interval_hours``.
+"""
+
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.models.item import Item
+from app.models.item_category import ItemCategory
+from app.models.reservation import Reservation
+from app.models.user import User
+from app.models.user_stats import UserStats
+
+
+def month_key(moment: datetime | None = None) -> str:
+    return (moment or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime("%Y-%m")
+
+
+def _merge(current: str, delta: str) -> str:
+    """SQL for adding two {key: count} JSONB maps, dropping keys that reach zero."""
+    return f"""(
+        SELECT coalesce(jsonb_object_agg(key, total), '{{}}'::jsonb)
+        FROM (
+            SELECT key, sum(value::int) AS total
+            FROM (SELECT * FROM jsonb_each_text({current}) UNION ALL SELECT * FROM jsonb_each_text({delta})) e
+            GROUP BY key
+            HAVING sum(value::int) > 0
+        ) merged
+    )"""
+
+
+_APPLY_SQL = text(f"""
+    INSERT INTO user_stats AS s (
+        user_id, total_gifts, reserved_count, priced_count, price_sum,
+        category_counts, monthly_counts, giver_counts, updated_at
+    )
+    VALUES (
+        :user_id, greatest(CAST(:total_gifts AS integer), 0), greatest(CAST(:reserved_count AS integer), 0),
+        greatest(CAST(:priced_count AS integer), 0), greatest(CAST(:price_sum AS numeric), 0),
+        {_merge("'{}'::jsonb", "CAST(:categories AS jsonb)")},
+        {_merge("'{}'::jsonb", "CAST(:months AS jsonb)")},
+        {_merge("'{}'::jsonb", "CAST(:givers AS jsonb)")},
+        now()
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_gifts = greatest(s.total_gifts + CAST(:total_gifts AS integer), 0),
+        reserved_count = greatest(s.reserved_count + CAST(:reserved_count AS integer), 0),
+        priced_count = greatest(s.priced_count + CAST(:priced_count AS integer), 0),
+        price_sum = greatest(s.price_sum + CAST(:price_sum AS numeric), 0),
+        category_counts = {_merge("s.category_counts", "CAST(:categories AS jsonb)")},
+        monthly_counts = {_merge("s.monthly_counts", "CAST(:months AS jsonb)")},
+        giver_counts = {_merge("s.giver_counts", "CAST(:givers AS jsonb)")},
+        updated_at = now()
+""")
+
+_OWNED_ITEMS = "items i JOIN wishlists w ON w.id = i.wishlist_id WHERE w.owner_id = u.id"
+
+_RECOMPUTE_SQL = text(f"""
+    INSERT INTO user_stats AS s (
+        user_id, total_gifts, reserved_count, priced_count, price_sum,
+        category_counts, monthly_counts, giver_counts, updated_at
+    )
+    SELECT
+        u.id,
+        (SELECT count(*) FROM {_OWNED_ITEMS}),
+        (SELECT count(*) FROM reservations r, {_OWNED_ITEMS} AND r.item_id = i.id),
+        (SELECT count(i.price) FROM {_OWNED_ITEMS}),
+        (SELECT coalesce(sum(i.price), 0) FROM {_OWNED_ITEMS}),
+        (SELECT coalesce(jsonb_object_agg(category, n), '{{}}'::jsonb) FROM (
+            SELECT c.category, count(*) AS n
+            FROM item_categories c, {_OWNED_ITEMS} AND c.item_id = i.id
+            GROUP BY c.category) x),
+        (SELECT coalesce(jsonb_object_agg(ym, n), '{{}}'::jsonb) FROM (
+            SELECT to_char(i.created_at AT TIME ZONE 'UTC', 'YYYY-MM') AS ym, count(*) AS n
+            FROM {_OWNED_ITEMS}
+            GROUP BY 1) x),
+        (SELECT coalesce(jsonb_object_agg(reserver_id, n), '{{}}'::jsonb) FROM (
+            SELECT r.reserver_id, count(*) AS n
+            FROM reservations r, {_OWNED_ITEMS} AND r.item_id = i.id AND r.reserver_id IS NOT NULL
+            GROUP BY r.reserver_id) x),
+        now()
+    FROM users u
+    WHERE u.id = ANY(:ids)
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_gifts = excluded.total_gifts,
+        reserved_count = excluded.reserved_count,
+        priced_count = excluded.priced_count,
+        price_sum = excluded.price_sum,
+        category_counts = excluded.category_counts,
+        monthly_counts = excluded.monthly_counts,
+        giver_counts = excluded.giver_counts,
+        updated_at = now()
+    WHERE (s.total_gifts, s.reserved_count, s.priced_count, s.price_sum,
+           s.category_counts, s.monthly_counts, s.giver_counts)
+        IS DISTINCT FROM
+          (excluded.total_gifts, excluded.reserved_count, excluded.priced_count, excluded.price_sum,
+           excluded.category_counts, excluded.monthly_counts, excluded.giver_counts)
+""")
+
+
+async def apply_delta(
+    db: AsyncSession,
+    user_id: UUID,
+    total_gifts: int = 0,
+    reserved_count: int = 0,
+    priced_count: int = 0,
+    price_sum: Decimal = Decimal("0"),
+    categories: dict[str, int] | None = None,
+    months: dict[str, int] | None = None,
+    givers: dict[str, int] | None = None,
+) -> None:
+    await db.execute(_APPLY_SQL, {
+        "user_id": user_id,
+        "total_gifts": total_gifts,
+        "reserved_count": reserved_count,
+        "priced_count": priced_count,
+        "price_sum": price_sum,
+        "categories": json.dumps(categories or {}),
+        "months": json.dumps(months or {}),
+        "givers": json.dumps(givers or {}),
+    })
+
+
+async def items_added(db: AsyncSession, owner_id: UUID, prices: list[Decimal | None]) -> None:
+    """New items have no categories or reservations yet."""
+    priced = [p for p in prices if p is not None]
+    await apply_delta(
+        db, owner_id,
+        total_gifts=len(prices),
+        priced_count=len(priced),
+        price_sum=sum(priced, Decimal("0")),
+        months={month_key(): len(prices)},
+    )
+
+
+async def price_changed(db: AsyncSession, owner_id: UUID, old: Decimal | None, new: Decimal | None) -> None:
+    if old == new:
+        return
+    await apply_delta(
+        db, owner_id,
+        priced_count=(new is not None) - (old is not None),
+        price_sum=(new or Decimal("0")) - (old or Decimal("0")),
+    )
+
+
+async def item_removed(db: AsyncSession, owner_id: UUID, item: Item) -> None:
+    """Call before the item is deleted, while its categories and reservations still exist."""
+    categories = (await db.execute(
+        select(ItemCategory.category).where(ItemCategory.item_id == item.id)
+    )).scalars().all()
+    reservers = (await db.execute(
+        select(Reservation.reserver_id).where(Reservation.item_id == item.id)
+    )).scalars().all()
+    givers: dict[str, int] = {}
+    for reserver_id in reservers:
+        if reserver_id is not None:
+            givers[str(reserver_id)] = givers.get(str(reserver_id), 0) - 1
+    await apply_delta(
+        db, owner_id,
+        total_gifts=-1,
+        reserved_count=-len(reservers),
+        priced_count=-(item.price is not None),
+        price_sum=-(item.price or Decimal("0")),
+        categories={c: -1 for c in categories},
+        months={month_key(item.created_at): -1},
+        givers=givers,
+    )
+
+
+async def reservation_added(db: AsyncSession, owner_id: UUID, reserver_id: UUID | None) -> None:
+    await apply_delta(
+        db, owner_id, reserved_count=1,
+        givers={str(reserver_id): 1} if reserver_id else None,
+    )
+
+
+async def reservation_removed(db: AsyncSession, owner_id: UUID, reserver_id: UUID | None) -> None:
+    await apply_delta(
+        db, owner_id, reserved_count=-1,
+        givers={str(reserver_id): -1} if reserver_id else None,
+    )
+
+
+async def recompute(db: AsyncSession | AsyncConnection, user_ids: list[UUID]) -> int:
+    """Re-derive rows from the source tables; returns how many rows changed."""
+    result = await db.execute(_RECOMPUTE_SQL, {"ids": user_ids})
+    return result.rowcount or 0
+
+
+async def get_user_stats(db: AsyncSession, user_id: UUID) -> UserStats:
+    stats = await db.get(UserStats, user_id)
+    if stats is None:
+        await recompute(db, [user_id])
+        stats = await db.get(UserStats, user_id)
+    return stats
+
+
+async def reconcile_user_stats(
+    conn: AsyncConnection, batch_size: int, max_batches: int, after: UUID | None = None
+) -> tuple[int, UUID | None]:
+    """Recompute stats for users in id order, ``batch_size`` at a time.
+
+    Returns the number of rows repaired and the id to resume from next run
+    (None once every user has been covered).
+    """
+    repaired = 0
+    for _ in range(max_batches):
+        query = select(User.id).order_by(User.id).limit(batch_size)
+        if after is not None:
+            query = query.where(User.id > after)
+        ids = (await conn.execute(query)).scalars().all()
+        if not ids:
+            return repaired, None
+        repaired += await recompute(conn, list(ids))
+        after = ids[-1]
+        if len(ids) < batch_size:
+            return repaired, None
+    return repaired, after
@@ -31,6 +31,9 @@ class WebSocketManager:
         for ws in disconnected:
             self.disconnect(ws, room_id)
 
+    def metrics(self) -> dict:
+        return {"rooms": len(self.rooms), "sockets": sum(len(sockets) for sockets in self.rooms.values())}
+
     async def send_personal(self, websocket: WebSocket, message: dict):
         try:
             await websocket.send_text(json.dumps(message))
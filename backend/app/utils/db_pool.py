@@ -0,0 +1,167 @@
+"""
+Connection pool instrumentation and an optional liveness checker.
+
+``InstrumentedPool`` times every checkout: waiting for a free connection,
+opening a new one, and the pre-ping when that's enabled. It also counts
+checkout timeouts. Combined with the pool's in-use/overflow gauges, this
+is what ``/api/v1/metrics`` reports, so ``DB_POOL_SIZE`` can be chosen from
+data for each replica.
+
+With ``db_liveness_interval_seconds`` set, pre-ping is turned off and a
+background task probes the database instead. A failed probe disposes the
+pool, so requests get fresh connections rather than each paying a ping
+round-trip.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.utils.metrics import Family
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds; the last bucket is everything slower
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_seconds_total = 0.0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.liveness_failures = 0
+
+    def observe_checkout(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds_total += seconds
+        self.buckets[bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+
+    def histogram(self) -> dict[str, int]:
+        """Cumulative counts per ``le`` bound, Prometheus-style."""
+        result, running = {}, 0
+        for bound, count in zip((*map(str, WAIT_BUCKETS_MS), "+Inf"), self.buckets):
+            running += count
+            result[bound] = running
+        return result
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records into ``metrics``; survives ``dispose()``, which recreates the pool from its class."""
+
+    metrics = PoolMetrics()
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.observe_checkout(time.perf_counter() - started)
+
+
+def instrumented_pool(metrics: PoolMetrics) -> type[InstrumentedPool]:
+    """Pool class with its own metrics, one per engine."""
+    return type("InstrumentedPool", (InstrumentedPool,), {"metrics": metrics})
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    pool = engine.sync_engine.pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    checkouts = metrics.checkouts or 1
+    return {
+        "size": pool.size(),
+        "in_use": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": metrics.checkouts,
+        "timeouts": metrics.timeouts,
+        "liveness_failures": metrics.liveness_failures,
+        "checkout_ms_avg": round(metrics.wait_seconds_total / checkouts * 1000, 2),
+        "checkout_ms_histogram": metrics.histogram(),
+    }
+
+
+def pool_families(engine: AsyncEngine, name: str) -> list[Family]:
+    """``pool_status`` as Prometheus metrics, labelled ``engine=name``."""
+    pool = engine.sync_engine.pool
+    metrics = getattr(pool, "metrics", None) or PoolMetrics()
+    label = {"engine": name}
+    histogram, running = [], 0
+    for bound, count in zip(WAIT_BUCKETS_MS, metrics.buckets):
+        running += count
+        histogram.append(({**label, "le": f"{bound / 1000:g}"}, running, "_bucket"))
+    histogram += [
+        ({**label, "le": "+Inf"}, metrics.checkouts, "_bucket"),
+        (label, metrics.wait_seconds_total, "_sum"),
+        (label, metrics.checkouts, "_count"),
+    ]
+    return [
+        Family("db_pool_size", "gauge", "Configured pool size", [(label, pool.size())]),
+        Family("db_pool_connections", "gauge", "Pooled connections by state", [
+            ({**label, "state": "in_use"}, pool.checkedout()),
+            ({**label, "state": "idle"}, pool.checkedin()),
+            ({**label, "state": "overflow"}, max(pool.overflow(), 0)),
+        ]),
+        Family("db_pool_checkout_seconds", "histogram", "Time to check out a connection", histogram),
+        Family("db_pool_checkout_timeouts_total", "counter", "Checkouts that hit pool_timeout", [(label, metrics.timeouts)]),
+        Family("db_liveness_failures_total", "counter", "Failed liveness probes", [(label, metrics.liveness_failures)]),
+    ]
+
+
+class LivenessChecker:
+    """Probes the database every ``interval`` seconds in place of per-checkout pre-ping."""
+
+    def __init__(self, engine: AsyncEngine, interval: float):
+        self.engine = engine
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def probe(self) -> bool:
+        """False (and the pool recycled) only when the database itself fails.
+
+        A saturated pool means busy, not dead: the probe is skipped while no
+        connection is free, and a checkout that hits ``pool_timeout`` is
+        not counted as a failure.
+        """
+        pool = self.engine.sync_engine.pool
+        if pool.checkedin() == 0 and pool.checkedout() >= pool.size() + pool._max_overflow:
+            return True
+        try:
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            return True
+        except exc.TimeoutError:
+            logger.info("Database liveness probe skipped, pool busy")
+            return True
+        except Exception as e:
+            pool.metrics.liveness_failures += 1
+            logger.warning("Database liveness probe failed, recycling pool: %s", e)
+            await self.engine.dispose()
+            return False
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.probe()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,5 +1,6 @@
 import httpx
 import logging
+from app.utils.request_metrics import HTTPX_EVENT_HOOKS
 
 logger = logging.getLogger(__name__)
 
@@ -10,7 +11,7 @@ async def init_http_client():
     """Initialize the global HTTP client."""
     global _client
     if _client is None:
-        _client = httpx.AsyncClient()
+        _client = httpx.AsyncClient(event_hooks=HTTPX_EVENT_HOOKS)
         logger.info("Global HTTP client initialized.")
 
 
@@ -30,6 +31,6 @@ def get_http_client() -> httpx.AsyncClient:
         # Fallback for cases where it wasn't initialized via lifespan
         # (e.g. in some test scenarios or standalone scripts)
         # Note: In production, it should always be initialized in lifespan.
-        _client = httpx.AsyncClient()
+        _client = httpx.AsyncClient(event_hooks=HTTPX_EVENT_HOOKS)
         logger.warning("Global HTTP client was not initialized, creating a new one.")
     return _client
@@ -0,0 +1,102 @@
+"""
+Interchangeable JWT implementations, selected by ``settings.jwt_backend``.
+
+``jose`` is python-jose, the original implementation. ``hmac`` is a
+stdlib-only HS256/384/512 codec that checks only what this app relies on
+(signature, ``alg``, ``exp``, ``nbf``) and verifies about twice as fast.
+Compare them with ``python -m scripts.bench_jwt``.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from typing import Protocol
+
+from jose import JWTError, jwt
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class JWTBackend(Protocol):
+    def encode(self, payload: dict, key: str, algorithm: str) -> str: ...
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        """Verified claims; raises InvalidToken."""
+        ...
+
+
+class JoseBackend:
+    def encode(self, payload: dict, key: str, algorithm: str) -> str:
+        return jwt.encode(payload, key, algorithm=algorithm)
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        try:
+            return jwt.decode(token, key, algorithms=[algorithm])
+        except JWTError as e:
+            raise InvalidToken(str(e)) from e
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class HMACBackend:
+    DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+    def _digest(self, algorithm: str):
+        try:
+            return self.DIGESTS[algorithm]
+        except KeyError:
+            raise InvalidToken(f"Unsupported algorithm {algorithm}")
+
+    def encode(self, payload: dict, key: str, algorithm: str) -> str:
+        claims = {k: int(v.timestamp()) if isinstance(v, datetime) else v for k, v in payload.items()}
+        header = _b64encode(json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":")).encode())
+        body = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        signing_input = header + b"." + body
+        signature = hmac.new(key.encode(), signing_input, self._digest(algorithm)).digest()
+        return (signing_input + b"." + _b64encode(signature)).decode()
+
+    def decode(self, token: str, key: str, algorithm: str) -> dict:
+        digest = self._digest(algorithm)
+        try:
+            signing_input, signature = token.encode("ascii").rsplit(b".", 1)
+            header, body = signing_input.split(b".")
+            expected = hmac.new(key.encode(), signing_input, digest).digest()
+            if not hmac.compare_digest(_b64decode(signature), expected):
+                raise InvalidToken("Signature verification failed")
+            if json.loads(_b64decode(header)).get("alg") != algorithm:
+                raise InvalidToken("Unexpected algorithm")
+            claims = json.loads(_b64decode(body))
+        except (ValueError, UnicodeError) as e:
+            raise InvalidToken("Malformed token") from e
+        if not isinstance(claims, dict):
+            raise InvalidToken("Malformed claims")
+        now = time.time()
+        try:
+            if "exp" in claims and now > int(claims["exp"]):
+                raise InvalidToken("Signature has expired")
+            if "nbf" in claims and now < int(claims["nbf"]):
+                raise InvalidToken("The token is not yet valid")
+        except (TypeError, ValueError) as e:
+            raise InvalidToken("Malformed time claim") from e
+        return claims
+
+
+BACKENDS: dict[str, type] = {"jose": JoseBackend, "hmac": HMACBackend}
+
+
+def get_backend(name: str) -> JWTBackend:
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown JWT backend {name!r}; expected one of {sorted(BACKENDS)}")
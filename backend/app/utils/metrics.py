@@ -0,0 +1,126 @@
+"""
+In-process metrics rendered in the Prometheus text format.
+
+Counters, gauges and histograms created here register themselves and are
+written out by ``render``, along with any ``Family`` built at scrape time
+from the ``stats`` dicts services already keep. Values are per worker
+process; Prometheus adds them up across replicas.
+"""
+
+import math
+from dataclasses import dataclass, field
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_registry: list["_Metric"] = []
+
+
+@dataclass
+class Family:
+    """One metric's samples: ``(labels, value)``, or ``(labels, value, suffix)`` for ``_bucket``/``_sum``/``_count``."""
+
+    name: str
+    type: str
+    help: str
+    samples: list[tuple] = field(default_factory=list)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format(name: str, labels: dict, value: float) -> str:
+    if labels:
+        name += "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+    if isinstance(value, bool):
+        value = int(value)
+    if math.isinf(value):
+        return f"{name} {'+Inf' if value > 0 else '-Inf'}"
+    return f"{name} {value!r}" if isinstance(value, float) else f"{name} {value}"
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, object] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def family(self) -> Family:
+        return Family(self.name, self.type, self.help, [
+            (dict(zip(self.labels, key)), value) for key, value in self._values.items()
+        ])
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            # Per-bucket (not yet cumulative) counts, then sum and count
+            series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def family(self) -> Family:
+        samples = []
+        for key, (counts, total, count) in self._values.items():
+            labels = dict(zip(self.labels, key))
+            running = 0
+            for bound, n in zip(self.buckets, counts):
+                running += n
+                samples.append(({**labels, "le": f"{bound:g}"}, running, "_bucket"))
+            samples.append(({**labels, "le": "+Inf"}, count, "_bucket"))
+            samples.append((labels, total, "_sum"))
+            samples.append((labels, count, "_count"))
+        return Family(self.name, self.type, self.help, samples)
+
+
+def render(extra: list[Family] = ()) -> str:
+    """Every registered metric plus ``extra``, in exposition format 0.0.4."""
+    lines = []
+    for family in [m.family() for m in _registry] + list(extra):
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        for sample in family.samples:
+            labels, value, suffix = sample if len(sample) == 3 else (*sample, "")
+            lines.append(_format(family.name + suffix, labels, value))
+    return "\n".join(lines) + "\n"
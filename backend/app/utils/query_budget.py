@@ -0,0 +1,126 @@
+"""
+Per-request SQL query budgets and N+1 detection.
+
+A route declares how many statements one request may run with
+``@query_budget(n)``. With ``query_budget_mode`` set to ``warn`` (staging)
+or ``strict`` (tests), ``QueryBudgetMiddleware`` records every statement a
+request runs and checks two things: the count against the route's
+budget, and whether one statement shape (the SQL with parameters and
+IN-lists collapsed) ran ``query_repeat_threshold`` times or more, the
+usual sign of an N+1 loop. ``warn`` logs each finding and ``strict`` raises
+``QueryBudgetExceeded``. Either mode sends the count in ``X-Query-Count``.
+
+``capture_queries`` records the statements of any block of code, for
+tests of service functions.
+"""
+
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from app.config import get_settings
+from app.utils.request_metrics import RequestStats, current_request, route_label
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|\?|:\w+|\b\d+\b|'(?:[^']|'')*'")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(limit: int):
+    """Declare the most statements one request to this endpoint may run."""
+    def decorate(endpoint):
+        endpoint.query_budget = limit
+        return endpoint
+    return decorate
+
+
+def statement_shape(statement: str) -> str:
+    shape = _PARAM.sub("?", _SPACE.sub(" ", statement).strip())
+    return _LIST.sub("(?...)", shape)
+
+
+@dataclass
+class QueryReport:
+    route: str
+    statements: list[str]
+    budget: int | None = None
+    repeat_threshold: int = field(default_factory=lambda: settings.query_repeat_threshold)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.count > self.budget
+
+    def repeated(self) -> dict[str, int]:
+        """Statement shapes run at least ``repeat_threshold`` times."""
+        shapes = Counter(statement_shape(s) for s in self.statements)
+        return {shape: n for shape, n in shapes.items() if n >= self.repeat_threshold}
+
+    def problems(self) -> list[str]:
+        found = []
+        if self.over_budget:
+            found.append(f"{self.route}: {self.count} queries, budget {self.budget}")
+        for shape, n in self.repeated().items():
+            found.append(f"{self.route}: ran {n} times (N+1?): {shape[:200]}")
+        return found
+
+
+@contextmanager
+def capture_queries():
+    """``with capture_queries() as statements:`` collects the SQL run inside the block."""
+    stats = RequestStats(statements=[])
+    token = current_request.set(stats)
+    try:
+        yield stats.statements
+    finally:
+        current_request.reset(token)
+
+
+class QueryBudgetMiddleware:
+    """Install inside ``MetricsMiddleware`` so both share the request's stats."""
+
+    def __init__(self, app, mode: str | None = None):
+        self.app = app
+        self.strict = (mode or settings.query_budget_mode) == "strict"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = current_request.get()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = current_request.set(stats)
+        stats.statements = []
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", []).append((b"x-query-count", str(len(stats.statements)).encode()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                current_request.reset(token)
+
+        route = scope.get("route")
+        report = QueryReport(route_label(scope), stats.statements, getattr(getattr(route, "endpoint", None), "query_budget", None))
+        problems = report.problems()
+        for problem in problems:
+            logger.warning("Query budget: %s", problem)
+        if problems and self.strict:
+            raise QueryBudgetExceeded("; ".join(problems))
@@ -0,0 +1,29 @@
+import logging
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+
+
+async def get_redis():
+    """Shared Redis client (lazy init). Returns None when Redis is not configured or unreachable."""
+    global _redis
+    if _redis is None:
+        try:
+            settings = get_settings()
+            if settings.redis_url:
+                import redis.asyncio as aioredis
+                _redis = aioredis.from_url(
+                    settings.redis_url,
+                    decode_responses=True,
+                    socket_connect_timeout=3,
+                )
+                # Quick connectivity check
+                await _redis.ping()
+        except Exception as exc:
+            logger.debug("Redis not available: %s", exc)
+            _redis = False  # sentinel: don't retry every call
+    if _redis is False:
+        return None
+    return _redis
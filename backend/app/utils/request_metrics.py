@@ -0,0 +1,141 @@
+"""
+Hot-path instrumentation: HTTP requests, database queries and outbound calls.
+
+``MetricsMiddleware`` times each HTTP request and labels it with the
+matched route template (``/api/v1/wishlists/{wishlist_id}``), never the raw
+path, so label cardinality stays bounded. While a request runs, SQLAlchemy
+cursor events add to its ``RequestStats``; the per-request query count and
+time are recorded per route, which is where an N+1 regression shows up.
+The shared httpx client reports outbound calls through ``HTTPX_EVENT_HOOKS``;
+hosts other than the services we integrate with (autofill fetches any
+shop) are reported as ``other``.
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import get_settings
+from app.utils.metrics import Counter, Gauge, Histogram
+
+settings = get_settings()
+
+UNMATCHED = "unmatched"
+KNOWN_HOSTS = frozenset(
+    httpx.URL(url).host
+    for url in (settings.expo_push_url, settings.expo_receipts_url, settings.google_jwks_url, "https://api.resend.com")
+)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route"),
+)
+REQUESTS = Counter("http_requests_total", "HTTP responses by route and status", ("method", "route", "status"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled")
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_SECONDS = Histogram("http_request_db_seconds", "Database time per HTTP request", ("route",))
+QUERY_DURATION = Histogram("db_query_duration_seconds", "Database statement latency")
+OUTBOUND_DURATION = Histogram(
+    "http_client_request_duration_seconds", "Outbound HTTP call latency", ("host", "status"),
+)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    # Only recorded when a query budget check asks for them
+    statements: list[str] | None = None
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        stats = RequestStats()
+        token = current_request.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            current_request.reset(token)
+            # Routing has filled in scope["route"] by now
+            route, method = route_label(scope), scope["method"]
+            REQUEST_DURATION.observe(elapsed, method=method, route=route)
+            REQUESTS.inc(method=method, route=route, status=status)
+            REQUEST_QUERIES.observe(stats.queries, route=route)
+            REQUEST_DB_SECONDS.observe(stats.db_seconds, route=route)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    QUERY_DURATION.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append(statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def _query_failed(context):
+    # after_cursor_execute doesn't run for a failed statement
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+async def _outbound_started(request: httpx.Request):
+    request.extensions["metrics_started"] = time.perf_counter()
+
+
+async def _outbound_finished(response: httpx.Response):
+    started = response.request.extensions.get("metrics_started")
+    if started is not None:
+        OUTBOUND_DURATION.observe(
+            time.perf_counter() - started,
+            host=host if (host := response.request.url.host) in KNOWN_HOSTS else "other",
+            status=f"{response.status_code // 100}xx",
+        )
+
+
+HTTPX_EVENT_HOOKS = {"request": [_outbound_started], "response": [_outbound_finished]}
@@ -1,12 +1,15 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
 import hashlib
-from jose import jwt, JWTError
+import time
 from passlib.context import CryptContext
 from app.config import get_settings
+from app.utils.jwt_backend import InvalidToken, get_backend
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+jwt_backend = get_backend(settings.jwt_backend)
 
 
 def hash_password(password: str) -> str:
@@ -17,24 +20,68 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Like verify_password, plus a replacement hash when ``pwd_context`` settings have changed."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def create_access_token(user_id: UUID) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
     payload = {"sub": str(user_id), "exp": expire, "type": "access"}
-    return jwt.encode(payload, settings.secret_key, algorithm=settings.algorithm)
+    return jwt_backend.encode(payload, settings.secret_key, settings.algorithm)
 
 
-def create_refresh_token(user_id: UUID) -> str:
+def create_refresh_token(user_id: UUID, family_id: UUID, generation: int) -> str:
     expire = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
-    payload = {"sub": str(user_id), "exp": expire, "type": "refresh"}
-    return jwt.encode(payload, settings.secret_key, algorithm=settings.algorithm)
+    payload = {"sub": str(user_id), "exp": expire, "type": "refresh", "fam": str(family_id), "gen": generation}
+    return jwt_backend.encode(payload, settings.secret_key, settings.algorithm)
+
+
+class DecodedTokenCache:
+    """Verified payloads keyed by token digest, each kept until the token's ``exp``."""
+
+    def __init__(self, max_entries: int | None = None):
+        self.max_entries = max_entries or settings.jwt_cache_max_entries
+        self._payloads: OrderedDict[bytes, tuple[dict, float]] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, digest: bytes) -> dict | None:
+        cached = self._payloads.get(digest)
+        if cached is None or time.time() > cached[1]:
+            self._payloads.pop(digest, None)
+            self.stats["misses"] += 1
+            return None
+        self._payloads.move_to_end(digest)
+        self.stats["hits"] += 1
+        return cached[0]
+
+    def put(self, digest: bytes, payload: dict, expires_at: float):
+        self._payloads[digest] = (payload, expires_at)
+        self._payloads.move_to_end(digest)
+        while len(self._payloads) > self.max_entries:
+            self._payloads.popitem(last=False)
+
+    def clear(self):
+        self._payloads.clear()
+
+
+token_cache = DecodedTokenCache()
 
 
 def decode_token(token: str) -> dict | None:
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    """Verified claims, or None. The returned dict is shared with the cache: don't modify it."""
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
         return payload
-    except JWTError:
+    try:
+        payload = jwt_backend.decode(token, settings.secret_key, settings.algorithm)
+    except InvalidToken:
         return None
+    # Only well-formed tokens with an expiry are cached, so garbage can't evict real entries
+    if isinstance(payload.get("exp"), (int, float)):
+        token_cache.put(digest, payload, payload["exp"])
+    return payload
 
 
 def hash_token(token: str) -> str:
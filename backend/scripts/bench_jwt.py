@@ -0,0 +1,50 @@
+"""
+Verify-throughput microbenchmark for the JWT backends and the decode cache.
+
+    SECRET_KEY=bench python -m scripts.bench_jwt [--tokens 1000] [--rounds 20]
+
+Each backend verifies the same set of access tokens ``rounds`` times.
+"cached" runs ``decode_token`` itself, so after the first round every call
+is a cache hit.
+"""
+
+import argparse
+import time
+import uuid
+
+from app.config import get_settings
+from app.utils import security
+from app.utils.jwt_backend import BACKENDS, get_backend
+
+settings = get_settings()
+
+
+def _measure(verify, tokens: list[str], rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for token in tokens:
+            verify(token)
+    return len(tokens) * rounds / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1000, help="distinct tokens (one per simulated user)")
+    parser.add_argument("--rounds", type=int, default=20, help="times each token is presented")
+    args = parser.parse_args()
+
+    tokens = [security.create_access_token(uuid.uuid4()) for _ in range(args.tokens)]
+    print(f"{args.tokens} tokens x {args.rounds} rounds, {settings.algorithm}")
+
+    for name in BACKENDS:
+        backend = get_backend(name)
+        rate = _measure(lambda t: backend.decode(t, settings.secret_key, settings.algorithm), tokens, args.rounds)
+        print(f"  {name:<8} {rate:>12,.0f} verifies/s")
+
+    security.token_cache.clear()
+    rate = _measure(security.decode_token, tokens, args.rounds)
+    print(f"  {'cached':<8} {rate:>12,.0f} verifies/s  ({settings.jwt_backend} on miss, {security.token_cache.stats})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Async load driver for the main API flows.
+
+    python -m scripts.loadtest --base-url http://localhost:8000 \\
+        [--manifest loadtest_manifest.json] [--users 50] [--duration 60] [--ws-listeners 20]
+
+Load the data first with ``scripts.loadtest_data``. The server under test
+should run with ``RATE_LIMIT_ENABLED=false`` (every virtual user shares
+one IP) and ``AUTOFILL_ALLOWED_PRIVATE_HOSTS=127.0.0.1`` so autofill may
+reach the mock shop this script serves on ``--shop-port``.
+
+All virtual users log in first, at most ``--login-concurrency`` at a time
+so the password hasher's queue isn't overrun, retrying on 429/503 after
+Retry-After; the run aborts if any of them can't. Then, until
+``--duration`` is up, each picks flows by weight: friends feed, one of its own
+wishlists, a public share link, reserving or contributing to another
+user's item as a guest, and autofill. WebSocket listeners sit on the
+public wishlists being reserved from and measure how long the
+``item_reserved`` / ``contribution_added`` broadcast takes to arrive.
+The report gives throughput and p50/p95/p99 latency per route; compare
+runs at different ``DB_POOL_SIZE`` / worker counts for capacity per
+replica.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import NamedTuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from websockets.asyncio.client import connect
+
+FLOWS = (
+    ("feed", 35),
+    ("wishlist_detail", 20),
+    ("public_wishlist", 25),
+    ("reserve", 7),
+    ("contribute", 5),
+    ("autofill", 3),
+)
+
+SHOP_PAGE = """<!doctype html><html><head><title>Товар {n}</title>
+<meta property="og:title" content="Товар {n}"><meta property="og:image" content="/img/{n}.jpg">
+<script type="application/ld+json">{{"@type": "Product", "name": "Товар {n}",
+"offers": {{"@type": "Offer", "price": "{price}", "priceCurrency": "RUB"}}}}</script>
+</head><body><h1>Товар {n}</h1></body></html>"""
+
+
+@dataclass
+class Stats:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: dict[str, dict[int, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def record(self, route: str, seconds: float, status: int | None):
+        self.latencies[route].append(seconds)
+        if status is None:
+            self.errors[route] += 1
+        else:
+            self.statuses[route][status] += 1
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(q * len(sorted_values) / 100) - 1))
+    return sorted_values[rank]
+
+
+class VirtualUser(NamedTuple):
+    rng: random.Random
+    user: dict
+    client: httpx.AsyncClient
+    guest: httpx.AsyncClient
+
+
+class ShopHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        n = zlib.crc32(self.path.encode()) % 100_000
+        body = SHOP_PAGE.format(n=n, price=1000 + n).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_shop(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), ShopHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class Run:
+    def __init__(self, args, manifest: dict):
+        self.args = args
+        self.manifest = manifest
+        self.rng = random.Random(args.seed)
+        self.stats = Stats()
+        self.deadline = 0.0
+        self.public = [
+            (user, w) for user in manifest["users"] for w in user["wishlists"] if w["privacy"] == "public"
+        ]
+        # Wishlists with a WebSocket listener; reservations target these so broadcasts get measured
+        self.watched = self.rng.sample(self.public, min(args.ws_listeners, len(self.public)))
+        # item id -> monotonic time the mutation was sent
+        self.sent_at: dict[str, float] = {}
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(route, time.perf_counter() - started, None)
+            return None
+        self.stats.record(route, time.perf_counter() - started, response.status_code)
+        return response
+
+    async def log_in(self, n: int, gate: asyncio.Semaphore) -> VirtualUser | None:
+        rng = random.Random(self.args.seed * 1000 + n)
+        user = rng.choice([u for u in self.manifest["users"] if u["wishlists"]])
+        client = httpx.AsyncClient(base_url=self.args.base_url, timeout=30)
+        guest = httpx.AsyncClient(base_url=self.args.base_url, timeout=30)
+        body = {"email": user["email"], "password": self.manifest["password"]}
+        async with gate:
+            for _ in range(self.args.login_attempts):
+                response = await self.request(client, "POST /auth/login", "POST", "/api/v1/auth/login", json=body)
+                if response is not None and response.status_code == 200:
+                    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+                    return VirtualUser(rng, user, client, guest)
+                if response is not None and response.status_code not in (429, 503):
+                    print(f"login as {user['email']} failed: {response.status_code} {response.text[:200]}")
+                    break
+                retry_after = float(response.headers.get("Retry-After", 1)) if response is not None else 1.0
+                await asyncio.sleep(retry_after + rng.random())
+        await client.aclose()
+        await guest.aclose()
+        return None
+
+    async def virtual_user(self, vu: VirtualUser):
+        flows, weights = zip(*FLOWS)
+        while time.monotonic() < self.deadline:
+            flow = vu.rng.choices(flows, weights)[0]
+            await getattr(self, flow)(vu.client, vu.guest, vu.rng, vu.user)
+            if self.args.think_ms:
+                await asyncio.sleep(vu.rng.expovariate(1000 / self.args.think_ms))
+
+    async def feed(self, client, guest, rng, user):
+        await self.request(client, "GET /wishlists/friends", "GET", "/api/v1/wishlists/friends")
+
+    async def wishlist_detail(self, client, guest, rng, user):
+        wishlist = rng.choice(user["wishlists"])
+        await self.request(client, "GET /wishlists/{id}", "GET", f"/api/v1/wishlists/{wishlist['id']}")
+
+    async def public_wishlist(self, client, guest, rng, user):
+        _, wishlist = rng.choice(self.public)
+        await self.request(
+            guest, "GET /wishlists/public/{token}", "GET", f"/api/v1/wishlists/public/{wishlist['share_token']}",
+        )
+
+    def _target(self, rng, user, key: str) -> str | None:
+        candidates = [w for owner, w in self.watched if owner is not user and w[key]]
+        if not candidates:
+            return None
+        return rng.choice(rng.choice(candidates)[key])
+
+    async def reserve(self, client, guest, rng, user):
+        item_id = self._target(rng, user, "item_ids")
+        if item_id:
+            self.sent_at[item_id] = time.monotonic()
+            # 409 once the item is taken is expected and still measured
+            await self.request(
+                guest, "POST /items/{id}/reserve", "POST", f"/api/v1/items/{item_id}/reserve",
+                json={"guest_name": "Нагрузка", "guest_identifier": f"lt-{rng.getrandbits(64):x}"},
+            )
+
+    async def contribute(self, client, guest, rng, user):
+        item_id = self._target(rng, user, "group_item_ids")
+        if item_id:
+            self.sent_at[item_id] = time.monotonic()
+            await self.request(
+                guest, "POST /items/{id}/contribute", "POST", f"/api/v1/items/{item_id}/contribute",
+                json={"amount": "100", "guest_name": "Нагрузка", "guest_identifier": f"lt-{rng.getrandbits(64):x}"},
+            )
+
+    async def autofill(self, client, guest, rng, user):
+        # A fresh path every time, so the server's autofill cache doesn't hide the fetch
+        url = f"http://127.0.0.1:{self.args.shop_port}/product/{rng.getrandbits(48)}"
+        await self.request(client, "POST /autofill", "POST", "/api/v1/autofill", json={"url": url})
+
+    async def listener(self, wishlist: dict):
+        ws_url = self.args.base_url.replace("http", "ws", 1) + f"/ws/{wishlist['id']}?share_token={wishlist['share_token']}"
+        try:
+            async with connect(ws_url) as ws:
+                while time.monotonic() < self.deadline:
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=1)
+                    except asyncio.TimeoutError:
+                        continue
+                    message = json.loads(raw)
+                    sent = self.sent_at.get(message.get("item_id"))
+                    if sent is not None:
+                        self.stats.record(f"WS {message.get('type')}", time.monotonic() - sent, 200)
+        except Exception as exc:
+            self.stats.record("WS connect", 0.0, None)
+            print(f"listener for {wishlist['id']} stopped: {exc}")
+
+    async def run(self) -> float:
+        gate = asyncio.Semaphore(self.args.login_concurrency)
+        users = await asyncio.gather(*(self.log_in(n, gate) for n in range(self.args.users)))
+        ready = [vu for vu in users if vu is not None]
+        try:
+            if len(ready) < len(users):
+                raise SystemExit(
+                    f"{len(users) - len(ready)} of {len(users)} virtual users could not log in; "
+                    "is RATE_LIMIT_ENABLED=false and the manifest's password right?"
+                )
+            shop = start_shop(self.args.shop_port)
+            self.deadline = time.monotonic() + self.args.duration
+            started = time.perf_counter()
+            try:
+                await asyncio.gather(
+                    *(self.listener(w) for _, w in self.watched),
+                    *(self.virtual_user(vu) for vu in ready),
+                )
+            finally:
+                shop.shutdown()
+            return time.perf_counter() - started
+        finally:
+            for vu in ready:
+                await vu.client.aclose()
+                await vu.guest.aclose()
+
+
+def report(stats: Stats, elapsed: float) -> list[dict]:
+    rows = []
+    for route in sorted(stats.latencies):
+        values = sorted(stats.latencies[route])
+        rows.append({
+            "route": route,
+            "count": len(values),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+            "errors": stats.errors.get(route, 0),
+            "statuses": dict(sorted(stats.statuses[route].items())),
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--manifest", default="loadtest_manifest.json")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--login-concurrency", type=int, default=8,
+                        help="logins in flight at once; keep under PASSWORD_HASH_WORKERS + PASSWORD_HASH_MAX_QUEUE")
+    parser.add_argument("--login-attempts", type=int, default=10)
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between a user's requests")
+    parser.add_argument("--ws-listeners", type=int, default=20)
+    parser.add_argument("--shop-port", type=int, default=8900)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    run = Run(args, manifest)
+    elapsed = asyncio.run(run.run())
+    rows = report(run.stats, elapsed)
+
+    # Logins happen before the timed run
+    total = sum(row["count"] for row in rows if not row["route"].startswith(("WS", "POST /auth/login")))
+    print(f"{args.users} users, {elapsed:.1f}s, {total / elapsed:.1f} req/s overall\n")
+    print(f"{'route':<34}{'count':>8}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}  statuses")
+    for row in rows:
+        statuses = " ".join(f"{code}:{n}" for code, n in row["statuses"].items())
+        print(
+            f"{row['route']:<34}{row['count']:>8}{row['rps']:>8}{row['p50_ms']:>9}"
+            f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['errors']:>8}  {statuses}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"users": args.users, "elapsed": elapsed, "routes": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
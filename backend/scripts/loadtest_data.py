@@ -0,0 +1,262 @@
+"""
+Synthetic data set for load testing, bulk-loaded with COPY.
+
+    SECRET_KEY=... DATABASE_URL=... python -m scripts.loadtest_data \\
+        [--users 2000] [--friends 20] [--wishlists 2] [--items 30] [--seed 1] [--reset]
+
+Creates users ``load<n>@loadtest.example.com`` (all with password
+``--password``), accepted friendships, wishlists of varying privacy where
+about one in twenty holds several hundred items, reservations, group-gift
+contributions and notifications. Derived tables (wishlist counters, user
+stats, materialized feeds) are then rebuilt with the same code the
+maintenance jobs use, and the tables are ANALYZEd.
+
+The same ``--seed`` always produces the same rows. ``--reset`` first deletes
+earlier load-test users; everything else hangs off them and cascades.
+A manifest with the users, their wishlists and sample item ids is written
+for ``scripts.loadtest``.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import engine
+from app.services.counters import reconcile_wishlist_counters
+from app.services.user_stats import reconcile_user_stats
+from app.utils.security import hash_password
+
+settings = get_settings()
+
+EMAIL_DOMAIN = "loadtest.example.com"
+NOW = datetime.now(timezone.utc)
+
+PRIVACY = (("public", 3), ("friends", 5), ("private", 2))
+OCCASIONS = ("birthday", "new_year", "wedding", "other", None)
+PRIORITIES = ("must_have", "nice_to_have", "dream", "normal")
+NOTIFICATION_TYPES = ("friend_request", "friend_accepted", "item_reserved", "item_liked", "contribution_added")
+WORDS = (
+    "наушники", "кофемашина", "рюкзак", "книга", "лампа", "кроссовки", "часы", "плед", "колонка",
+    "фотоаппарат", "велосипед", "сертификат", "набор", "игра", "кружка", "термос", "свитер", "зонт",
+)
+SHOPS = ("ozon.ru", "wildberries.ru", "lamoda.ru", "dns-shop.ru", "market.yandex.ru")
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+    def uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def moment(self, days: int = 365) -> datetime:
+        return NOW - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def item_count(self) -> int:
+        if self.rng.random() < 0.05:
+            return self.rng.randint(200, 500)
+        return max(1, int(self.rng.expovariate(1 / self.args.items)))
+
+    def build(self) -> dict[str, list[tuple]]:
+        rng, args = self.rng, self.args
+        password_hash = hash_password(args.password)
+        tables: dict[str, list[tuple]] = {name: [] for name in TABLES}
+
+        users = [self.uuid() for _ in range(args.users)]
+        pairs = set()
+        for a in range(args.users):
+            for _ in range(args.friends // 2):
+                b = rng.randrange(args.users)
+                if a != b:
+                    pairs.add((min(a, b), max(a, b)))
+        friend_counts = [0] * args.users
+        for a, b in pairs:
+            friend_counts[a] += 1
+            friend_counts[b] += 1
+
+        for n, user_id in enumerate(users):
+            tables["users"].append((
+                user_id, f"load{n}@{EMAIL_DOMAIN}", password_hash, f"Load User {n}", f"load{n}",
+                False, False, False, "deep_amethyst", friend_counts[n], self.moment(),
+            ))
+
+        for a, b in sorted(pairs):
+            friendship_id, created = self.uuid(), self.moment()
+            tables["friendships"].append((friendship_id, users[a], users[b], "accepted", created))
+            tables["friend_edges"].append((users[a], users[b], friendship_id, created))
+            tables["friend_edges"].append((users[b], users[a], friendship_id, created))
+
+        privacy = [p for p, weight in PRIVACY for _ in range(weight)]
+        group_items = []
+        for owner in users:
+            for _ in range(rng.randint(1, args.wishlists * 2 - 1)):
+                wishlist_id, created = self.uuid(), self.moment()
+                tables["wishlists"].append((
+                    wishlist_id, owner, f"Вишлист {rng.choice(WORDS)}", rng.choice(OCCASIONS),
+                    f"{rng.getrandbits(192):048x}", True, "deep_amethyst", rng.choice(privacy),
+                    True, False, True, 0, 0, created, created + timedelta(days=rng.randrange(30)),
+                ))
+                for position in range(self.item_count()):
+                    item_id = self.uuid()
+                    price = Decimal(rng.randrange(300, 150_000)) if rng.random() < 0.9 else None
+                    is_group = price is not None and price > 20_000 and rng.random() < 0.3
+                    shop = rng.choice(SHOPS)
+                    tables["items"].append((
+                        item_id, wishlist_id, f"{rng.choice(WORDS).capitalize()} {position}",
+                        f"https://{shop}/product/{rng.getrandbits(40)}", price, "RUB", shop, is_group,
+                        rng.choice(PRIORITIES), False, self.moment(),
+                    ))
+                    if is_group:
+                        group_items.append((item_id, owner, price))
+                    elif rng.random() < args.reserved:
+                        reserver = rng.choice(users)
+                        tables["reservations"].append((
+                            self.uuid(), item_id, reserver if reserver != owner else None,
+                            None if reserver != owner else "Гость", False, rng.random() < 0.3, False, self.moment(90),
+                        ))
+
+        for item_id, owner, price in group_items:
+            remaining = price
+            for _ in range(rng.randint(0, 5)):
+                amount = min(remaining, Decimal(rng.randrange(500, 10_000)))
+                if amount <= 0:
+                    break
+                remaining -= amount
+                contributor = rng.choice(users)
+                tables["contributions"].append((
+                    self.uuid(), item_id, contributor if contributor != owner else None,
+                    None if contributor != owner else "Гость", amount, self.moment(90),
+                ))
+
+        for recipient in users:
+            for _ in range(rng.randint(0, args.notifications * 2)):
+                tables["notifications"].append((
+                    self.uuid(), recipient, rng.choice(users), rng.choice(NOTIFICATION_TYPES),
+                    "Уведомление", "Нагрузочный тест", json.dumps({}), rng.random() < 0.7, self.moment(180),
+                ))
+        return tables
+
+
+TABLES = {
+    "users": (
+        "id", "email", "password_hash", "full_name", "username",
+        "is_premium", "is_online", "biometrics_enabled", "theme", "friend_count", "created_at",
+    ),
+    "friendships": ("id", "requester_id", "addressee_id", "status", "created_at"),
+    "friend_edges": ("user_id", "friend_id", "friendship_id", "created_at"),
+    "wishlists": (
+        "id", "owner_id", "title", "occasion", "share_token", "is_active", "theme", "privacy",
+        "show_prices", "anonymous_reservations", "notifications_enabled", "item_count", "reserved_count",
+        "created_at", "updated_at",
+    ),
+    # sort_order is left to its default, so keys come from items_sort_seq as in the app
+    "items": (
+        "id", "wishlist_id", "name", "url", "price", "currency", "source_domain", "is_group_gift",
+        "priority", "is_liked_by_owner", "created_at",
+    ),
+    "reservations": (
+        "id", "item_id", "reserver_id", "guest_name", "is_anonymous", "is_purchased", "thanks_sent", "created_at",
+    ),
+    "contributions": ("id", "item_id", "contributor_id", "guest_name", "amount", "created_at"),
+    "notifications": ("id", "recipient_id", "sender_id", "type", "title", "body", "data", "is_read", "created_at"),
+}
+
+_FEED_SQL = text("""
+    INSERT INTO feed_entries (user_id, wishlist_id, owner_id, updated_at)
+    SELECT e.friend_id, w.id, w.owner_id, w.updated_at
+    FROM wishlists w
+    JOIN friend_edges e ON e.user_id = w.owner_id
+    JOIN users u ON u.id = w.owner_id
+    WHERE w.is_active AND w.privacy IN ('public', 'friends') AND u.friend_count <= :max_friends
+    ON CONFLICT DO NOTHING
+""")
+
+
+def manifest(tables: dict[str, list[tuple]], password: str, sample: int) -> dict:
+    items_by_wishlist: dict = {}
+    for item in tables["items"]:
+        items_by_wishlist.setdefault(item[1], []).append(item)
+    wishlists_by_owner: dict = {}
+    for w in tables["wishlists"]:
+        items = items_by_wishlist.get(w[0], [])
+        wishlists_by_owner.setdefault(w[1], []).append({
+            "id": str(w[0]),
+            "share_token": w[4],
+            "privacy": w[7],
+            "item_ids": [str(i[0]) for i in items if not i[7]][:sample],
+            "group_item_ids": [str(i[0]) for i in items if i[7]][:sample],
+        })
+    return {
+        "password": password,
+        "users": [
+            {"id": str(u[0]), "email": u[1], "wishlists": wishlists_by_owner.get(u[0], [])}
+            for u in tables["users"]
+        ],
+    }
+
+
+async def load(args):
+    started = time.perf_counter()
+    tables = Generator(args).build()
+    print("generated " + ", ".join(f"{len(rows)} {name}" for name, rows in tables.items()))
+
+    async with engine.begin() as conn:
+        if args.reset:
+            result = await conn.execute(text("DELETE FROM users WHERE email LIKE :pattern"), {"pattern": f"%@{EMAIL_DOMAIN}"})
+            print(f"deleted {result.rowcount} earlier load-test users")
+        raw = (await conn.get_raw_connection()).driver_connection
+        for name, columns in TABLES.items():
+            t = time.perf_counter()
+            await raw.copy_records_to_table(name, records=tables[name], columns=columns)
+            print(f"COPY {name}: {len(tables[name])} rows in {time.perf_counter() - t:.1f}s")
+
+        t = time.perf_counter()
+        after = None
+        while True:
+            _, after = await reconcile_wishlist_counters(conn, 1000, 100, after)
+            if after is None:
+                break
+        while True:
+            _, after = await reconcile_user_stats(conn, 1000, 100, after)
+            if after is None:
+                break
+        await conn.execute(_FEED_SQL, {"max_friends": settings.feed_fanout_max_friends})
+        print(f"derived tables rebuilt in {time.perf_counter() - t:.1f}s")
+
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE"))
+    await engine.dispose()
+
+    with open(args.manifest, "w") as f:
+        json.dump(manifest(tables, args.password, args.sample_items), f)
+    print(f"manifest written to {args.manifest}; total {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--friends", type=int, default=20, help="average friends per user")
+    parser.add_argument("--wishlists", type=int, default=2, help="average wishlists per user")
+    parser.add_argument("--items", type=int, default=30, help="typical items per wishlist (5%% hold 200-500)")
+    parser.add_argument("--reserved", type=float, default=0.2, help="share of regular items already reserved")
+    parser.add_argument("--notifications", type=int, default=50, help="average notifications per user")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="delete earlier load-test users first")
+    parser.add_argument("--manifest", default="loadtest_manifest.json")
+    parser.add_argument("--sample-items", type=int, default=20, help="item ids per wishlist in the manifest")
+    asyncio.run(load(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+from sqlalchemy import Column, DefaultClause, MetaData, Table, Text, create_engine, event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+# Requests that exceed their route's @query_budget, or repeat a statement
+# shape (N+1), fail the test that made them
+os.environ.setdefault("QUERY_BUDGET_MODE", "strict")
+
+from app.utils.query_budget import capture_queries  # noqa: E402
+
+
+@pytest.fixture
+def count_queries():
+    """``with count_queries() as statements:`` records the SQL run inside the block."""
+    return capture_queries
+
+
+class _AsyncSession:
+    """The awaited calls of an ``AsyncSession`` over a sync ``Session``."""
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, obj):
+        self.sync_session.add(obj)
+
+    def add_all(self, objs):
+        self.sync_session.add_all(objs)
+
+    async def execute(self, *args, **kwargs):
+        return self.sync_session.execute(*args, **kwargs)
+
+    async def scalars(self, *args, **kwargs):
+        return self.sync_session.scalars(*args, **kwargs)
+
+    async def scalar(self, *args, **kwargs):
+        return self.sync_session.scalar(*args, **kwargs)
+
+    async def flush(self):
+        self.sync_session.flush()
+
+
+def _sqlite_table(table, metadata):
+    """``table`` in a form SQLite can create: generated columns become plain ones, function defaults get brackets."""
+    columns = []
+    for col in table.columns:
+        if col.computed is not None:
+            columns.append(Column(col.name, Text))
+            continue
+        default = col.server_default
+        if default is not None and isinstance(default.arg, TextClause):
+            default = DefaultClause(text(f"({default.arg.text})"))
+        elif default is not None:
+            default = DefaultClause(default.arg)
+        columns.append(Column(col.name, col.type, primary_key=col.primary_key, nullable=col.nullable,
+                              server_default=default))
+    return Table(table.name, metadata, *columns)
+
+
+@pytest.fixture
+def sqlite_db():
+    """``db = sqlite_db(Item, Wishlist, ...)``: an in-memory SQLite session with those models' tables.
+
+    ``nextval`` counts per sequence name, so ``items.sort_order`` defaults work.
+    """
+    engine = create_engine("sqlite://")
+    sequences = {}
+
+    @event.listens_for(engine, "connect")
+    def _functions(conn, _):
+        def nextval(name):
+            sequences[name] = sequences.get(name, 0) + 1
+            return sequences[name]
+
+        conn.create_function("nextval", 1, nextval)
+
+    sessions = []
+
+    def make(*models):
+        metadata = MetaData()
+        for model in models:
+            _sqlite_table(model.__table__, metadata)
+        metadata.create_all(engine)
+        session = Session(engine)
+        sessions.append(session)
+        return _AsyncSession(session)
+
+    yield make
+    for session in sessions:
+        session.close()
+    engine.dispose()
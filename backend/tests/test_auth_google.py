@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 from fastapi.testclient import TestClient
 
@@ -60,13 +60,14 @@ def test_google_auth_returns_access_and_refresh_tokens():
         "name": "Google User",
     }
 
-    with patch("app.routers.auth.id_token.verify_oauth2_token", return_value=claims):
+    with patch("app.routers.auth.google_verifier.verify", AsyncMock(return_value=claims)) as verify:
         with TestClient(app) as client:
             response = client.post("/api/v1/auth/google", json={"credential": "mock-google-credential"})
 
     app.dependency_overrides.clear()
 
     assert response.status_code == 200
+    verify.assert_awaited_once_with("mock-google-credential", auth.settings.google_client_id)
     data = response.json()
     assert data["token_type"] == "bearer"
     assert isinstance(data["access_token"], str) and data["access_token"]
@@ -0,0 +1,49 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+from app.models.user import User
+from app.routers import auth
+from app.services.rate_limit import count_key
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class FakeSession:
+    def __init__(self, user):
+        self.user = user
+
+    async def execute(self, _stmt):
+        return FakeResult(self.user)
+
+
+def test_account_over_its_failure_limit_refuses_the_right_password():
+    user = User(id=uuid4(), email=f"{uuid4().hex}@example.com", full_name="Anna", password_hash="hash")
+
+    async def override_get_db():
+        yield FakeSession(user)
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        for _ in range(20):
+            asyncio.run(count_key("login:account", user.email, auth.LOGIN_ACCOUNT_RULE))
+
+        verify = AsyncMock(return_value=(True, None))
+        with patch.object(auth.password_hasher, "verify_and_update", verify):
+            response = TestClient(app).post("/api/v1/auth/login", json={"email": user.email, "password": "right"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+    verify.assert_not_called()
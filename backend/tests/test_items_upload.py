@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.routers import items
+from app.routers.items import _read_upload
+
+
+def _request(chunks, content_type="application/x-ndjson"):
+    sent = []
+    pending = list(chunks)
+
+    async def receive():
+        chunk = pending.pop(0)
+        sent.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    headers = [(b"content-type", content_type.encode()), (b"transfer-encoding", b"chunked")]
+    return Request({"type": "http", "method": "POST", "headers": headers}, receive), sent
+
+
+def test_chunked_body_is_refused_once_it_passes_the_limit(monkeypatch):
+    monkeypatch.setattr(items.settings, "item_import_max_bytes", 10)
+    request, sent = _request([b"x" * 6, b"x" * 6, b"x" * 6, b"x" * 6])
+
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(_read_upload(request))
+
+    assert raised.value.status_code == 413
+    assert len(sent) == 2
+
+
+def test_multipart_file_is_read_from_the_limited_body(monkeypatch):
+    monkeypatch.setattr(items.settings, "item_import_max_bytes", 1000)
+    body = (
+        b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"wishes.csv\"\r\n"
+        b"Content-Type: application/octet-stream\r\n\r\nname\r\nLego\r\n--b--\r\n"
+    )
+    request, _ = _request([body[:40], body[40:]], content_type="multipart/form-data; boundary=b")
+
+    assert asyncio.run(_read_upload(request)) == ("text/csv", b"name\r\nLego")
@@ -0,0 +1,153 @@
+"""
+Route-level checks of the @query_budget contracts.
+
+The suite runs with QUERY_BUDGET_MODE=strict (see conftest), so a request
+that runs more statements than its route allows, or repeats one, raises
+QueryBudgetExceeded here. There is no database: ``RecordingSession``
+answers queries from a script and records each statement, and each flushed
+INSERT/UPDATE, the way the engine hooks do.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, insert, select, update
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.database import get_db
+from app.main import app
+from app.models.item import Item
+from app.models.reservation import Reservation
+from app.models.user import User
+from app.models.wishlist import Wishlist
+from app.utils.request_metrics import current_request
+from app.utils.security import create_access_token
+
+
+class Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+    def one(self):
+        return self.rows[0]
+
+    def scalar_one_or_none(self):
+        return self.rows[0][0] if self.rows else None
+
+
+def _loaded(obj):
+    """Make ``obj`` look freshly loaded: persistent identity, no pending changes."""
+    make_transient_to_detached(obj)
+    return obj
+
+
+class RecordingSession:
+    def __init__(self, users=(), results=()):
+        self.users = {user.id: user for user in users}
+        self.results = list(results)
+        self.info = {}
+        self.identity_map = {}
+        self.pending = []
+        self.loaded = [obj for rows in self.results for row in rows for obj in row if hasattr(obj, "_sa_instance_state")]
+
+    def _record(self, stmt):
+        stats = current_request.get()
+        if stats is not None and stats.statements is not None:
+            stats.statements.append(str(stmt.compile(dialect=postgresql.dialect())))
+
+    def identity_key(self, cls, ident):
+        return cls, ident
+
+    async def get(self, cls, ident):
+        self._record(select(cls).where(cls.id == ident))
+        return self.users.get(ident)
+
+    async def execute(self, stmt, params=None):
+        self._record(stmt)
+        return Result(self.results.pop(0))
+
+    def add(self, obj):
+        self.pending.append(obj)
+
+    async def flush(self):
+        for obj in self.pending:
+            self._record(insert(type(obj)))
+            obj.id = obj.id or uuid4()
+            obj.created_at = obj.created_at or datetime.now(timezone.utc)
+        self.pending = []
+        for obj in self.loaded:
+            if inspect(obj).modified:
+                self._record(update(type(obj)))
+
+
+def _user(name="Anna"):
+    return User(id=uuid4(), email=f"{name.lower()}@example.com", full_name=name, username=name.lower())
+
+
+def _wishlist(owner):
+    return _loaded(Wishlist(id=uuid4(), owner_id=owner.id, title="ДР", is_active=True))
+
+
+def _item(wishlist, **fields):
+    return _loaded(Item(id=uuid4(), wishlist_id=wishlist.id, name="Лего", **fields))
+
+
+def _client(session):
+    async def override_get_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def _auth(user):
+    return {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+
+def teardown_function():
+    app.dependency_overrides.clear()
+
+
+def test_like_item_stays_within_budget():
+    owner, fan = _user("Owner"), _user("Fan")
+    wishlist = _wishlist(owner)
+    item = _item(wishlist)
+    session = RecordingSession(users=[fan], results=[[(item, wishlist)], []])
+
+    response = _client(session).post(f"/api/v1/items/{item.id}/like", headers=_auth(fan))
+
+    assert response.status_code == 201
+    assert response.headers["x-query-count"] == "4"
+
+
+def test_contribute_stays_within_budget():
+    owner, friend = _user("Owner"), _user("Friend")
+    wishlist = _wishlist(owner)
+    item = _item(wishlist, price=Decimal("10000"), is_group_gift=True)
+    session = RecordingSession(users=[friend], results=[[(item, wishlist)], [(Decimal("2500"), 2)]])
+
+    response = _client(session).post(
+        f"/api/v1/items/{item.id}/contribute", json={"amount": "1000"}, headers=_auth(friend),
+    )
+
+    assert response.status_code == 201
+    assert response.headers["x-query-count"] == "4"
+
+
+def test_send_thanks_stays_within_budget():
+    owner = _user("Owner")
+    reservation = _loaded(Reservation(id=uuid4(), item_id=uuid4(), guest_name="Гость", thanks_sent=False))
+    session = RecordingSession(users=[owner], results=[[(reservation, owner.id)]])
+
+    response = _client(session).post(
+        f"/api/v1/reservations/{reservation.id}/thanks", json={"reaction": "love"}, headers=_auth(owner),
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-query-count"] == "3"
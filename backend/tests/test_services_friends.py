@@ -0,0 +1,32 @@
+from uuid import uuid4
+
+from app.services.friends import FriendSetCache
+
+
+def test_friend_sets_are_evicted_least_recently_used_first():
+    cache = FriendSetCache(max_entries=2, ttl=60)
+    a, b, c = uuid4(), uuid4(), uuid4()
+    cache.put(a, frozenset({b}))
+    cache.put(b, frozenset({a}))
+    assert cache.get(a) == frozenset({b})
+
+    cache.put(c, frozenset())
+
+    assert cache.get(b) is None
+    assert cache.get(a) == frozenset({b})
+    assert cache.get(c) == frozenset()
+
+
+def test_invalidate_and_ttl_drop_entries():
+    cache = FriendSetCache(max_entries=10, ttl=60)
+    a, b = uuid4(), uuid4()
+    cache.put(a, frozenset({b}))
+    cache.put(b, frozenset({a}))
+
+    cache.invalidate(a, b)
+    assert cache.get(a) is None and cache.get(b) is None
+
+    cache.ttl = 0.000001
+    cache.put(a, frozenset())
+    assert cache.get(a) is None
+    assert cache.stats["hits"] == 0
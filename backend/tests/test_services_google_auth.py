@@ -0,0 +1,108 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from app.services.google_auth import GoogleTokenError, GoogleTokenVerifier, cache_lifetime
+
+AUDIENCE = "client-id.apps.googleusercontent.com"
+
+
+def _rsa_pem():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+
+
+class StandInJWKS:
+    """Local stand-in for Google's cert endpoint, serving whatever keys are current."""
+
+    def __init__(self):
+        self.private_keys: dict[str, str] = {}
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.requests += 1
+                body = json.dumps({"keys": [
+                    {**jwk.construct(pem, "RS256").public_key().to_dict(), "kid": kid, "use": "sig"}
+                    for kid, pem in stand_in.private_keys.items()
+                ]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", "public, max-age=19800, must-revalidate")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/certs"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def rotate(self, kid: str):
+        self.private_keys[kid] = _rsa_pem()
+
+    def sign(self, kid: str, **overrides) -> str:
+        claims = {
+            "iss": "https://accounts.google.com", "aud": AUDIENCE, "sub": "123", "email": "a@example.com",
+            "email_verified": True, "exp": int(time.time()) + 600, **overrides,
+        }
+        return jwt.encode(claims, self.private_keys[kid], algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture
+def google():
+    stand_in = StandInJWKS()
+    stand_in.rotate("k1")
+    yield stand_in
+    stand_in.server.shutdown()
+
+
+def test_cache_lifetime_reads_max_age():
+    assert cache_lifetime("public, max-age=19800, must-revalidate") == 19800
+    assert cache_lifetime(None) == 3600
+
+
+def test_keys_are_fetched_once_and_refetched_on_rotation(google):
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            verifier = GoogleTokenVerifier(google.url, client)
+            for _ in range(3):
+                assert (await verifier.verify(google.sign("k1"), AUDIENCE))["sub"] == "123"
+            assert google.requests == 1
+
+            google.rotate("k2")
+            verifier._fetched_at -= 60
+            assert (await verifier.verify(google.sign("k2"), AUDIENCE))["email"] == "a@example.com"
+            assert google.requests == 2
+
+    asyncio.run(scenario())
+
+
+def test_invalid_tokens_are_rejected(google):
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            verifier = GoogleTokenVerifier(google.url, client)
+            bad = [
+                google.sign("k1", aud="someone-else"),
+                google.sign("k1", iss="https://evil.example.com"),
+                google.sign("k1", exp=int(time.time()) - 10),
+                google.sign("k1")[:-4] + "AAAA",
+                "not-a-jwt",
+            ]
+            for token in bad:
+                with pytest.raises(GoogleTokenError):
+                    await verifier.verify(token, AUDIENCE)
+
+    asyncio.run(scenario())
@@ -0,0 +1,96 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.models.friend_edge import FriendEdge
+from app.models.friendship import Friendship
+from app.models.item import Item
+from app.models.user import User
+from app.models.wishlist import Wishlist
+from app.models.wishlist_access import WishlistAccess
+from app.services.item_search import ItemSearchFilters, _visible_to, search_items
+
+
+def _branches(user_id):
+    return [
+        branch.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": False})
+        for branch in _visible_to(user_id).clauses
+    ]
+
+
+def test_every_visibility_branch_is_tied_to_the_caller():
+    # A stranger's wishlist (not owned, no access grant, owner not a friend)
+    # can only match a branch that doesn't mention the caller at all
+    user_id = uuid4()
+    for compiled in _branches(user_id):
+        assert user_id in compiled.params.values(), str(compiled)
+
+
+def test_public_wishlists_are_only_searchable_through_friends():
+    user_id = uuid4()
+    public = [c for c in _branches(user_id) if "public" in c.params.get("privacy_1", ())]
+    assert len(public) == 1
+    assert "friend_edges" in str(public[0])
+
+
+@pytest.fixture
+def world(sqlite_db):
+    """Me, a friend and a stranger, and one item in each kind of wishlist."""
+    db = sqlite_db(User, Friendship, FriendEdge, Wishlist, WishlistAccess, Item)
+    me, friend, stranger = (User(id=uuid4(), email=f"{n}@example.com", full_name=n) for n in ("me", "friend", "stranger"))
+    friendship = Friendship(id=uuid4(), requester_id=me.id, addressee_id=friend.id, status="accepted")
+    db.add_all([me, friend, stranger, friendship])
+    db.add_all([
+        FriendEdge(user_id=me.id, friend_id=friend.id, friendship_id=friendship.id),
+        FriendEdge(user_id=friend.id, friend_id=me.id, friendship_id=friendship.id),
+    ])
+
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    wishlists = {
+        "own_private": Wishlist(id=uuid4(), owner_id=me.id, title="Моё", privacy="private"),
+        "friend_public": Wishlist(id=uuid4(), owner_id=friend.id, title="Друг", privacy="public"),
+        "friend_friends": Wishlist(id=uuid4(), owner_id=friend.id, title="Друзьям", privacy="friends"),
+        "friend_private": Wishlist(id=uuid4(), owner_id=friend.id, title="Секрет", privacy="private"),
+        "friend_inactive": Wishlist(id=uuid4(), owner_id=friend.id, title="Архив", privacy="public", is_active=False),
+        "stranger_public": Wishlist(id=uuid4(), owner_id=stranger.id, title="Чужое", privacy="public"),
+        "stranger_shared": Wishlist(id=uuid4(), owner_id=stranger.id, title="Мне", privacy="selected"),
+    }
+    db.add_all(wishlists.values())
+    db.add(WishlistAccess(wishlist_id=wishlists["stranger_shared"].id, user_id=me.id))
+    for n, (name, wishlist) in enumerate(wishlists.items()):
+        db.add(Item(
+            id=uuid4(), wishlist_id=wishlist.id, name=name, price=Decimal(1000 * (n + 1)),
+            priority="dream" if n % 2 else "normal", created_at=now + timedelta(minutes=n),
+        ))
+    asyncio.run(db.flush())
+    return db, me
+
+
+def _names(db, me, limit=20, after=None, **filters):
+    rows = asyncio.run(search_items(db, me.id, ItemSearchFilters(**filters), limit, after))
+    return [item.name for item, _, _ in rows], rows
+
+
+def test_search_covers_own_shared_and_friends_wishlists_only(world):
+    names, _ = _names(*world)
+    # Newest first
+    assert names == ["stranger_shared", "friend_friends", "friend_public", "own_private"]
+
+
+def test_price_and_priority_filters(world):
+    assert _names(*world, min_price=Decimal(2000), max_price=Decimal(3000))[0] == ["friend_friends", "friend_public"]
+    assert _names(*world, priority="dream")[0] == ["friend_public"]
+
+
+def test_cursor_continues_where_the_page_ended(world):
+    db, me = world
+    first, rows = _names(db, me, limit=2)
+    # One extra row tells the caller there is a next page
+    assert first == ["stranger_shared", "friend_friends", "friend_public"]
+
+    rest, _ = _names(db, me, limit=2, after=rows[1][2])
+    assert rest == ["friend_public", "own_private"]
@@ -0,0 +1,72 @@
+import asyncio
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+
+from app.models.item import Item
+from app.models.user import User
+from app.models.wishlist import Wishlist
+from app.schemas.item import ItemCreate
+from app.services import ordering
+from app.services.item_transfer import ItemImportError, export_line, insert_items, parse_items
+
+
+def test_formats_parse_to_the_same_items():
+    as_json = b'[{"name": "Book", "price": "500"}, {"name": "Lamp", "is_group_gift": true}]'
+    as_ndjson = b'{"name": "Book", "price": "500"}\n\n{"name": "Lamp", "is_group_gift": true}\n'
+    as_csv = "﻿name,price,is_group_gift\r\nBook,500,\r\nLamp,,true\r\n".encode()
+
+    parsed = [
+        parse_items(content_type, body, max_items=10)
+        for content_type, body in (
+            ("application/json", as_json),
+            ("application/x-ndjson", as_ndjson),
+            ("text/csv", as_csv),
+        )
+    ]
+
+    assert parsed[0] == parsed[1] == parsed[2]
+    book, lamp = parsed[0]
+    assert book.price == Decimal("500") and book.currency == "RUB" and not book.is_group_gift
+    assert lamp.price is None and lamp.is_group_gift
+
+
+def test_invalid_rows_are_reported_by_number():
+    with pytest.raises(ItemImportError, match="Строка 2: url"):
+        parse_items("application/json", b'[{"name": "ok"}, {"name": "bad", "url": "ftp://x"}]', max_items=10)
+    with pytest.raises(ItemImportError, match="строке 2"):
+        parse_items("application/x-ndjson", b'{"name": "ok"}\n{oops', max_items=10)
+    with pytest.raises(ItemImportError, match="максимум 1"):
+        parse_items("application/json", b'[{"name": "a"}, {"name": "b"}]', max_items=1)
+
+
+def test_export_lines_import_back():
+    item = Item(id=uuid4(), wishlist_id=uuid4(), name="Чайник", price=Decimal("1999.90"), currency="RUB",
+                is_group_gift=False, priority="dream")
+
+    (restored,) = parse_items("application/x-ndjson", export_line(item), max_items=1)
+
+    assert restored.name == "Чайник" and restored.price == Decimal("1999.90") and restored.priority == "dream"
+
+
+def test_item_created_right_after_an_import_sorts_last(sqlite_db):
+    db = sqlite_db(User, Wishlist, Item)
+    owner = User(id=uuid4(), email="anna@example.com", full_name="Anna")
+    wishlist = Wishlist(id=uuid4(), owner_id=owner.id, title="ДР")
+    db.add_all([owner, wishlist])
+    asyncio.run(db.flush())
+
+    imported = asyncio.run(insert_items(db, wishlist.id, [ItemCreate(name=f"Книга {n}") for n in range(3)]))
+    created = Item(wishlist_id=wishlist.id, name="Лампа")
+    db.add(created)
+    asyncio.run(db.flush())
+
+    rows = asyncio.run(db.execute(
+        select(Item.name, Item.sort_order).where(Item.wishlist_id == wishlist.id).order_by(Item.sort_order)
+    )).all()
+    assert [name for name, _ in rows] == ["Книга 0", "Книга 1", "Книга 2", "Лампа"]
+    keys = [key for _, key in rows]
+    assert all(b - a >= ordering.GAP for a, b in zip(keys, keys[1:]))
+    assert [item.sort_order for item in imported] == keys[:3]
@@ -0,0 +1,139 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from app.services import maintenance
+from app.services.maintenance import RetentionJob, RetentionPolicy, drop_expired_partitions, purge_in_batches
+
+
+class Result:
+    def __init__(self, rows=(), rowcount=None):
+        self.rows = list(rows)
+        self.rowcount = rowcount if rowcount is not None else len(self.rows)
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+    def one_or_none(self):
+        return self.rows[0] if self.rows else None
+
+    def all(self):
+        return self.rows
+
+
+class FakeConn:
+    """Records statements; ``respond(sql, params)`` returns the Result for each."""
+
+    def __init__(self, respond=None):
+        self.statements = []
+        self.respond = respond or (lambda sql, params: Result())
+        self.state = {}
+
+    async def execution_options(self, **kwargs):
+        return self
+
+    async def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.statements.append(sql)
+        params = params or {}
+        if "FROM maintenance_state" in sql:
+            row = self.state.get(params["job"])
+            return Result([row] if row else [])
+        if "INTO maintenance_state" in sql:
+            previous = self.state.get(params["job"], (None, None))
+            self.state[params["job"]] = (params["cursor"], datetime.now(timezone.utc) if params["completed"] else previous[1])
+            return Result()
+        return self.respond(sql, params)
+
+
+def _engine(conn):
+    class Engine:
+        @asynccontextmanager
+        async def connect(self):
+            yield conn
+    return Engine()
+
+
+POLICY = RetentionPolicy(table="refresh_tokens", where="expires_at < now()")
+
+
+def test_purge_runs_batches_until_one_comes_back_short():
+    counts = iter([100, 100, 37])
+    conn = FakeConn(lambda sql, params: Result(rowcount=next(counts)))
+
+    metrics = asyncio.run(purge_in_batches(conn, POLICY, batch_size=100, max_batches=10))
+
+    assert (metrics.batches, metrics.deleted) == (3, 237)
+    assert all("(tableoid, ctid) IN (SELECT tableoid, ctid FROM refresh_tokens" in s for s in conn.statements)
+
+
+def test_purge_stops_at_max_batches_and_reports_returned_values():
+    recipient = uuid4()
+    purged = []
+
+    async def on_purged(values):
+        purged.append(values)
+
+    policy = RetentionPolicy(
+        table="notifications", where="created_at < now()", archive_table="notifications_archive",
+        returning="CASE WHEN NOT is_read THEN recipient_id END", on_purged=on_purged,
+    )
+    conn = FakeConn(lambda sql, params: Result([(recipient,), (None,)]))
+
+    metrics = asyncio.run(purge_in_batches(conn, policy, batch_size=2, max_batches=3))
+
+    assert (metrics.batches, metrics.archived, metrics.deleted) == (3, 6, 0)
+    assert purged == [{recipient}] * 3
+    assert conn.statements[0].startswith("WITH moved AS (DELETE FROM notifications")
+    assert conn.statements[0].endswith("RETURNING CASE WHEN NOT is_read THEN recipient_id END")
+
+
+def test_only_partitions_entirely_past_retention_are_dropped():
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    year_ago = this_month.replace(year=this_month.year - 1)
+    names = [(f"notifications_p{m:%Y%m}",) for m in (year_ago, this_month)] + [("notifications_pxx",)]
+    conn = FakeConn(lambda sql, params: Result(names) if "pg_inherits" in sql else Result())
+
+    dropped = asyncio.run(drop_expired_partitions(conn, days=180, archive=True))
+
+    assert dropped == 1
+    assert conn.statements[1:] == [
+        f"ALTER TABLE notifications DETACH PARTITION notifications_p{year_ago:%Y%m}",
+        f"ALTER TABLE notifications_p{year_ago:%Y%m} RENAME TO archive_notifications_p{year_ago:%Y%m}",
+    ]
+
+
+def test_run_is_skipped_when_another_worker_holds_the_lock(monkeypatch):
+    conn = FakeConn(lambda sql, params: Result([(False,)]) if "pg_try_advisory_lock" in sql else Result())
+    monkeypatch.setattr(maintenance, "engine", _engine(conn))
+
+    assert asyncio.run(RetentionJob(policies=[POLICY]).run_once()) is None
+    assert len(conn.statements) == 1
+
+
+def test_reconcile_resumes_from_the_stored_cursor_on_another_worker(monkeypatch):
+    conn = FakeConn(lambda sql, params: Result([(True,)]) if "pg_try_advisory_lock" in sql else Result(rowcount=0))
+    monkeypatch.setattr(maintenance, "engine", _engine(conn))
+    monkeypatch.setattr(maintenance.settings, "counter_reconcile_enabled", True)
+    cursors = [uuid4(), None]
+    seen = []
+
+    async def reconcile(conn, batch_size, max_batches, after):
+        seen.append(after)
+        return 0, cursors[len(seen) - 1]
+
+    async def stats(conn, batch_size, max_batches, after):
+        return 0, None
+
+    monkeypatch.setattr(maintenance, "reconcile_wishlist_counters", reconcile)
+    monkeypatch.setattr(maintenance, "reconcile_user_stats", stats)
+
+    # Two job instances stand in for two workers taking turns on the lock
+    asyncio.run(RetentionJob(policies=[POLICY]).run_once())
+    runs = asyncio.run(RetentionJob(policies=[POLICY]).run_once())
+
+    assert seen == [None, cursors[0]]
+    assert conn.state["wishlist_counters"][0] is None
+    # The stats pass finished on the first worker, so the second doesn't repeat it
+    assert "user_stats" not in runs
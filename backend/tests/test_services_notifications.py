@@ -0,0 +1,249 @@
+import asyncio
+from collections import Counter
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.services import notifications
+from app.services.notifications import NotificationEvent, NotificationFanout, mark_unread_changed
+
+
+class RecordingPush:
+    def __init__(self):
+        self.messages = []
+
+    def enqueue(self, message):
+        self.messages.append(message)
+        return True
+
+
+def _like(recipient_id, sender_id, name, item_id="item-1"):
+    return NotificationEvent(
+        recipient_id=recipient_id,
+        type="item_liked",
+        title="Лайк",
+        body=f"{name} лайкнул «Лего»",
+        sender_id=sender_id,
+        actor_name=name,
+        target_name="Лего",
+        data={"item_id": item_id},
+    )
+
+
+def _fanout():
+    written = []
+
+    async def writer(rows):
+        written.extend(rows)
+
+    push = RecordingPush()
+    return NotificationFanout(window=60, tick=3600, writer=writer, push=push), written, push
+
+
+@pytest.mark.asyncio
+async def test_likes_on_one_item_are_coalesced_into_one_row_and_push():
+    fanout, written, push = _fanout()
+    owner = uuid4()
+    senders = [uuid4() for _ in range(20)]
+    for i, sender in enumerate(senders):
+        fanout.enqueue(_like(owner, sender, f"User{i}"))
+    # A repeated like by the same person does not inflate the count
+    fanout.enqueue(_like(owner, senders[0], "User0"))
+    await fanout.stop()
+
+    assert len(written) == 1
+    assert written[0]["body"] == "User0 и ещё 19 лайкнули «Лего»"
+    assert written[0]["data"]["count"] == 20
+    assert len(push.messages) == 1
+
+
+@pytest.mark.asyncio
+async def test_groups_are_split_by_target_and_window():
+    fanout, written, push = _fanout()
+    owner = uuid4()
+    fanout.enqueue(_like(owner, uuid4(), "Anna", item_id="item-1"))
+    fanout.enqueue(_like(owner, uuid4(), "Boris", item_id="item-2"))
+
+    await fanout.flush()
+    assert written == []
+
+    await fanout.flush(force=True)
+    assert sorted(r["body"] for r in written) == ["Anna лайкнул «Лего»", "Boris лайкнул «Лего»"]
+
+
+@pytest.mark.asyncio
+async def test_uncoalesced_types_are_written_per_event():
+    fanout, written, push = _fanout()
+    recipient = uuid4()
+    for i in range(3):
+        fanout.enqueue(NotificationEvent(
+            recipient_id=recipient, type="friend_request", title="Запрос в друзья",
+            body="body", sender_id=uuid4(), data={"friendship_id": str(i)},
+        ))
+    await fanout.flush()
+
+    assert sorted(r["data"]["friendship_id"] for r in written) == ["0", "1", "2"]
+    assert len(push.messages) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_write_requeues_groups_and_merges_events_from_meanwhile():
+    owner = uuid4()
+    written = []
+    attempts = []
+
+    async def writer(rows):
+        attempts.append(rows)
+        if len(attempts) == 1:
+            # Another like arrives while the failing INSERT is in flight
+            fanout.enqueue(_like(owner, uuid4(), "Boris"))
+            raise RuntimeError("db down")
+        written.extend(rows)
+
+    fanout = NotificationFanout(window=60, tick=3600, writer=writer, push=RecordingPush())
+    fanout.enqueue(_like(owner, uuid4(), "Anna"))
+
+    with pytest.raises(RuntimeError):
+        await fanout.flush(force=True)
+    assert fanout.metrics()["pending"] == 1
+    assert fanout.stats["write_failures"] == 1
+
+    await fanout.flush(force=True)
+    assert len(written) == 1
+    assert written[0]["data"]["count"] == 2
+    assert written[0]["body"] == "Boris и ещё 1 лайкнули «Лего»"
+
+
+class RecordingRedis:
+    """In-memory stand-in for the calls and scripts the unread counter uses."""
+
+    def __init__(self):
+        self.values = {}
+        self.deleted = []
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if not (nx and key in self.values):
+            self.values[key] = str(value)
+
+    async def delete(self, *keys):
+        self.deleted.extend(keys)
+        for key in keys:
+            self.values.pop(key, None)
+
+    async def eval(self, script, numkeys, *args):
+        keys, argv = args[:numkeys], args[numkeys:]
+        if script == notifications._INCR_IF_EXISTS:
+            if keys[0] in self.values:
+                self.values[keys[0]] = str(int(self.values[keys[0]]) + argv[0])
+                return int(self.values[keys[0]])
+            self.values.pop(keys[1], None)
+            return None
+        assert script == notifications._SEED_IF_UNCHANGED
+        if self.values.get(keys[1]) != argv[0]:
+            return 0
+        del self.values[keys[1]]
+        await self.set(keys[0], argv[1], nx=True)
+        return 1
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def eval(self, *args):
+                self.calls.append(args)
+
+            async def execute(self):
+                return [await redis.eval(*args) for args in self.calls]
+
+        return Pipeline()
+
+
+class CountingSession:
+    """Answers the unread count query; ``during`` runs while it is "in flight"."""
+
+    def __init__(self, count, during=None):
+        self.count = count
+        self.during = during
+        self.queries = 0
+
+    async def execute(self, _stmt):
+        self.queries += 1
+        count = self.count
+        if self.during:
+            await self.during()
+
+        class Result:
+            def scalar_one(self):
+                return count
+
+        return Result()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = RecordingRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(notifications, "get_redis", get_redis)
+    return redis
+
+
+def test_unread_count_is_seeded_and_then_bumped(redis):
+    user_id = uuid4()
+    db = CountingSession(3)
+
+    assert asyncio.run(notifications.get_unread_count(db, user_id)) == 3
+    asyncio.run(notifications.bump_unread_counts(Counter({user_id: 2})))
+
+    assert asyncio.run(notifications.get_unread_count(db, user_id)) == 5
+    assert db.queries == 1
+
+
+def test_bump_during_the_count_keeps_the_stale_count_out_of_the_cache(redis):
+    user_id = uuid4()
+
+    async def fanout_commits():
+        await notifications.bump_unread_counts(Counter({user_id: 1}))
+
+    # The count was taken before the fan-out's row committed
+    assert asyncio.run(notifications.get_unread_count(CountingSession(3, during=fanout_commits), user_id)) == 3
+    assert f"notif:unread:{user_id}" not in redis.values
+
+    assert asyncio.run(notifications.get_unread_count(CountingSession(4), user_id)) == 4
+    assert redis.values[f"notif:unread:{user_id}"] == "4"
+
+
+def test_unread_count_is_invalidated_only_after_commit(redis):
+    engine = create_engine("sqlite://")
+    kept, dropped = uuid4(), uuid4()
+
+    async def scenario():
+        with Session(engine) as session:
+            session.execute(text("SELECT 1"))
+            mark_unread_changed(session, dropped)
+            session.rollback()
+            session.execute(text("SELECT 1"))
+            mark_unread_changed(session, kept)
+            await asyncio.sleep(0)
+            assert redis.deleted == []
+            session.commit()
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert redis.deleted == [f"notif:unread:{kept}", f"notif:unread:{kept}:seed"]
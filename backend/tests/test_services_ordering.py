@@ -0,0 +1,79 @@
+import asyncio
+from uuid import uuid4
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.item import Item
+from app.services import ordering
+
+
+class FakeSession:
+    """Answers neighbour-key lookups from a queue and records other statements.
+
+    A key update returns its literal value, or the next value of a fake
+    ``items_sort_seq`` (starting at ``sequence``) times GAP.
+    """
+
+    def __init__(self, neighbours, sequence=100):
+        self.neighbours = list(neighbours)
+        self.sequence = sequence
+        self.statements = []
+
+    async def execute(self, stmt, execution_options=None):
+        self.statements.append(stmt)
+        compiled = stmt.compile(dialect=postgresql.dialect())
+        if "nextval" in str(compiled):
+            key = self.sequence * ordering.GAP
+            self.sequence += 1
+        else:
+            key = compiled.params.get("sort_order")
+        neighbours = self.neighbours
+
+        class Result:
+            def one(self):
+                return neighbours.pop(0)
+
+            def scalar_one(self):
+                return key
+
+        return Result()
+
+    async def scalar(self, stmt):
+        return self.neighbours.pop(0)
+
+
+def _item():
+    return Item(id=uuid4(), wishlist_id=uuid4(), sort_order=0)
+
+
+def test_append_key_comes_from_the_shared_sequence():
+    compiled = str(ordering.append_key().compile(dialect=postgresql.dialect()))
+    assert "nextval('items_sort_seq')" in compiled
+
+
+def test_move_after_last_takes_a_fresh_append_key():
+    item = _item()
+    db = FakeSession([(4096, None)], sequence=10)
+    assert asyncio.run(ordering.move(db, item, uuid4())) == 10 * ordering.GAP
+    assert "nextval('items_sort_seq')" in str(db.statements[-1].compile(dialect=postgresql.dialect()))
+
+
+def test_move_takes_midpoint_between_neighbours():
+    item = _item()
+    db = FakeSession([(1024, 2048)])
+    assert asyncio.run(ordering.move(db, item, uuid4())) == 1536
+    assert item.sort_order == 1536
+
+
+def test_move_renumbers_when_neighbours_are_adjacent():
+    item = _item()
+    db = FakeSession([(1024, 1025), (1024, 2048)])
+    assert asyncio.run(ordering.move(db, item, uuid4())) == 1536
+    # lookup, renumber, lookup, single-row update
+    assert len(db.statements) == 4
+
+
+def test_move_to_top_goes_below_first_key():
+    item = _item()
+    db = FakeSession([4096])
+    assert asyncio.run(ordering.move(db, item, None)) == 4096 - ordering.GAP
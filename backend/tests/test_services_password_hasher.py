@@ -0,0 +1,49 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.password_hasher import HasherOverloaded, PasswordHasher
+
+
+def test_requests_beyond_workers_and_queue_are_rejected():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+
+    def slow(password):
+        release.wait(5)
+        return password[::-1]
+
+    async def scenario():
+        first = asyncio.ensure_future(hasher._run(slow, "ab"))
+        second = asyncio.ensure_future(hasher._run(slow, "cd"))
+        await asyncio.sleep(0)
+        assert hasher.in_flight == 2
+        with pytest.raises(HasherOverloaded):
+            await hasher._run(slow, "ef")
+        release.set()
+        return await first, await second
+
+    try:
+        assert asyncio.run(scenario()) == ("ba", "dc")
+    finally:
+        hasher.shutdown()
+
+    metrics = hasher.metrics()
+    assert metrics["completed"] == 2 and metrics["rejected"] == 1 and metrics["in_flight"] == 0
+    assert metrics["wait_ms_max"] >= 0
+
+
+def test_outdated_hashes_are_upgraded_on_verify():
+    from passlib.context import CryptContext
+
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    hasher = PasswordHasher(workers=1, max_queue=0)
+    try:
+        ok, new_hash = asyncio.run(hasher.verify_and_update("secret", old_hash))
+        wrong, no_hash = asyncio.run(hasher.verify_and_update("nope", old_hash))
+    finally:
+        hasher.shutdown()
+
+    assert ok and new_hash and new_hash.startswith("$2b$12$")
+    assert not wrong and no_hash is None
@@ -0,0 +1,40 @@
+from uuid import uuid4
+
+import pytest
+
+from app.services.public_cache import PublicWishlistCache, etag_matches, make_etag
+
+
+def test_etag_matching_uses_weak_comparison():
+    etag = make_etag(b'{"items":[]}')
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+
+
+@pytest.mark.asyncio
+async def test_entries_are_served_until_the_wishlist_version_moves():
+    cache = PublicWishlistCache(max_entries=10, ttl=3600, local_ttl=60)
+    wishlist_id = uuid4()
+
+    assert await cache.get("token") is None
+    version = await cache.current_version(wishlist_id)
+    stored = await cache.put("token", wishlist_id, version, b'{"v":1}')
+
+    hit = await cache.get("token")
+    assert hit is not None and hit.etag == stored.etag
+
+    await cache.bump(wishlist_id)
+    assert await cache.get("token") is None
+
+
+@pytest.mark.asyncio
+async def test_local_tier_is_bounded():
+    cache = PublicWishlistCache(max_entries=2, ttl=3600, local_ttl=60)
+    for token in ("a", "b", "c"):
+        await cache.put(token, uuid4(), 0, b"{}")
+
+    assert await cache.get("a") is None
+    assert await cache.get("c") is not None
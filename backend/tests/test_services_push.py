@@ -0,0 +1,130 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from uuid import uuid4
+
+import httpx
+import pytest
+
+from app.services.push import EXPO_BATCH_SIZE, PushDispatcher, PushMessage
+
+
+class FakeExpo:
+    """Local stand-in for the Expo push and receipts endpoints."""
+
+    def __init__(self):
+        self.batches = []
+        self.receipt_requests = []
+        self.dead_tokens = set()
+        self.receipts = {}
+        expo = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if self.path == "/push/send":
+                    expo.batches.append(body)
+                    data = []
+                    for message in body:
+                        if message["to"] in expo.dead_tokens:
+                            data.append({"status": "error", "details": {"error": "DeviceNotRegistered"}})
+                        else:
+                            data.append({"status": "ok", "id": f"ticket-{message['to']}"})
+                    payload = {"data": data}
+                else:
+                    expo.receipt_requests.append(body["ids"])
+                    payload = {"data": {i: expo.receipts.get(i, {"status": "ok"}) for i in body["ids"]}}
+                raw = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def expo():
+    server = FakeExpo()
+    yield server
+    server.close()
+
+
+def _dispatcher(expo, client, pruned, tokens=None):
+    async def resolve(user_ids):
+        return {uid: token for uid, token in (tokens or {}).items() if uid in user_ids}
+
+    async def prune(dead):
+        pruned.update(dead)
+
+    return PushDispatcher(
+        push_url=f"{expo.url}/push/send",
+        receipts_url=f"{expo.url}/push/getReceipts",
+        batch_window=0.05,
+        max_concurrency=2,
+        receipt_delay=0,
+        receipt_poll_interval=3600,
+        client_factory=lambda: client,
+        resolve_tokens=resolve,
+        prune_tokens=prune,
+    )
+
+
+@pytest.mark.asyncio
+async def test_messages_are_sent_in_expo_sized_chunks(expo):
+    pruned = set()
+    async with httpx.AsyncClient() as client:
+        dispatcher = _dispatcher(expo, client, pruned)
+        for i in range(250):
+            dispatcher.enqueue(PushMessage(title="Лайк", body="body", token=f"ExponentPushToken[{i}]"))
+        await dispatcher.stop()
+
+    assert sorted(len(b) for b in expo.batches) == [50, EXPO_BATCH_SIZE, EXPO_BATCH_SIZE]
+    assert dispatcher.stats["sent"] == 250
+    assert not pruned
+
+
+@pytest.mark.asyncio
+async def test_user_tokens_are_resolved_per_batch(expo):
+    pruned = set()
+    alice, bob = uuid4(), uuid4()
+    async with httpx.AsyncClient() as client:
+        dispatcher = _dispatcher(expo, client, pruned, tokens={alice: "ExponentPushToken[alice]"})
+        dispatcher.enqueue(PushMessage(title="t", body="b", user_id=alice))
+        dispatcher.enqueue(PushMessage(title="t", body="b", user_id=bob))
+        await dispatcher.stop()
+
+    assert [m["to"] for b in expo.batches for m in b] == ["ExponentPushToken[alice]"]
+
+
+@pytest.mark.asyncio
+async def test_dead_tokens_are_pruned_from_tickets_and_receipts(expo):
+    pruned = set()
+    expo.dead_tokens.add("ExponentPushToken[gone]")
+    expo.receipts["ticket-ExponentPushToken[stale]"] = {
+        "status": "error",
+        "details": {"error": "DeviceNotRegistered"},
+    }
+    async with httpx.AsyncClient() as client:
+        dispatcher = _dispatcher(expo, client, pruned)
+        for token in ("gone", "stale", "fine"):
+            dispatcher.enqueue(PushMessage(title="t", body="b", token=f"ExponentPushToken[{token}]"))
+        await dispatcher.flush()
+        assert pruned == {"ExponentPushToken[gone]"}
+
+        await dispatcher.check_receipts()
+        await dispatcher.stop()
+
+    assert len(expo.receipt_requests) == 1
+    assert pruned == {"ExponentPushToken[gone]", "ExponentPushToken[stale]"}
+    assert dispatcher.stats["pruned"] == 2
@@ -0,0 +1,56 @@
+import asyncio
+
+from starlette.requests import Request
+
+from app.services import rate_limit
+from app.services.rate_limit import Rule, SlidingWindowLimiter, client_ip, parse_rule
+
+
+def _request(peer="10.0.0.1", forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 1234)})
+
+
+def test_parse_rule():
+    assert parse_rule("5/minute") == Rule(5, 60)
+    assert parse_rule("100/hours") == Rule(100, 3600)
+
+
+def test_sliding_window_weights_the_previous_window():
+    limiter = SlidingWindowLimiter(max_local_keys=100)
+    rule = Rule(limit=4, window=60)
+
+    async def hits(n, now):
+        return [await limiter.hit("k", rule, now=now) for _ in range(n)]
+
+    # 4 hits late in window 0 fill it; the 5th is refused with the time left in the window
+    assert asyncio.run(hits(4, 50)) == [None] * 4
+    assert asyncio.run(hits(1, 59)) == [1.0]
+    # A quarter into window 1, 3/4 of the previous 4 still count: one more fits
+    assert asyncio.run(hits(2, 75)) == [None, 45]
+    # Once the old window has slid out, the full limit is available again
+    assert asyncio.run(hits(4, 125)) == [None] * 4
+
+
+def test_client_ip_uses_trusted_forwarded_entry(monkeypatch):
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXY_HOPS", 1)
+    assert client_ip(_request(forwarded="6.6.6.6, 1.2.3.4")) == "1.2.3.4"
+    assert client_ip(_request()) == "10.0.0.1"
+
+    monkeypatch.setattr(rate_limit, "TRUSTED_PROXY_HOPS", 0)
+    assert client_ip(_request(forwarded="6.6.6.6")) == "10.0.0.1"
+
+
+def test_peek_does_not_count():
+    limiter = SlidingWindowLimiter(max_local_keys=100)
+    rule = Rule(limit=2, window=60)
+
+    async def run():
+        assert await limiter.peek("k", rule, now=10) is None
+        await limiter.hit("k", rule, now=10)
+        assert await limiter.peek("k", rule, now=10) is None
+        await limiter.hit("k", rule, now=10)
+        return await limiter.peek("k", rule, now=10), await limiter.peek("k", rule, now=10)
+
+    assert asyncio.run(run()) == (50, 50)
+    assert limiter.stats["allowed"] == 2
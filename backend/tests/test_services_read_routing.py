@@ -0,0 +1,56 @@
+import asyncio
+import uuid
+
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.services import read_routing
+from app.services.read_routing import ReadRouter, request_user_id
+
+
+def test_recent_writers_and_lagging_replica_read_from_primary():
+    router = ReadRouter(window=5, max_lag=10, enabled=True)
+    writer, other = uuid.uuid4(), uuid.uuid4()
+    router.note_write_local(writer)
+
+    async def scenario():
+        return [
+            await router.use_replica(None),
+            await router.use_replica(other),
+            await router.use_replica(writer),
+        ]
+
+    assert asyncio.run(scenario()) == [True, True, False]
+
+    router.lag_seconds = 30
+    assert not router.replica_usable()
+    router.lag_seconds = None
+    assert not router.replica_usable()
+    assert not ReadRouter(enabled=False).replica_usable()
+
+
+def test_committed_writes_are_attributed_to_the_request_user(monkeypatch):
+    router = ReadRouter(window=5, enabled=True)
+    monkeypatch.setattr(read_routing, "read_router", router)
+    table = Table("t", MetaData(), Column("id", Integer, primary_key=True))
+    engine = create_engine("sqlite://")
+    table.create(engine)
+    reader, writer = uuid.uuid4(), uuid.uuid4()
+
+    async def scenario():
+        request_user_id.set(reader)
+        with Session(engine) as session:
+            session.execute(select(table))
+            session.commit()
+        request_user_id.set(writer)
+        with Session(engine) as session:
+            session.execute(insert(table).values(id=1))
+            session.commit()
+        with Session(engine) as session:
+            session.execute(insert(table).values(id=2))
+            session.rollback()
+            session.commit()
+        await asyncio.sleep(0)
+        return await router.wrote_recently(reader), await router.wrote_recently(writer)
+
+    assert asyncio.run(scenario()) == (False, True)
@@ -0,0 +1,66 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.sql import Delete
+
+from app.services import refresh_tokens
+from app.services.refresh_tokens import REVOKED, FamilyCache, InvalidRefreshToken
+from app.utils.security import create_refresh_token, decode_token
+
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.added = []
+        self.statements = []
+        self.commits = 0
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def execute(self, stmt, *args, **kwargs):
+        self.statements.append(stmt)
+
+    async def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = FamilyCache(max_entries=100, ttl=60)
+    monkeypatch.setattr(refresh_tokens, "family_cache", cache)
+    return cache
+
+
+def test_issue_starts_a_family_at_generation_zero():
+    db, user_id = FakeSession(), uuid4()
+
+    token = asyncio.run(refresh_tokens.issue(db, user_id))
+
+    (family,) = db.added
+    payload = decode_token(token)
+    assert payload["fam"] == str(family.id) and payload["gen"] == 0 and payload["sub"] == str(user_id)
+
+
+def test_revoked_family_is_rejected_from_cache(cache):
+    db, family_id = FakeSession(), uuid4()
+    cache.put_local(family_id, REVOKED)
+
+    with pytest.raises(InvalidRefreshToken):
+        asyncio.run(refresh_tokens.rotate(db, create_refresh_token(uuid4(), family_id, 3)))
+
+    assert db.statements == []
+
+
+def test_old_generation_revokes_the_family(cache):
+    db, family_id = FakeSession(), uuid4()
+    cache.put_local(family_id, 5)
+
+    with pytest.raises(InvalidRefreshToken):
+        asyncio.run(refresh_tokens.rotate(db, create_refresh_token(uuid4(), family_id, 2)))
+
+    (stmt,) = db.statements
+    assert isinstance(stmt, Delete)
+    assert db.commits == 1
+    assert db.info[refresh_tokens.CHANGED_KEY] == {family_id: REVOKED}
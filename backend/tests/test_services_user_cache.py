@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timezone
+from uuid import uuid4
+
+from sqlalchemy import inspect
+
+from app.models.user import User
+from app.services import user_cache as user_cache_module
+from app.services.user_cache import UserCache, dumps, loads, snapshot
+
+
+def _user():
+    return User(
+        id=uuid4(), email="a@example.com", password_hash="secret", full_name="Анна", username="anna",
+        is_premium=False, is_online=True, expo_push_token=None, biometrics_enabled=False, theme="deep_amethyst",
+        created_at=datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        updated_at=datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+    )
+
+
+def test_snapshot_round_trips_through_json_without_password():
+    user = _user()
+    snap = snapshot(user)
+
+    assert "password_hash" not in snap
+    assert loads(dumps(snap)) == snap
+
+
+def test_local_entries_are_lru_bounded_and_invalidated():
+    cache = UserCache(max_entries=2, ttl=60, shared_ttl=60)
+    a, b, c = uuid4(), uuid4(), uuid4()
+    cache.put_local(a, {"id": a})
+    cache.put_local(b, {"id": b})
+    cache.get_local(a)
+    cache.put_local(c, {"id": c})
+
+    assert cache.get_local(b) is None
+    assert cache.get_local(a) == {"id": a}
+    cache.invalidate_local(a)
+    assert cache.get_local(a) is None
+
+
+class FakeSession:
+    def __init__(self):
+        self.identity_map = {}
+        self.added = []
+        self.loads = 0
+
+    def identity_key(self, cls, ident):
+        return (cls, ident)
+
+    def add(self, obj):
+        self.added.append(obj)
+
+    async def get(self, cls, ident):
+        self.loads += 1
+        return None
+
+
+def test_cached_user_is_attached_without_a_query(monkeypatch):
+    cache = UserCache(max_entries=10, ttl=60, shared_ttl=60)
+    monkeypatch.setattr(user_cache_module, "user_cache", cache)
+
+    async def no_redis():
+        return None
+
+    monkeypatch.setattr(user_cache_module, "get_redis", no_redis)
+    user = _user()
+    cache.put_local(user.id, snapshot(user))
+    db = FakeSession()
+
+    loaded = asyncio.run(user_cache_module.load_user(db, user.id))
+
+    assert db.loads == 0 and db.added == [loaded]
+    assert loaded.username == "anna"
+    state = inspect(loaded)
+    assert state.key is not None and not state.modified
+    assert "password_hash" in state.unloaded
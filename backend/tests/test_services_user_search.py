@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.models.friend_edge import FriendEdge
+from app.models.friendship import Friendship
+from app.models.user import User
+from app.services import user_search
+
+
+def _trigrams(s: str) -> set[str]:
+    padded = f"  {s.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _similarity(a: str, b: str) -> float:
+    # pg_trgm's similarity(), close enough for ordering tests
+    x, y = _trigrams(a), _trigrams(b)
+    return len(x & y) / len(x | y) if x | y else 0.0
+
+
+class AsyncAdapter:
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def execute(self, stmt):
+        return self.session.execute(stmt)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _functions(conn, _):
+        conn.create_function("similarity", 2, _similarity)
+        conn.create_function("greatest", 2, max)
+        conn.create_function("now", 0, lambda: "2026-01-01 00:00:00")
+
+    for table in (User.__table__, Friendship.__table__, FriendEdge.__table__):
+        table.create(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def _users(db, *names):
+    users = [User(id=uuid.uuid4(), email=f"{u}@example.com", username=u, full_name=f) for u, f in names]
+    db.add_all(users)
+    db.flush()
+    return users
+
+
+def _befriend(db, a, b):
+    friendship = Friendship(id=uuid.uuid4(), requester_id=a.id, addressee_id=b.id, status="accepted")
+    db.add(friendship)
+    db.add_all([
+        FriendEdge(user_id=a.id, friend_id=b.id, friendship_id=friendship.id),
+        FriendEdge(user_id=b.id, friend_id=a.id, friendship_id=friendship.id),
+    ])
+    db.flush()
+
+
+def _search(db, me, q, limit, after=None):
+    return asyncio.run(user_search.search_users(AsyncAdapter(db), me.id, q, limit, after))
+
+
+def test_results_are_ordered_by_tier_then_mutual_friends(db):
+    me, exact, prefix, name, lonely, popular, friend = _users(
+        db,
+        ("me", "Me"),
+        ("anna", "Someone"),
+        ("annabel", "Bel"),
+        ("zz_top", "Anna Smith"),
+        ("joanna", "Jo"),
+        ("joanna_22", "Jo"),
+        ("friend", "Friend"),
+    )
+    _befriend(db, me, friend)
+    _befriend(db, friend, popular)
+
+    rows = _search(db, me, "anna", limit=10)
+
+    # joanna is the closer match, but joanna_22 shares a friend with me
+    assert [u.username for u, _ in rows] == ["anna", "annabel", "zz_top", "joanna_22", "joanna"]
+    assert [key[:2] for _, key in rows] == [(0, 0), (1, 0), (2, 0), (3, -1), (3, 0)]
+
+
+def test_cursor_pages_cover_every_match_once(db):
+    me, *_ = _users(db, ("me", "Me"), *[(f"user{n:02d}", f"User {n}") for n in range(7)])
+
+    seen, after = [], None
+    while True:
+        rows = _search(db, me, "user", limit=3, after=after)
+        page = rows[:3]
+        seen += [u.username for u, _ in page]
+        if len(rows) <= 3:
+            break
+        after = page[-1][1]
+
+    assert sorted(seen) == [f"user{n:02d}" for n in range(7)]
+    assert len(seen) == len(set(seen))
+
+
+def test_only_the_best_candidates_are_ranked(db, monkeypatch):
+    monkeypatch.setattr(user_search.settings, "user_search_max_candidates", 2)
+    me, *_ = _users(db, ("me", "Me"), ("bob", "Bob"), ("bobby", "Bobby"), ("jimbob", "Jim"))
+
+    rows = _search(db, me, "bob", limit=10)
+
+    assert [u.username for u, _ in rows] == ["bob", "bobby"]
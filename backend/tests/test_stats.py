@@ -0,0 +1,13 @@
+from datetime import date, datetime, timezone
+
+from app.routers.stats import _last_months
+from app.services.user_stats import month_key
+
+
+def test_last_months_cross_year_boundary():
+    assert _last_months(3, date(2026, 2, 10)) == [(2025, 12), (2026, 1), (2026, 2)]
+
+
+def test_month_key_is_utc_year_month():
+    assert month_key(datetime(2025, 12, 31, 23, 30, tzinfo=timezone.utc)) == "2025-12"
+    assert month_key(datetime.fromisoformat("2026-01-01T02:30:00+03:00")) == "2025-12"
@@ -0,0 +1,80 @@
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from app.utils.db_pool import LivenessChecker, PoolMetrics, instrumented_pool
+
+
+def test_histogram_is_cumulative():
+    metrics = PoolMetrics()
+    for seconds in (0.0005, 0.003, 0.003, 7):
+        metrics.observe_checkout(seconds)
+    histogram = metrics.histogram()
+    assert histogram["1"] == 1
+    assert histogram["5"] == 3
+    assert histogram["5000"] == 3
+    assert histogram["+Inf"] == 4
+
+
+def test_checkouts_and_timeouts_are_counted():
+    metrics = PoolMetrics()
+    pool = instrumented_pool(metrics)(MagicMock, pool_size=1, max_overflow=0, timeout=0.01)
+
+    def scenario():
+        held = pool.connect()
+        assert pool.checkedout() == 1
+        with pytest.raises(exc.TimeoutError):
+            pool.connect()
+        held.close()
+        pool.connect().close()
+
+    asyncio.run(greenlet_spawn(scenario))
+    assert metrics.checkouts == 3
+    assert metrics.timeouts == 1
+    assert metrics.histogram()["+Inf"] == 3
+
+
+class _Engine:
+    def __init__(self, pool, error):
+        self.sync_engine = MagicMock(pool=pool)
+        self.error = error
+        self.disposed = False
+
+    def connect(self):
+        error = self.error
+
+        class Connection:
+            async def __aenter__(self):
+                raise error
+
+            async def __aexit__(self, *args):
+                return False
+
+        return Connection()
+
+    async def dispose(self):
+        self.disposed = True
+
+
+def _pool(checked_in=1, checked_out=0):
+    pool = MagicMock(_max_overflow=1, metrics=PoolMetrics())
+    pool.size.return_value = 2
+    pool.checkedin.return_value = checked_in
+    pool.checkedout.return_value = checked_out
+    return pool
+
+
+@pytest.mark.parametrize("pool, error, alive", [
+    (_pool(), OSError("connection refused"), False),
+    (_pool(), exc.TimeoutError("pool timeout"), True),
+    (_pool(checked_in=0, checked_out=3), OSError("not reached"), True),
+])
+def test_liveness_probe_only_recycles_the_pool_when_the_database_fails(pool, error, alive):
+    engine = _Engine(pool, error)
+
+    assert asyncio.run(LivenessChecker(engine, interval=1).probe()) is alive
+    assert engine.disposed is not alive
+    assert pool.metrics.liveness_failures == (0 if alive else 1)
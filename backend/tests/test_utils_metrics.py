@@ -0,0 +1,53 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.utils import request_metrics
+from app.utils.metrics import Counter, Family, Histogram, render
+from app.utils.request_metrics import MetricsMiddleware
+
+
+def test_render_exposition_format():
+    counter = Counter("test_jobs_total", "Jobs", ("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind='quote"d')
+    histogram = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(3)
+
+    text_ = render([Family("test_up", "gauge", "Up", [({}, True)])])
+
+    assert '# TYPE test_jobs_total counter' in text_
+    assert 'test_jobs_total{kind="a"} 1' in text_
+    assert 'test_jobs_total{kind="quote\\"d"} 2' in text_
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text_
+    assert 'test_latency_seconds_bucket{le="1"} 2' in text_
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in text_
+    assert 'test_latency_seconds_count 3' in text_
+    assert 'test_up 1' in text_
+
+
+def test_middleware_labels_by_route_and_counts_queries():
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/things/{n}")
+    def things(n: int):
+        with engine.connect() as conn:
+            for _ in range(n):
+                conn.execute(text("SELECT 1"))
+        return {"n": n}
+
+    client = TestClient(app)
+    assert client.get("/things/3").status_code == 200
+    assert client.get("/things/1").status_code == 200
+    assert client.get("/nowhere").status_code == 404
+
+    _, total, count = request_metrics.REQUEST_QUERIES._values[("/things/{n}",)]
+    assert (total, count) == (4, 2)
+    assert request_metrics.REQUESTS._values[("GET", "/things/{n}", "200")] == 2
+    assert request_metrics.REQUESTS._values[("GET", "unmatched", "404")] >= 1
+    assert request_metrics.IN_FLIGHT._values[()] == 0
+    assert 'route="/things/{n}"' in render()
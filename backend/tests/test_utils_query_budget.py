@@ -0,0 +1,60 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.utils.query_budget import (
+    QueryBudgetExceeded, QueryBudgetMiddleware, QueryReport, query_budget, statement_shape,
+)
+from app.utils.request_metrics import MetricsMiddleware
+
+
+def test_statement_shape_ignores_parameters_and_list_lengths():
+    assert statement_shape("SELECT * FROM items\n WHERE id = $1 AND n > 5") == "SELECT * FROM items WHERE id = ? AND n > ?"
+    assert statement_shape("SELECT 1 WHERE id IN ($1, $2, $3)") == statement_shape("SELECT 1 WHERE id IN ($1, $2)")
+
+
+def test_repeated_shapes_are_reported(count_queries):
+    engine = create_engine("sqlite://")
+    with count_queries() as statements:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            for i in range(3):
+                conn.execute(text("SELECT :i"), {"i": i})
+    report = QueryReport("/x", statements, budget=3, repeat_threshold=3)
+    assert report.count == 4
+    assert report.over_budget
+    assert report.repeated() == {"SELECT ?": 4}
+    assert len(report.problems()) == 2
+
+
+def _app(mode: str) -> FastAPI:
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+    app.add_middleware(QueryBudgetMiddleware, mode=mode)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{n}")
+    @query_budget(2)
+    def items(n: int):
+        with engine.connect() as conn:
+            for i in range(n):
+                conn.execute(text(f"SELECT {i} FROM (SELECT 1)"))
+        return {}
+
+    return app
+
+
+def test_warn_mode_reports_count_without_failing():
+    client = TestClient(_app("warn"))
+    assert client.get("/items/2").headers["x-query-count"] == "2"
+    response = client.get("/items/5")
+    assert response.status_code == 200
+    assert response.headers["x-query-count"] == "5"
+
+
+def test_strict_mode_fails_over_budget_requests():
+    client = TestClient(_app("strict"))
+    assert client.get("/items/2").status_code == 200
+    with pytest.raises(QueryBudgetExceeded, match="5 queries, budget 2"):
+        client.get("/items/5")
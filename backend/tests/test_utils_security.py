@@ -0,0 +1,52 @@
+import time
+from uuid import uuid4
+
+import pytest
+
+from app.utils import security
+from app.utils.jwt_backend import HMACBackend, InvalidToken, JoseBackend
+
+KEY = "test-key"
+
+
+@pytest.mark.parametrize("signer,verifier", [
+    (JoseBackend(), HMACBackend()),
+    (HMACBackend(), JoseBackend()),
+])
+def test_backends_accept_each_others_tokens(signer, verifier):
+    token = signer.encode({"sub": "abc", "exp": int(time.time()) + 60, "type": "access"}, KEY, "HS256")
+
+    assert verifier.decode(token, KEY, "HS256")["sub"] == "abc"
+
+
+@pytest.mark.parametrize("backend", [JoseBackend(), HMACBackend()])
+def test_backends_reject_bad_tokens(backend):
+    token = backend.encode({"sub": "abc", "exp": int(time.time()) + 60}, KEY, "HS256")
+    expired = backend.encode({"sub": "abc", "exp": int(time.time()) - 60}, KEY, "HS256")
+
+    for bad, key in ((token, "other-key"), (expired, KEY), (token[:-2], KEY), ("not.a.jwt", KEY), ("", KEY)):
+        with pytest.raises(InvalidToken):
+            backend.decode(bad, key, "HS256")
+
+
+def test_decode_token_caches_verified_payloads_only():
+    security.token_cache.clear()
+    token = security.create_access_token(uuid4())
+
+    first = security.decode_token(token)
+    assert security.decode_token(token) is first
+    assert security.decode_token(token + "x") is None
+    assert security.decode_token(token + "x") is None
+    assert len(security.token_cache._payloads) == 1
+
+
+def test_cached_payload_expires_with_the_token():
+    cache = security.DecodedTokenCache(max_entries=2)
+    cache.put(b"a", {"sub": "a"}, time.time() - 1)
+    cache.put(b"b", {"sub": "b"}, time.time() + 60)
+    cache.put(b"c", {"sub": "c"}, time.time() + 60)
+
+    assert cache.get(b"a") is None
+    assert cache.get(b"b") == {"sub": "b"}
+    cache.put(b"d", {"sub": "d"}, time.time() + 60)
+    assert cache.get(b"c") is None